@@ -3,7 +3,7 @@ AI Hero Academy — entry point and router.
 
 On every page load:
 1. Read user_email from Databricks SSO context
-2. Query Delta to determine user state
+2. Read the user state summary (one Firestore point read)
 3. Route to the appropriate page, or fall through to the main app nav
 """
 
@@ -13,8 +13,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from utils.auth import get_user_email
-from utils.db import query_one
+from utils.db import get_user_state
 from utils.styles import inject_global_css
+from utils.content import pin_content_for_run
 
 
 st.set_page_config(
@@ -23,45 +24,11 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+pin_content_for_run()
 
 inject_global_css()
 
 
-def get_user_state(user_email: str) -> tuple[str, str | None]:
-    """
-    Returns (state, role_id) where state is one of:
-    new_user | needs_diagnostic | needs_course | in_training
-    role_id is None for new_user, otherwise the role from user_profiles.
-    """
-    profile = query_one(
-        "SELECT role_id FROM users WHERE user_email = ?",
-        [user_email],
-    )
-    if not profile:
-        return "new_user", None
-
-    role_id = profile["role_id"]
-
-    session = query_one(
-        "SELECT session_id FROM diagnostic_sessions "
-        "WHERE user_email = ? AND completed_at IS NOT NULL "
-        "ORDER BY completed_at DESC LIMIT 1",
-        [user_email],
-    )
-    if not session:
-        return "needs_diagnostic", role_id
-
-    progress = query_one(
-        "SELECT progress_id FROM training_progress "
-        "WHERE user_email = ? LIMIT 1",
-        [user_email],
-    )
-    if not progress:
-        return "needs_course", role_id
-
-    return "in_training", role_id
-
-
 # ── Initialise session state ──────────────────────────────────────────────────
 if "user_email" not in st.session_state:
     try:
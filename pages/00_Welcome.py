@@ -7,9 +7,10 @@ import streamlit as st
 import uuid
 import os
 from utils.auth import get_user_email
-from utils.db import execute, query_one, escape
+from utils.db import execute, get_user_state
 from utils.styles import inject_global_css
-from utils.content import ROLES
+from utils import content
+from utils.content import pin_content_for_run
 
 st.set_page_config(
     page_title="Welcome | AI Hero Academy",
@@ -17,37 +18,27 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed",
 )
+pin_content_for_run()
 
 inject_global_css()
 
 user_email = get_user_email()
 
 # Guard: if user already has a profile, route to the correct page for their state
-existing = query_one(
-    "SELECT role_id FROM users WHERE user_email = ?",
-    [user_email],
-)
-if existing:
+_state, _role_id = get_user_state(user_email)
+if _state != "new_user":
+    if not _role_id:
+        st.error(f"Your profile ({user_email}) has no role assigned. Please contact an administrator.")
+        st.stop()
     st.session_state["user_email"] = user_email
-    session = query_one(
-        "SELECT session_id FROM diagnostic_sessions "
-        "WHERE user_email = ? AND completed_at IS NOT NULL "
-        "ORDER BY completed_at DESC LIMIT 1",
-        [user_email],
-    )
-    if not session:
-        st.session_state["user_state"] = "needs_diagnostic"
-        st.switch_page("pages/01_Diagnostic.py")
-    progress = query_one(
-        "SELECT progress_id FROM training_progress "
-        "WHERE user_email = ? LIMIT 1",
-        [user_email],
-    )
-    if not progress:
-        st.session_state["user_state"] = "needs_course"
-        st.switch_page("pages/02_Skills_Profile.py")
-    st.session_state["user_state"] = "in_training"
-    st.switch_page("pages/03_Home.py")
+    st.session_state["user_state"] = _state
+    st.session_state["role_id"] = _role_id
+    _STATE_PAGES = {
+        "needs_diagnostic": "pages/01_Diagnostic.py",
+        "needs_course":     "pages/02_Skills_Profile.py",
+        "in_training":      "pages/03_Home.py",
+    }
+    st.switch_page(_STATE_PAGES[_state])
 
 
 # ── Brand mark ────────────────────────────────────────────────────────────────
@@ -128,7 +119,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Build role options from content — {title: role_id}, ordered by roles.json insertion order
-_role_map = {v["title"]: k for k, v in ROLES.items()}
+_role_map = {v["title"]: k for k, v in content.ROLES.items()}
 _available_roles = list(_role_map.keys())
 _derived_name = user_email.split("@")[0].replace(".", " ").title()
 
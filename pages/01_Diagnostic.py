@@ -12,11 +12,11 @@ import sys
 from datetime import datetime
 
 from utils.auth import get_user_email
-from utils.db import execute, query_one
+from utils.db import execute, get_user, latest_completed_diagnostic
 from utils.ai import score_diagnostic, generate_gap_map
 from utils.scoring import DOMAIN_DISPLAY_NAMES
 from utils.styles import inject_global_css
-from utils.content import get_diagnostic_items, get_domain_descriptions
+from utils.content import get_diagnostic_items, get_domain_descriptions, pin_content_for_run
 
 st.set_page_config(
     page_title="Diagnostic | AI Hero Academy",
@@ -24,27 +24,21 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed",
 )
+pin_content_for_run()
 
 inject_global_css()
 
 user_email = get_user_email()
 
 # ── Guard: must have a profile ────────────────────────────────────────────────
-profile = query_one(
-    "SELECT role_id FROM users WHERE user_email = ?",
-    [user_email],
-)
+profile = get_user(user_email, fields=["role_id"])
 if not profile:
     st.switch_page("pages/00_Welcome.py")
 
 role_id: str = profile["role_id"] if profile else st.session_state.get("role_id", "rm")
 
 # Check for prior completed diagnostic — used to show exit navigation (CX1)
-_prior_diag = query_one(
-    "SELECT session_id FROM diagnostic_sessions "
-    "WHERE user_email = ? AND completed_at IS NOT NULL LIMIT 1",
-    [user_email],
-)
+_prior_diag = latest_completed_diagnostic(user_email, fields=["session_id"])
 _can_exit = bool(_prior_diag)
 
 # ── Load diagnostic items (ordered) ──────────────────────────────────────────
@@ -148,7 +142,7 @@ st.progress(progress_pct)
 # ── Scoring / completion handler ──────────────────────────────────────────────
 def complete_diagnostic(responses: list[dict]):
     """Called after the final question is submitted."""
-    with st.spinner("Analysing your responses — this takes about 20 seconds..."):
+    with st.spinner("Analysing your responses — this takes a few seconds..."):
         try:
             # Build scoring payload
             scoring_payload = []
@@ -6,13 +6,15 @@ Allows retake diagnostic and build/view course.
 
 import streamlit as st
 import json
-import uuid
 import os
 import pandas as pd
 import plotly.graph_objects as go
 
 from utils.auth import get_user_email
-from utils.db import execute, query_one, escape
+from utils.db import (
+    enroll_courses,
+    get_user, latest_completed_diagnostic, list_diagnostics, latest_gap_map, list_progress,
+)
 from utils.scoring import (
     DOMAIN_DISPLAY_NAMES, DOMAIN_IDS,
     get_level_label, calculate_overall_score,
@@ -20,7 +22,7 @@ from utils.scoring import (
 )
 from utils.sequencing import compute_module_sequence
 from utils.styles import inject_global_css, section_header, render_sidebar
-from utils.content import get_course
+from utils.content import get_course, pin_content_for_run
 
 st.set_page_config(
     page_title="Skills Profile | AI Hero Academy",
@@ -28,54 +30,39 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+pin_content_for_run()
 
 inject_global_css()
 
 user_email = get_user_email()
 
 # ── Guard: must have completed diagnostic ─────────────────────────────────────
-profile = query_one(
-    "SELECT display_name, role_id FROM users WHERE user_email = ?",
-    [user_email],
-)
+profile = get_user(user_email, fields=["display_name", "role_id"])
 if not profile:
     st.switch_page("pages/00_Welcome.py")
 
 
 # ── Load data ─────────────────────────────────────────────────────────────────
 def load_latest_diagnostic():
-    return query_one(
-        "SELECT session_id, completed_at, domain_scores, overall_score "
-        "FROM diagnostic_sessions "
-        "WHERE user_email = ? AND completed_at IS NOT NULL "
-        "ORDER BY completed_at DESC LIMIT 1",
-        [user_email],
+    return latest_completed_diagnostic(
+        user_email,
+        fields=["session_id", "completed_at", "domain_scores", "overall_score"],
     )
 
 def load_all_diagnostics():
-    return execute(
-        "SELECT session_id, completed_at, domain_scores, overall_score "
-        "FROM diagnostic_sessions "
-        "WHERE user_email = ? AND completed_at IS NOT NULL "
-        "ORDER BY completed_at DESC",
-        [user_email],
+    return list_diagnostics(
+        user_email,
+        fields=["session_id", "completed_at", "domain_scores", "overall_score"],
     )
 
 def load_latest_gap_map():
-    return query_one(
-        "SELECT bullets FROM gap_maps "
-        "WHERE user_email = ? "
-        "ORDER BY generated_at DESC LIMIT 1",
-        [user_email],
-    )
+    return latest_gap_map(user_email, fields=["bullets"])
 
 def load_training_progress():
-    return execute(
-        "SELECT course_id, module_sequence_order, is_locked, "
-        "evaluation_completed_at, evaluation_score, domain_score_after "
-        "FROM training_progress "
-        "WHERE user_email = ? ORDER BY module_sequence_order",
-        [user_email],
+    return list_progress(
+        user_email,
+        fields=["course_id", "module_sequence_order", "is_locked",
+                "evaluation_completed_at", "evaluation_score", "domain_score_after"],
     )
 
 def load_eval_domain_scores(progress_rows):
@@ -290,21 +277,7 @@ with col_b:
             with st.spinner("Building your personalised course..."):
                 try:
                     sequence = compute_module_sequence(current_domain_scores, role_id=profile["role_id"])
-                    for i, course_id in enumerate(sequence):
-                        progress_id = str(uuid.uuid4())
-                        is_locked = "true" if i > 0 else "false"
-                        execute(f"""
-                            INSERT INTO training_progress
-                              (progress_id, user_email, course_id, module_sequence_order,
-                               is_locked)
-                            VALUES (
-                              '{escape(progress_id)}',
-                              '{escape(user_email)}',
-                              '{escape(course_id)}',
-                              {i + 1},
-                              {is_locked}
-                            )
-                        """)
+                    enroll_courses(user_email, sequence)
                     st.session_state["user_state"] = "in_training"
                     st.switch_page("pages/03_Home.py")
                 except Exception as e:
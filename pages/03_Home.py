@@ -9,13 +9,13 @@ import os
 from datetime import datetime
 
 from utils.auth import get_user_email
-from utils.db import execute, query_one
+from utils.db import get_user, latest_completed_diagnostic, list_progress
 from utils.scoring import (
     DOMAIN_DISPLAY_NAMES, get_level_label, get_score_color,
     calculate_overall_score, compute_current_domain_scores,
 )
 from utils.styles import inject_global_css, section_header, render_sidebar
-from utils.content import get_course
+from utils.content import get_course, pin_content_for_run
 
 st.set_page_config(
     page_title="My Training | AI Hero Academy",
@@ -23,39 +23,25 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+pin_content_for_run()
 
 inject_global_css()
 
 user_email = get_user_email()
 
 # ── Guards ────────────────────────────────────────────────────────────────────
-profile = query_one(
-    "SELECT display_name, role_id FROM users "
-    "WHERE user_email = ?",
-    [user_email],
-)
+profile = get_user(user_email, fields=["display_name", "role_id"])
 if not profile:
     st.switch_page("pages/00_Welcome.py")
 
-diag = query_one(
-    "SELECT session_id, domain_scores, overall_score, completed_at "
-    "FROM diagnostic_sessions "
-    "WHERE user_email = ? AND completed_at IS NOT NULL "
-    "ORDER BY completed_at DESC LIMIT 1",
-    [user_email],
+diag = latest_completed_diagnostic(
+    user_email,
+    fields=["session_id", "domain_scores", "overall_score", "completed_at"],
 )
 if not diag:
     st.switch_page("pages/01_Diagnostic.py")
 
-_raw_progress = execute(
-    "SELECT progress_id, course_id, module_sequence_order, "
-    "is_locked, reading_completed_at, practice_completed_at, "
-    "evaluation_completed_at, evaluation_score, domain_score_after "
-    "FROM training_progress "
-    "WHERE user_email = ? "
-    "ORDER BY module_sequence_order",
-    [user_email],
-)
+_raw_progress = list_progress(user_email)
 if not _raw_progress:
     st.switch_page("pages/02_Skills_Profile.py")
 
@@ -14,10 +14,26 @@ from datetime import datetime
 import streamlit as st
 
 from utils.auth import get_user_email
-from utils.db import execute, query_one
-from utils.content import get_course, get_reading, get_scenario, get_eval_items, get_domain_descriptions
+from utils.db import (
+    get_user,
+    latest_completed_diagnostic,
+    list_progress,
+    get_progress_by_course,
+    get_progress_by_sequence,
+    insert_gap_map,
+    update_progress,
+    write_batch,
+)
+from utils.content import (
+    get_course,
+    get_reading,
+    get_scenario,
+    get_eval_items,
+    get_domain_descriptions,
+    pin_content_for_run,
+)
 from utils.ai import (
-    coach_response,
+    coach_response_stream,
     score_evaluation,
     generate_gap_map,
     generate_module_coach_note,
@@ -30,22 +46,24 @@ from utils.scoring import (
 )
 from utils.styles import inject_global_css, section_header, step_progress_strip, render_sidebar
 
+# Practice coach turn limits (TDD §6.4)
+MAX_TASK_TURNS = 3
+MAX_TOTAL_TURNS = 15
+
 st.set_page_config(
     page_title="Course Module | AI Hero Academy",
     page_icon="⚡",
     layout="wide",
     initial_sidebar_state="expanded",
 )
+pin_content_for_run()
 
 inject_global_css()
 
 user_email = get_user_email()
 
 # ── Guards ────────────────────────────────────────────────────────────────────
-profile = query_one(
-    "SELECT display_name FROM users WHERE user_email = ?",
-    [user_email],
-)
+profile = get_user(user_email, fields=["display_name"])
 if not profile:
     st.switch_page("pages/00_Welcome.py")
 
@@ -58,22 +76,19 @@ active_sub = st.session_state.get("active_submodule", "overview")
 
 # ── Data loaders ──────────────────────────────────────────────────────────────
 def load_progress(cid: str):
-    return query_one(
-        "SELECT progress_id, module_sequence_order, is_locked, "
-        "reading_completed_at, practice_completed_at, "
-        "evaluation_completed_at, evaluation_score "
-        "FROM training_progress "
-        "WHERE user_email = ? AND course_id = ?",
-        [user_email, cid],
+    return get_progress_by_course(
+        user_email, cid,
+        fields=["progress_id", "module_sequence_order", "is_locked",
+                "reading_completed_at", "practice_completed_at",
+                "evaluation_completed_at", "evaluation_score"],
     )
 
 
 def load_all_progress() -> list:
-    _rows = execute(
-        "SELECT course_id, module_sequence_order, is_locked, evaluation_completed_at, domain_score_after "
-        "FROM training_progress "
-        "WHERE user_email = ? ORDER BY module_sequence_order",
-        [user_email],
+    _rows = list_progress(
+        user_email,
+        fields=["course_id", "module_sequence_order", "is_locked",
+                "evaluation_completed_at", "domain_score_after"],
     )
     result = []
     for _row in _rows:
@@ -82,41 +97,25 @@ def load_all_progress() -> list:
     return result
 
 
-def load_next_module_title(current_seq: int):
-    nxt = query_one(
-        "SELECT course_id FROM training_progress "
-        "WHERE user_email = ? AND module_sequence_order = ?",
-        [user_email, current_seq + 1],
-    )
-    if nxt:
-        return get_course(nxt["course_id"])["title"]
-    return None
-
-
 def do_complete_practice(progress_id: str, messages: list, total_turns: int):
     """Write coach session + mark practice complete, then navigate to evaluation."""
     with st.spinner("Saving practice session..."):
         try:
             session_id = str(uuid.uuid4())
-            started_at = st.session_state.pop("practice_started_at", datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"))
+            started_at = st.session_state.get("practice_started_at")
             conv_json = json.dumps(messages, ensure_ascii=False)
-            execute(
-                "INSERT INTO coach_sessions "
-                "(session_id, user_email, course_id, started_at, completed_at, turn_count, conversation_json) "
-                "VALUES (?, ?, ?, CAST(? AS TIMESTAMP), current_timestamp(), ?, ?)",
-                [session_id, user_email, course_id, started_at, total_turns, conv_json],
-            )
-            execute(
-                "UPDATE training_progress "
-                "SET practice_completed_at = current_timestamp() "
-                "WHERE progress_id = ?",
-                [progress_id],
-            )
+            with write_batch() as batch:
+                batch.insert_coach_session(
+                    session_id, user_email, course_id,
+                    conversation_json=conv_json, turn_count=total_turns, completed=True,
+                    started_at=started_at if isinstance(started_at, datetime) else None,
+                )
+                batch.update_progress(user_email, progress_id, practice_completed_at=datetime.now())
         except Exception as e:
             st.error(f"Could not save practice session. Please try again.\n\n_{e}_")
             st.stop()
 
-    for k in ["coach_messages", "practice_task_idx", "practice_turns", "task_turn_counts"]:
+    for k in ["coach_messages", "practice_task_idx", "practice_turns", "task_turn_counts", "practice_started_at"]:
         st.session_state.pop(k, None)
     st.session_state["eval_item_index"] = 0
     st.session_state["eval_responses"] = []
@@ -264,12 +263,8 @@ elif active_sub == "reading":
     with col_cta:
         if st.button("I've read this — Start Practice →", use_container_width=True, type="primary"):
             try:
-                execute(
-                    "UPDATE training_progress "
-                    "SET reading_completed_at = current_timestamp() "
-                    "WHERE progress_id = ? AND reading_completed_at IS NULL",
-                    [progress_id],
-                )
+                if not reading_done:
+                    update_progress(user_email, progress_id, reading_completed_at=datetime.now())
             except Exception as e:
                 st.error(f"Could not save progress.\n\n_{e}_")
                 st.stop()
@@ -278,7 +273,7 @@ elif active_sub == "reading":
                 "practice_task_idx": 0,
                 "practice_turns": 0,
                 "task_turn_counts": {0: 0, 1: 0, 2: 0, 3: 0},
-                "practice_started_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                "practice_started_at": datetime.now(),
                 "active_submodule": "practice",
             })
             st.rerun()
@@ -423,14 +418,16 @@ elif active_sub == "practice":
     # Native chat input pinned to page bottom (only rendered when waiting for user)
     if waiting_for_user:
         if user_input := st.chat_input("Your response...", key=f"p_input_{task_idx}_{current_task_turns}"):
-            with st.spinner("Coach is thinking..."):
+            with st.chat_message("user"):
+                st.markdown(user_input.strip())
+            with st.chat_message("assistant", avatar="🤖"):
                 try:
-                    reply = coach_response(
+                    reply = st.write_stream(coach_response_stream(
                         system_prompt=coach_prompt,
                         conversation=messages,
                         user_input=user_input.strip(),
                         user_email=user_email,
-                    )
+                    ))
                 except Exception as e:
                     st.error(f"Coach unavailable. Please try again.\n\n_{e}_")
                     st.stop()
@@ -484,41 +481,43 @@ elif active_sub == "evaluation":
                 st.error(f"Issue scoring quiz. Please refresh and retry.\n\n_{e}_")
                 st.stop()
 
+        # Next module row: unlocked in the batch below, titled in the coach note
+        _next = None
+        try:
+            _next = get_progress_by_sequence(user_email, seq_order + 1, fields=["progress_id", "course_id"])
+        except Exception:
+            pass
+
+        # Score and next-module unlock are committed together (one round trip) before any
+        # further LLM call, so a slow or failed gap map can never hold up or lose the score
         with st.spinner("Updating skills profile..."):
             try:
-                execute(
-                    "UPDATE training_progress "
-                    "SET evaluation_score = ?, "
-                    "    evaluation_completed_at = current_timestamp(), "
-                    "    domain_score_after = ? "
-                    "WHERE progress_id = ?",
-                    [eval_score, domain_score_after, progress_id],
-                )
-                execute(
-                    "UPDATE training_progress "
-                    "SET is_locked = false "
-                    "WHERE user_email = ? AND module_sequence_order = ?",
-                    [user_email, seq_order + 1],
-                )
+                with write_batch() as batch:
+                    batch.update_progress(
+                        user_email, progress_id,
+                        evaluation_score=eval_score,
+                        evaluation_completed_at=datetime.now(),
+                        domain_score_after=domain_score_after,
+                    )
+                    if _next:
+                        batch.update_progress(user_email, _next["progress_id"], is_locked=False)
             except Exception as e:
                 st.error(f"Could not save quiz results.\n\n_{e}_")
                 st.stop()
 
         with st.spinner("Generating updated gap map..."):
             try:
-                diag_row = query_one(
-                    "SELECT domain_scores FROM diagnostic_sessions "
-                    "WHERE user_email = ? AND completed_at IS NOT NULL "
-                    "ORDER BY completed_at DESC LIMIT 1",
-                    [user_email],
-                )
+                diag_row = latest_completed_diagnostic(user_email, fields=["domain_scores"])
                 try:
                     diag_domain_scores_gm = json.loads(diag_row.get("domain_scores") or "{}") if diag_row else {}
                 except Exception:
                     diag_domain_scores_gm = {}
-                # Build full merged eval domain scores across all completed modules (M5)
-                eval_domain_scores_gm = []
+                # Build full merged eval domain scores across all completed modules (M5).
+                # This module's result is merged in from memory (cached reads may predate the write).
+                eval_domain_scores_gm = [{primary_domain: domain_score_after}] if primary_domain else []
                 for _row in load_all_progress():
+                    if _row["course_id"] == course_id:
+                        continue
                     if _row.get("evaluation_completed_at") and _row.get("domain_score_after") is not None:
                         _domain = _row.get("primary_domain")
                         if _domain:
@@ -533,15 +532,13 @@ elif active_sub == "evaluation":
                     user_email=user_email,
                     source_type="evaluation",
                 )
-                gm_id = str(uuid.uuid4())
-                execute(
-                    "INSERT INTO gap_maps "
-                    "(gap_map_id, user_email, source_type, source_id, bullets, generated_at) "
-                    "VALUES (?, ?, 'evaluation', ?, ?, current_timestamp())",
-                    [gm_id, user_email, progress_id, json.dumps(gap_bullets, ensure_ascii=False)],
-                )
+                if gap_bullets:
+                    insert_gap_map(
+                        str(uuid.uuid4()), user_email, "evaluation", progress_id,
+                        json.dumps(gap_bullets, ensure_ascii=False),
+                    )
             except Exception:
-                pass
+                pass   # the gap map is best effort; the quiz result is already saved
 
         coach_note = ""
         try:
@@ -549,7 +546,7 @@ elif active_sub == "evaluation":
                 module_title=course_title,
                 evaluation_score=eval_score,
                 domain_scores={primary_domain: domain_score_after},
-                next_module_title=load_next_module_title(seq_order),
+                next_module_title=get_course(_next["course_id"])["title"] if _next else None,
                 user_email=user_email,
             )
         except Exception:
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Build the published content bundle: hash content/*.json into content/manifest.json
+and compile the binary snapshot content/shards/content.snap (memory-mapped and
+decoded one role shard at a time by utils/content.py). Run after editing content
+files by hand; the generation pipeline runs it automatically at Stage 8, and the
+Docker build runs it so deployed containers start from the snapshot.
+
+Usage:
+    python scripts/build_content.py [--content-dir DIR]
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.content import SHARD_DIR, SNAPSHOT_FILE, read_snapshot_header, write_manifest
+
+
+def main() -> None:
+    cli = argparse.ArgumentParser(description="Build content/manifest.json and the content snapshot.")
+    cli.add_argument("--content-dir", default=None, help="Content directory (default: content/)")
+    args = cli.parse_args()
+
+    manifest = write_manifest(args.content_dir)
+    content_dir = args.content_dir or os.path.join(PROJECT_ROOT, "content")
+    header = read_snapshot_header(content_dir)
+    snapshot_path = os.path.join(content_dir, SHARD_DIR, SNAPSHOT_FILE)
+
+    print(f"Content v{manifest['version']}  {manifest['content_hash'][:12]}")
+    print(f"  snapshot {snapshot_path}  {os.path.getsize(snapshot_path) / 1024:.1f} KB")
+    for role_id, (_, length) in sorted(header["shards"].items()):
+        print(f"  shard {role_id or '(none)':<8} {length / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
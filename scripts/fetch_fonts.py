@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Self-host the app's web fonts: download the latin woff2 files behind
+utils.styles.GOOGLE_FONTS_URL into static/fonts/ and write static/fonts/fonts.css
+with @font-face rules pointing at them. utils/styles.py bundles fonts.css into the
+hashed stylesheet asset, so pages no longer wait on fonts.googleapis.com before
+first paint. The Docker build runs this; without the files the app falls back to
+the Google Fonts stylesheet.
+
+Usage:
+    python scripts/fetch_fonts.py [--out-dir DIR]
+"""
+
+import argparse
+import os
+import re
+import sys
+import urllib.request
+
+# Add project root to sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from utils.styles import GOOGLE_FONTS_URL
+
+# Google Fonts picks the file format from the User-Agent; a current browser gets woff2
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+_FACE_RE = re.compile(r"/\* ([\w-]+) \*/\s*(@font-face\s*\{.*?\})", re.S)
+_URL_RE = re.compile(r"url\((https://[^)]+)\)")
+_PROP_RE = re.compile(r"font-(family|style|weight):\s*'?([^;']+)'?;")
+
+
+def _get(url: str) -> bytes:
+    req = urllib.request.Request(url, headers={"User-Agent": _USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.read()
+
+
+def main() -> None:
+    cli = argparse.ArgumentParser(description="Download the app's web fonts into static/fonts/.")
+    cli.add_argument("--out-dir", default=os.path.join(PROJECT_ROOT, "static", "fonts"))
+    args = cli.parse_args()
+
+    try:
+        css = _get(GOOGLE_FONTS_URL).decode("utf-8")
+    except OSError as e:
+        print(f"ERROR: could not fetch {GOOGLE_FONTS_URL}: {e}")
+        sys.exit(1)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    faces = []
+    for subset, face in _FACE_RE.findall(css):
+        if subset != "latin":
+            continue
+        props = dict(_PROP_RE.findall(face))
+        filename = "{}-{}-{}.woff2".format(
+            props["family"].lower().replace(" ", "-"), props["weight"], props["style"]
+        )
+        url = _URL_RE.search(face).group(1)
+        data = _get(url)
+        with open(os.path.join(args.out_dir, filename), "wb") as f:
+            f.write(data)
+        # Relative to static/fonts/ and to the hashed sheet in static/css/ alike
+        faces.append(_URL_RE.sub(f"url(../fonts/{filename})", face))
+        print(f"  {filename}  {len(data) / 1024:.1f} KB")
+
+    if not faces:
+        print("ERROR: no latin @font-face rules in the Google Fonts response")
+        sys.exit(1)
+
+    # Written last: utils/styles.py only self-hosts once fonts.css exists
+    with open(os.path.join(args.out_dir, "fonts.css"), "w", encoding="utf-8") as f:
+        f.write("\n".join(faces) + "\n")
+    print(f"Wrote {len(faces)} font faces to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
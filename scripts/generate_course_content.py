@@ -7,6 +7,25 @@ JSON content files via an 8-stage multi-agent pipeline.
 
 Usage:
     python scripts/generate_course_content.py <brief_filepath>
+    python scripts/generate_course_content.py --resume <RUN_ID|latest> [--from-stage N]
+    python scripts/generate_course_content.py --batch <brief|dir> [...] [--batch-workers N]
+
+    Every stage's output is checkpointed under .pipeline_runs/<RUN_ID>/. --resume
+    reuses each checkpoint whose inputs are unchanged (e.g. after a Stage 6 timeout
+    or a failed Stage 7 QA) and --from-stage N re-runs stage N onward regardless.
+
+    --batch runs one pipeline per brief (directories expand to their *.md files)
+    concurrently under the shared per-endpoint rate limiters, merges every role
+    that passes Stage 7 into the content files in one write, and prints a per-role
+    report (also saved as .pipeline_runs/batch-<BATCH_ID>.json). Each brief keeps
+    its own run, so a failed role can be finished with --resume <BATCH_ID>-<brief>.
+
+    LLM_PROVIDER=fake runs every stage against the local stand-in in
+    utils/fake_llm.py (no Databricks endpoint needed) — use with --output-dir.
+
+    Replies are cached on disk by utils/llm_cache.py, so re-running on an unchanged
+    brief replays earlier stages in seconds. --llm-cache refresh forces fresh
+    replies (e.g. for a new draft of the same brief); off bypasses the cache.
 
 Pipeline stages:
     Stage 1  — Brief Parser Agent (Haiku)
@@ -14,21 +33,28 @@ Pipeline stages:
     Stage 3  — QA Gap Check (Sonnet): quality gate; prints follow-up prompt if gaps found
     Stage 4  — Course Content Agents x5 (Sonnet, parallel): reading + practice scenario
     Stage 5  — Assessment Designer (Sonnet, parallel with Stage 4): 12 diagnostic items
-    Stage 6  — Evaluation Designer (Sonnet, sequential after Stage 4): 20 eval items
+    Stage 6  — Evaluation Designer x5 (Sonnet): 4 eval items per course, each started as
+               soon as that course's Stage 4 agent finishes
     Stage 7  — Final QA Agent (Sonnet): cross-validation
     Stage 8  — Assemble & Write: merge into existing content/ JSON files atomically
 """
 
 import argparse
+import atexit
+import contextvars
+import hashlib
 import io
 import json
 import os
 import re
 import sys
 import tempfile
+import threading
+import time
 from concurrent.futures import (
+    FIRST_COMPLETED,
     ThreadPoolExecutor,
-    as_completed,
+    wait,
     TimeoutError as FuturesTimeoutError,
 )
 from pathlib import Path
@@ -41,9 +67,14 @@ from tenacity import (
     retry,
     wait_random_exponential,
     stop_after_attempt,
+    retry_if_exception,
     retry_if_exception_type,
 )
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils import fake_llm, llm_cache, ratelimit  # noqa: E402
+from utils.content import write_manifest  # noqa: E402
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -51,7 +82,21 @@ from tenacity import (
 SONNET_ENDPOINT = os.environ.get("SONNET_ENDPOINT", "databricks-claude-sonnet-4-6")
 HAIKU_ENDPOINT = os.environ.get("HAIKU_ENDPOINT", "databricks-claude-haiku-4-5")
 CONTENT_DIR = Path(__file__).parent.parent / "content"
+RUNS_DIR = Path(os.environ.get("PIPELINE_RUNS_DIR") or Path(__file__).parent.parent / ".pipeline_runs")
 PARALLEL_TIMEOUT_SECONDS = 300
+# Agent threads per pool; actual in-flight calls are governed by the per-endpoint limiter
+MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", "8"))
+
+# Per-endpoint limiter defaults for this process (utils/ratelimit.py; override with LLM_RATE_LIMITS).
+# Starts at the previous fixed 3 in flight / ~2 req/s and adapts from there. Each call
+# reserves its prompt estimate + max_tokens against tpm until the reply trues it up.
+ENDPOINT_LIMITS = {
+    "rps": 2.0,
+    "burst": 3,
+    "tpm": 200_000,
+    "initial_concurrency": 3,
+    "max_concurrency": MAX_WORKERS,
+}
 
 DOMAIN_IDS = ["prompting", "verification", "data_safety", "tool_fluency"]
 
@@ -62,7 +107,7 @@ MAX_TOKENS = {
     "qa": 2000,
     "course_content": 6000,
     "assessment": 7000,   # 12 items × ~500 tokens/item; extra headroom for rubric detail
-    "evaluation": 8000,   # 20 items × ~400 tokens/item; performance tasks are verbose
+    "evaluation": 3000,   # per course: 4 items × ~400 tokens/item; performance tasks are verbose
     "final_qa": 2000,
 }
 
@@ -71,6 +116,9 @@ _w: WorkspaceClient | None = None
 
 def _get_client() -> WorkspaceClient:
     global _w
+    if fake_llm.enabled():
+        # LLM_PROVIDER=fake: offline stand-in; injected failures raise DatabricksError so retries apply
+        return fake_llm.ServingClient(error_cls=DatabricksError)
     if _w is None:
         # http_timeout_seconds=300 allows Sonnet to generate 5k+ token responses
         # (default 60s triggers ReadTimeout for large assessment/evaluation outputs)
@@ -83,10 +131,11 @@ def _get_client() -> WorkspaceClient:
 # ---------------------------------------------------------------------------
 
 
+@llm_cache.cached
 @retry(
     wait=wait_random_exponential(min=2, max=30),
     stop=stop_after_attempt(3),
-    retry=retry_if_exception_type(DatabricksError),
+    retry=retry_if_exception_type(DatabricksError) | retry_if_exception(ratelimit.is_throttle),
 )
 def call_llm(
     endpoint_name: str,
@@ -95,19 +144,30 @@ def call_llm(
     temperature: float = 0.7,
     max_tokens: int = 4000,
 ) -> str:
-    """Call a Databricks serving endpoint and return the assistant reply text."""
+    """Call a Databricks serving endpoint and return the assistant reply text.
+
+    Wrapped by llm_cache.cached: an identical request made before is answered
+    from .llm_cache/ without calling the endpoint (see LLM_CACHE_MODE). Each
+    attempt waits for a slot on the endpoint's shared limiter, which reserves
+    max_tokens against the endpoint's tokens-per-minute budget.
+    """
     w = _get_client()
     messages = [
         ChatMessage(role=ChatMessageRole.SYSTEM, content=system_prompt),
         ChatMessage(role=ChatMessageRole.USER, content=user_prompt),
     ]
-    response = w.serving_endpoints.query(
-        name=endpoint_name,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-    return response.choices[0].message.content
+    prompt_tokens = ratelimit.estimate_tokens(system_prompt + user_prompt)
+    limiter = ratelimit.get_limiter(endpoint_name, **ENDPOINT_LIMITS)
+    with limiter.slot(prompt_tokens + max_tokens) as permit:
+        response = w.serving_endpoints.query(
+            name=endpoint_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        content = response.choices[0].message.content
+        permit.tokens_used = prompt_tokens + ratelimit.estimate_tokens(content or "")
+    return content
 
 
 def extract_json(raw: str) -> dict | list:
@@ -156,6 +216,35 @@ def extract_json(raw: str) -> dict | list:
     )
 
 
+def call_llm_json(request: dict, accept=None, cache_refresh: bool = False):
+    """call_llm(**request), parsed with extract_json and then accept(result) if given.
+
+    A reply that fails to parse, or that accept rejects (ValueError, KeyError,
+    TypeError, AttributeError), is dropped from the LLM cache before the error
+    propagates, so the next call or --resume asks the endpoint again instead of
+    replaying it.
+    """
+    raw = call_llm(**request, cache_refresh=cache_refresh)
+    try:
+        result = extract_json(raw)
+        return accept(result) if accept else result
+    except (ValueError, KeyError, TypeError, AttributeError):   # json.JSONDecodeError included
+        llm_cache.discard(**request)
+        raise
+
+
+def _json_object(result: dict | list) -> dict:
+    """Accept only a JSON object reply."""
+    if not isinstance(result, dict):
+        raise ValueError(f"Expected a JSON object in the LLM response, got {type(result).__name__}")
+    return result
+
+
+def _items(result: dict | list) -> list:
+    """The item list of an {"items": [...]} (or bare list) reply."""
+    return result if isinstance(result, list) else result.get("items", [])
+
+
 def _close_truncated_json(s: str) -> str:
     """Attempt to close a truncated JSON string by appending missing closing chars.
 
@@ -200,7 +289,7 @@ def _repair_json_with_llm(malformed: str) -> dict | list:
     Caps input at 16 000 chars to stay within Haiku's context window.
     """
     print("  [JSON repair] Structural fix failed — calling Haiku to repair JSON...")
-    raw = call_llm(
+    request = dict(
         endpoint_name=HAIKU_ENDPOINT,
         system_prompt=(
             "You are a JSON repair tool. The user will give you a malformed or truncated "
@@ -213,14 +302,18 @@ def _repair_json_with_llm(malformed: str) -> dict | list:
         temperature=0.0,
         max_tokens=MAX_TOKENS["parser"],
     )
-    stripped = raw.strip()
+    stripped = call_llm(**request).strip()
     # Haiku should return raw JSON, but handle an accidental fence just in case
     fence = re.search(r"```(?:json)?\s*([\[{])", stripped, re.DOTALL)
     if fence:
         stripped = stripped[fence.start(1):]
         # Strip closing fence if present
         stripped = re.sub(r"\s*```\s*$", "", stripped)
-    return json.loads(stripped)
+    try:
+        return json.loads(stripped)
+    except json.JSONDecodeError:
+        llm_cache.discard(**request)
+        raise
 
 
 # ---------------------------------------------------------------------------
@@ -359,14 +452,13 @@ Notes:
 - domain_seeds: extract from all ### Domain: <domain_id> sections found in the brief
 - course_seeds: extract from ### Course 1 — [Title] through ### Course 5 — [Title]"""
 
-    raw = call_llm(
+    return call_llm_json(dict(
         endpoint_name=HAIKU_ENDPOINT,
         system_prompt=system_prompt,
         user_prompt=f"Extract structured fields from this brief excerpt:\n\n{text}",
         temperature=0.1,
         max_tokens=6000,
-    )
-    return extract_json(raw)
+    ), _json_object)
 
 
 def _parse_scenarios_and_reading(text: str) -> dict:
@@ -412,14 +504,13 @@ Notes:
 - reading_seeds: from ### Course N Reading sections; keys are "1" through "5" (strings)
 - If a course's scenario/reading is absent, use null for that key"""
 
-    raw = call_llm(
+    return call_llm_json(dict(
         endpoint_name=HAIKU_ENDPOINT,
         system_prompt=system_prompt,
         user_prompt=f"Extract scenario_seeds and reading_seeds from this brief excerpt:\n\n{text}",
         temperature=0.1,
         max_tokens=6000,
-    )
-    return extract_json(raw)
+    ), _json_object)
 
 
 def _parse_assessment(text: str) -> dict:
@@ -473,14 +564,13 @@ Notes:
 - For prompt_sandbox/micro_task: populate question_text; options=null, correct_option=null
 - If a section is absent, use null"""
 
-    raw = call_llm(
+    return call_llm_json(dict(
         endpoint_name=HAIKU_ENDPOINT,
         system_prompt=system_prompt,
         user_prompt=f"Extract diagnostic_seeds and evaluation_seeds from this brief excerpt:\n\n{text}",
         temperature=0.1,
         max_tokens=6000,
-    )
-    return extract_json(raw)
+    ), _json_object)
 
 
 def _llm_parse_brief(brief_text: str) -> dict:
@@ -493,9 +583,10 @@ def _llm_parse_brief(brief_text: str) -> dict:
     structural_text, scenario_reading_text, assessment_text = _split_brief_sections(brief_text)
 
     with ThreadPoolExecutor(max_workers=3) as executor:
-        f_structural = executor.submit(_parse_structural, structural_text)
-        f_scenarios = executor.submit(_parse_scenarios_and_reading, scenario_reading_text)
-        f_assessment = executor.submit(_parse_assessment, assessment_text)
+        # Each in a copy of the caller's context so --batch output labels carry over
+        f_structural = executor.submit(contextvars.copy_context().run, _parse_structural, structural_text)
+        f_scenarios = executor.submit(contextvars.copy_context().run, _parse_scenarios_and_reading, scenario_reading_text)
+        f_assessment = executor.submit(contextvars.copy_context().run, _parse_assessment, assessment_text)
 
         try:
             structural_result = f_structural.result(timeout=90)
@@ -637,14 +728,14 @@ Requirements:
 - All 5 course_ids must follow the pattern exactly.
 - Use the real_use_case strings verbatim (from the brief — these come from the EDC use case library)."""
 
-    raw = call_llm(
+    request = dict(
         endpoint_name=HAIKU_ENDPOINT,
         system_prompt=system_prompt,
         user_prompt=user_prompt,
         temperature=0.1,
         max_tokens=MAX_TOKENS["structural"],
     )
-    structural = extract_json(raw)
+    structural = call_llm_json(request, _json_object)
 
     # Validate course_ids — abort early rather than running 4 expensive Sonnet calls
     invalid_ids = [
@@ -652,6 +743,7 @@ Requirements:
         if not _validate_course_id(cid, role_prefix)
     ]
     if invalid_ids:
+        llm_cache.discard(**request)   # so the retry asks Haiku again
         print(
             f"\n  ERROR: Stage 2 produced invalid course_id(s): {invalid_ids}\n"
             f"  Expected pattern: {role_prefix}_c<N>_<domain_id>\n"
@@ -849,15 +941,16 @@ Reading seeds (check each has a concrete, named framework):
 
 Role: {spec.get("role_display_name") or spec.get("role_prefix", "unknown")}"""
 
-    raw = call_llm(
-        endpoint_name=SONNET_ENDPOINT,
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
-        temperature=0.1,
-        max_tokens=MAX_TOKENS["qa"],
+    return call_llm_json(
+        dict(
+            endpoint_name=SONNET_ENDPOINT,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=0.1,
+            max_tokens=MAX_TOKENS["qa"],
+        ),
+        lambda result: result.get("flags", []),
     )
-    result = extract_json(raw)
-    return result.get("flags", [])
 
 
 def generate_followup_prompt(flags: list[dict], brief_filepath: str) -> str:
@@ -1085,15 +1178,16 @@ Write production-quality content. Requirements:
 - coach system prompt must include the data safety guardrail instruction
 - takeaway: one practical sentence summarising the most important point"""
 
-    raw = call_llm(
-        endpoint_name=SONNET_ENDPOINT,
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
-        temperature=0.7,
-        max_tokens=MAX_TOKENS["course_content"],
+    return call_llm_json(
+        dict(
+            endpoint_name=SONNET_ENDPOINT,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=0.7,
+            max_tokens=MAX_TOKENS["course_content"],
+        ),
+        lambda result: (result["reading_content"], result["practice_scenario"]),
     )
-    result = extract_json(raw)
-    return result["reading_content"], result["practice_scenario"]
 
 
 # ---------------------------------------------------------------------------
@@ -1169,18 +1263,19 @@ Scenario seeds (use for realistic context ideas — adapt to diagnostic format,
 Produce exactly 3 items per domain: 1 MCQ + 1 prompt_sandbox + 1 micro_task.
 Items must test concepts genuinely relevant to this role's work, not generic AI knowledge."""
 
+    request = dict(
+        endpoint_name=SONNET_ENDPOINT,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        temperature=0.3,
+        max_tokens=MAX_TOKENS["assessment"],
+    )
     for attempt in range(1, 4):  # up to 3 attempts
-        raw = call_llm(
-            endpoint_name=SONNET_ENDPOINT,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.3,
-            max_tokens=MAX_TOKENS["assessment"],
-        )
-        result = extract_json(raw)
-        items = result if isinstance(result, list) else result.get("items", [])
+        # A retry resends the same prompt, so it must skip the (rejected) cached reply
+        items = call_llm_json(request, _items, cache_refresh=attempt > 1)
         if len(items) >= 12:
             return items
+        llm_cache.discard(**request)
         print(
             f"  [diagnostic retry {attempt}/3] Got {len(items)} items, expected 12 — retrying..."
         )
@@ -1189,18 +1284,20 @@ Items must test concepts genuinely relevant to this role's work, not generic AI
 
 
 # ---------------------------------------------------------------------------
-# Stage 6 — Evaluation Designer (20 items, sequential after Stage 4)
+# Stage 6 — Evaluation Designer (4 items per course, each after its Stage 4 agent)
 # ---------------------------------------------------------------------------
 
 
 def generate_evaluation_items(
-    course_contents: dict[int, tuple[dict, dict]],
+    course_pos: int,
+    reading: dict,
     spec: dict,
     shared_context: dict,
 ) -> list[dict]:
-    """Generate 20 evaluation items: 4 per course (3 MCQ + 1 performance_task).
+    """Generate one course's 4 evaluation items (3 MCQ + 1 performance_task).
 
-    Runs after Stage 4 so it can align MCQs with what the reading concepts teach.
+    Runs as soon as that course's Stage 4 agent finishes, so it can align MCQs
+    with what the reading concept teaches without waiting for the other courses.
     """
     try:
         rm_eval = json.loads(
@@ -1216,18 +1313,16 @@ def generate_evaluation_items(
     )
     rm_eval_ex = json.dumps(rm_eval_ex_list[:2], indent=2)[:1000]
 
-    # Build compact reading summaries to feed to the evaluation designer
-    reading_summaries: dict[str, dict] = {}
-    for pos, (reading, _) in course_contents.items():
-        cid = reading.get("course_id", shared_context["course_id_map"].get(pos, ""))
-        reading_summaries[cid] = {
-            "concept_text_excerpt": (reading.get("concept_text") or "")[:300],
-            "takeaway": reading.get("takeaway") or "",
-        }
+    course_id = reading.get("course_id", shared_context["course_id_map"].get(course_pos, ""))
+    reading_summary = {
+        "concept_text_excerpt": (reading.get("concept_text") or "")[:300],
+        "takeaway": reading.get("takeaway") or "",
+    }
+    company_name = shared_context["company_map"].get(course_pos, "")
 
     system_prompt = f"""\
 You are an evaluation designer for AI Hero Academy, an AI skills training program.
-You generate post-module quiz items that verify learners absorbed each course's reading content.
+You generate post-module quiz items that verify learners absorbed a course's reading content.
 
 ITEM TYPE REQUIREMENTS:
 - mcq (sequence 1–3): 4 options (A–D). correct_option = label.
@@ -1251,47 +1346,46 @@ FEW-SHOT EXAMPLE (RM role):
 
 Return ONLY a valid JSON object inside a fenced json code block. No text outside the block.
 
-Output: {{"items": [<20 item objects>]}}
-Order: all 4 items for Course 1 first, then Course 2, ..., Course 5.
+Output: {{"items": [<4 item objects>]}}
+Order: sequence 1, 2, 3, 4.
 Each item: {{item_id, course_id, item_type, sequence, question_text, scenario_text,
              options, correct_option, explanation, scoring_rubric}}"""
 
     user_prompt = f"""\
-Generate 20 evaluation items for:
+Generate 4 evaluation items for:
 
 role: {shared_context["role_display_name"]}
 role_prefix: {shared_context["role_prefix"]}
 
 Course ID map (sequence_order → course_id):
-{json.dumps(shared_context["course_id_map"], indent=2)}
+{json.dumps({course_pos: course_id}, indent=2)}
 
-Reading content summaries (MCQs MUST test what these concepts explicitly teach):
-{json.dumps(reading_summaries, indent=2)}
+Reading content summary (MCQs MUST test what this concept explicitly teaches):
+{json.dumps(reading_summary, indent=2)}
 
-Company map (use these fictional companies in performance task scenarios):
-{json.dumps(shared_context["company_map"], indent=2)}
+Company (use this fictional company in the performance task scenario): {company_name}
 
-Produce 4 items per course (3 MCQ + 1 performance_task).
-MCQ questions must be clearly answerable from the reading content of that course.
+Produce 3 MCQ + 1 performance_task.
+MCQ questions must be clearly answerable from the reading content of this course.
 Performance task must present a NEW scenario (different from the practice scenario)
 requiring the learner to apply the full course concept from scratch."""
 
+    request = dict(
+        endpoint_name=SONNET_ENDPOINT,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        temperature=0.3,
+        max_tokens=MAX_TOKENS["evaluation"],
+    )
     for attempt in range(1, 4):  # up to 3 attempts
-        raw = call_llm(
-            endpoint_name=SONNET_ENDPOINT,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.3,
-            max_tokens=MAX_TOKENS["evaluation"],
-        )
-        result = extract_json(raw)
-        items = result if isinstance(result, list) else result.get("items", [])
-        if len(items) >= 20:
-            return items
+        items = call_llm_json(request, _items, cache_refresh=attempt > 1)
+        if len(items) >= 4:
+            return items[:4]
+        llm_cache.discard(**request)
         print(
-            f"  [evaluation retry {attempt}/3] Got {len(items)} items, expected 20 — retrying..."
+            f"  [evaluation retry {attempt}/3] {course_id}: got {len(items)} items, expected 4 — retrying..."
         )
-    print(f"  WARNING: Could not generate 20 evaluation items after 3 attempts; got {len(items)}")
+    print(f"  WARNING: Could not generate 4 evaluation items for {course_id} after 3 attempts; got {len(items)}")
     return items
 
 
@@ -1426,15 +1520,17 @@ Sample evaluation items (first 4):
 Sample diagnostic items (first 3):
 {diag_sample}"""
 
-    raw = call_llm(
+    request = dict(
         endpoint_name=SONNET_ENDPOINT,
         system_prompt=system_prompt,
         user_prompt=user_prompt,
         temperature=0.1,
         max_tokens=MAX_TOKENS["final_qa"],
     )
-    result = extract_json(raw)
-    return result.get("issues", [])
+    issues = call_llm_json(request, lambda result: result.get("issues", []))
+    if issues:
+        llm_cache.discard(**request)   # a failed verdict is not replayed: --resume asks again
+    return issues
 
 
 # ---------------------------------------------------------------------------
@@ -1442,29 +1538,50 @@ Sample diagnostic items (first 3):
 # ---------------------------------------------------------------------------
 
 
-def assemble_and_write(
+OUTPUT_FILES = [
+    "roles.json",
+    "domains.json",
+    "courses.json",
+    "reading_content.json",
+    "practice_scenarios.json",
+    "diagnostic_items.json",
+    "evaluation_items.json",
+]
+
+
+class RoleCollisionError(Exception):
+    """The role being merged already has entries in the content files."""
+
+
+def load_content_files(content_dir: Path) -> dict:
+    """Read the 7 content JSON files into {filename: data}."""
+    return {
+        name: json.loads((content_dir / name).read_text(encoding="utf-8"))
+        for name in OUTPUT_FILES
+    }
+
+
+def merge_role(
+    content: dict,
     structural: dict,
     all_outputs: dict,
     shared_context: dict,
-    content_dir: Path,
-) -> None:
-    """Merge new role entries into existing content/ JSON files and write atomically.
+) -> dict:
+    """Return content ({filename: data}) with one new role's entries merged in.
 
-    Never overwrites existing role entries. Guards against role_prefix collision.
+    Never overwrites existing role entries: raises RoleCollisionError if the
+    role_prefix or any of its domain keys is already present. content itself
+    is not modified.
     """
     role_prefix = shared_context["role_prefix"]
 
     # --- Collision guard ---
-    existing_roles = json.loads(
-        (content_dir / "roles.json").read_text(encoding="utf-8")
-    )
+    existing_roles = content["roles.json"]
     if role_prefix in existing_roles:
-        print(
-            f"ERROR: role_prefix '{role_prefix}' already exists in roles.json.\n"
-            "       Aborting to prevent overwriting existing content.",
-            file=sys.stderr,
+        raise RoleCollisionError(
+            f"role_prefix '{role_prefix}' already exists in roles.json.\n"
+            "       Aborting to prevent overwriting existing content."
         )
-        sys.exit(1)
 
     # --- Prepare merged data for each file ---
 
@@ -1475,51 +1592,36 @@ def assemble_and_write(
     # domains.json — Stage 2 generates flat keys ("prompting", "verification", …).
     # Prefix them with role_prefix to produce role-scoped keys ("uw_prompting", …)
     # before merging, so entries from different roles never collide.
-    existing_domains = json.loads(
-        (content_dir / "domains.json").read_text(encoding="utf-8")
-    )
+    existing_domains = content["domains.json"]
     new_domain_entries = structural.get("domain_entries", {})
     scoped_domain_entries = {
         f"{role_prefix}_{k}": v for k, v in new_domain_entries.items()
     }
     domain_collisions = [k for k in scoped_domain_entries if k in existing_domains]
     if domain_collisions:
-        print(
-            f"ERROR: domain key(s) {domain_collisions!r} already exist in domains.json.\n"
-            f"       Role '{role_prefix}' has already been added. Aborting to prevent overwrite.",
-            file=sys.stderr,
+        raise RoleCollisionError(
+            f"domain key(s) {domain_collisions!r} already exist in domains.json.\n"
+            f"       Role '{role_prefix}' has already been added. Aborting to prevent overwrite."
         )
-        sys.exit(1)
     new_domains = dict(existing_domains)
     new_domains.update(scoped_domain_entries)
 
     # courses.json
-    existing_courses = json.loads(
-        (content_dir / "courses.json").read_text(encoding="utf-8")
-    )
-    new_courses = dict(existing_courses)
+    new_courses = dict(content["courses.json"])
     new_courses.update(structural.get("course_entries", {}))
 
     # reading_content.json
-    existing_reading = json.loads(
-        (content_dir / "reading_content.json").read_text(encoding="utf-8")
-    )
-    new_reading = dict(existing_reading)
+    new_reading = dict(content["reading_content.json"])
     for reading, _ in all_outputs["course_contents"].values():
         new_reading[reading["course_id"]] = reading
 
     # practice_scenarios.json
-    existing_scenarios = json.loads(
-        (content_dir / "practice_scenarios.json").read_text(encoding="utf-8")
-    )
-    new_scenarios = dict(existing_scenarios)
+    new_scenarios = dict(content["practice_scenarios.json"])
     for _, scenario in all_outputs["course_contents"].values():
         new_scenarios[scenario["course_id"]] = scenario
 
     # diagnostic_items.json (list format)
-    existing_diag = json.loads(
-        (content_dir / "diagnostic_items.json").read_text(encoding="utf-8")
-    )
+    existing_diag = content["diagnostic_items.json"]
     # Inject role_id into every new diagnostic item
     new_diag_items = [
         {**item, "role_id": role_prefix} for item in all_outputs["diagnostic_items"]
@@ -1536,29 +1638,56 @@ def assemble_and_write(
             new_diag[item["item_id"]] = item
 
     # evaluation_items.json (dict keyed by course_id)
-    existing_eval = json.loads(
-        (content_dir / "evaluation_items.json").read_text(encoding="utf-8")
-    )
-    new_eval = dict(existing_eval)
+    new_eval = dict(content["evaluation_items.json"])
     eval_by_course: dict[str, list] = {}
     for item in all_outputs["evaluation_items"]:
         cid = item.get("course_id", "unknown")
         eval_by_course.setdefault(cid, []).append(item)
     new_eval.update(eval_by_course)
 
-    # --- Write all 7 files atomically ---
-    writes = [
-        (content_dir / "roles.json", new_roles),
-        (content_dir / "domains.json", new_domains),
-        (content_dir / "courses.json", new_courses),
-        (content_dir / "reading_content.json", new_reading),
-        (content_dir / "practice_scenarios.json", new_scenarios),
-        (content_dir / "diagnostic_items.json", new_diag),
-        (content_dir / "evaluation_items.json", new_eval),
-    ]
+    return {
+        "roles.json": new_roles,
+        "domains.json": new_domains,
+        "courses.json": new_courses,
+        "reading_content.json": new_reading,
+        "practice_scenarios.json": new_scenarios,
+        "diagnostic_items.json": new_diag,
+        "evaluation_items.json": new_eval,
+    }
 
-    for filepath, data in writes:
-        atomic_write_json(str(filepath), data)
+
+def write_content_files(content_dir: Path, content: dict) -> dict:
+    """Write all 7 files atomically, then the snapshot + manifest. Returns the manifest."""
+    for name in OUTPUT_FILES:
+        atomic_write_json(str(content_dir / name), content[name])
+    # Binary snapshot, then the manifest last: running app processes reload the bundle when it changes
+    return write_manifest(content_dir)
+
+
+def _print_next_step() -> None:
+    print("NEXT STEP: Sync content/ to the running app — processes reload it within")
+    print("  CONTENT_RELOAD_SECONDS of the manifest changing; no redeploy needed.")
+    print("  bash scripts/sync_deploy.sh")
+    print()
+
+
+def assemble_and_write(
+    structural: dict,
+    all_outputs: dict,
+    shared_context: dict,
+    content_dir: Path,
+) -> None:
+    """Merge new role entries into existing content/ JSON files and write atomically.
+
+    Never overwrites existing role entries. Guards against role_prefix collision.
+    """
+    role_prefix = shared_context["role_prefix"]
+    try:
+        content = merge_role(load_content_files(content_dir), structural, all_outputs, shared_context)
+    except RoleCollisionError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(1)
+    manifest = write_content_files(content_dir, content)
 
     # --- Completion summary ---
     print()
@@ -1568,8 +1697,9 @@ def assemble_and_write(
     print(f"  Role: {shared_context['role_display_name']} ({role_prefix})")
     print()
     print(f"Files written to {content_dir}/:")
-    for filepath, _ in writes:
-        print(f"  ✓  {filepath.name}")
+    for name in OUTPUT_FILES:
+        print(f"  ✓  {name}")
+    print(f"  ✓  manifest.json  (content v{manifest['version']}, {manifest['content_hash'][:12]})")
     print()
     print("Entries added:")
     print(f"  roles.json              +1  (role: {role_prefix})")
@@ -1580,72 +1710,359 @@ def assemble_and_write(
     print(f"  diagnostic_items.json  +12")
     print(f"  evaluation_items.json  +20  (5 course groups)")
     print()
-    print("NEXT STEP: Deploy the updated app bundle so the new content/ JSON files are served.")
-    print("  bash scripts/sync_deploy.sh")
-    print()
+    _print_next_step()
 
 
 # ---------------------------------------------------------------------------
-# Main orchestrator
+# Task graph scheduler (Stages 4–6)
 # ---------------------------------------------------------------------------
 
 
-def main() -> None:
-    # Ensure UTF-8 output on Windows (symbols like ✓ ✗ ⚠ fail in cp1252 terminal)
-    if hasattr(sys.stdout, "buffer") and getattr(sys.stdout, "encoding", "utf-8").lower() != "utf-8":
-        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+class TaskFailedError(Exception):
+    """A task in run_task_graph raised; the original exception is __cause__."""
 
-    cli = argparse.ArgumentParser(
-        description=(
-            "Generate AI Hero Academy course content from a Course Design Brief.\n"
-            "Produces all 7 role-specific JSON files in content/."
+    def __init__(self, task: str):
+        super().__init__(task)
+        self.task = task
+
+
+class TaskTimeoutError(Exception):
+    """A task in run_task_graph ran longer than its timeout."""
+
+    def __init__(self, task: str):
+        super().__init__(task)
+        self.task = task
+
+
+def run_task_graph(
+    tasks: dict,
+    max_workers: int = 3,
+    timeout: float = PARALLEL_TIMEOUT_SECONDS,
+    on_result=None,
+) -> dict:
+    """Run {name: (dependency names, fn)} on a thread pool as dependencies complete.
+
+    fn receives the dict of results finished so far (all of its dependencies
+    included). At most max_workers tasks are in flight; when several are ready,
+    the one listed first in tasks starts first. on_result(name, result) is called
+    on this thread as each task finishes. Raises TaskFailedError or
+    TaskTimeoutError (per-task timeout, measured from its start) at once, without
+    waiting for tasks still running, and cancels everything not yet started.
+    """
+    results: dict = {}
+    pending = dict(tasks)
+    running: dict = {}   # future -> (name, started_at)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            for name, (deps, fn) in list(pending.items()):
+                if len(running) >= max_workers:
+                    break
+                if all(d in results for d in deps):
+                    del pending[name]
+                    future = executor.submit(contextvars.copy_context().run, fn, results)
+                    running[future] = (name, time.monotonic())
+            if not running:
+                raise ValueError(f"Unsatisfiable task dependencies: {sorted(pending)}")
+
+            deadline = min(started for _, started in running.values()) + timeout
+            done, _ = wait(running, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                oldest = min(running.values(), key=lambda r: r[1])[0]
+                raise TaskTimeoutError(oldest)
+            for future in done:
+                name, _ = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as exc:
+                    raise TaskFailedError(name) from exc
+                if on_result:
+                    on_result(name, results[name])
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Stage checkpoints (--resume / --from-stage)
+# ---------------------------------------------------------------------------
+
+
+def _input_hash(*inputs: object) -> str:
+    """Fingerprint of a stage's inputs; a checkpoint is reused only while this matches."""
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _int_keys(d: dict) -> dict:
+    # JSON turns the int course positions of course_id_map / company_map into strings
+    return {int(k): v for k, v in d.items()}
+
+
+def _decode_stage2(output: list) -> tuple[dict, dict]:
+    structural, shared_context = output
+    for key in ("company_map", "course_id_map", "real_use_cases"):
+        shared_context[key] = _int_keys(shared_context[key])
+    return structural, shared_context
+
+
+class RunCheckpoints:
+    """Stage outputs of one pipeline run, stored as JSON files in RUNS_DIR/<run_id>/.
+
+    Each file records the stage number, the hash of the stage's inputs and its
+    output. load() returns the output only while the inputs hash matches and
+    the stage is below --from-stage, so an edited brief or spec re-runs exactly
+    the stages downstream of the change.
+    """
+
+    def __init__(self, run_id: str, from_stage: int | None = None):
+        self.run_id = run_id
+        self.run_dir = RUNS_DIR / run_id
+        self.from_stage = from_stage
+        self.current_stage = 0          # set by run_pipeline(); reported on failure in --batch
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+
+    def read_meta(self) -> dict:
+        try:
+            return json.loads((self.run_dir / "run.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def write_meta(self, **fields) -> None:
+        atomic_write_json(str(self.run_dir / "run.json"), {**self.read_meta(), **fields})
+
+    def load(self, name: str, stage: int, input_hash: str):
+        if self.from_stage and stage >= self.from_stage:
+            return None
+        try:
+            ckpt = json.loads((self.run_dir / f"{name}.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if ckpt.get("input_hash") != input_hash:
+            return None
+        return ckpt["output"]
+
+    def save(self, name: str, stage: int, input_hash: str, output: object) -> None:
+        atomic_write_json(
+            str(self.run_dir / f"{name}.json"),
+            {"stage": stage, "input_hash": input_hash, "saved_at": time.time(), "output": output},
         )
+
+    def run(self, name: str, stage: int, inputs: tuple, compute, decode=None, keep=None):
+        """Return the checkpointed output of a stage, or compute and checkpoint it.
+
+        An output for which keep(output) is false (e.g. a failed QA verdict) is
+        neither reused nor checkpointed, so --resume runs that stage again.
+        """
+        input_hash = _input_hash(*inputs)
+        output = self.load(name, stage, input_hash)
+        if output is not None and (keep is None or keep(output)):
+            # One write per line: Stage 4–6 tasks call this from worker threads
+            print(f"  ↺ Reusing checkpoint {name} (inputs unchanged)\n", end="")
+            return decode(output) if decode else output
+        output = compute()
+        if keep is None or keep(output):
+            self.save(name, stage, input_hash, output)
+        return output
+
+
+def _new_run_id(brief_path: str) -> str:
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "-", Path(brief_path).stem).strip("-") or "brief"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{stem}"
+
+
+def _latest_run_id() -> str | None:
+    runs = sorted(
+        (d for d in RUNS_DIR.glob("*") if (d / "run.json").exists()),
+        key=lambda d: (d / "run.json").stat().st_mtime,
     )
-    cli.add_argument(
-        "brief_filepath",
-        help="Path to the Course Design Brief markdown file",
-    )
-    cli.add_argument(
-        "--output-dir",
-        metavar="DIR",
-        default=None,
-        help=(
-            "Write output JSON files to DIR instead of content/. "
-            "Existing content/*.json files are copied to DIR first so Stage 8 "
-            "can merge safely. Useful for test runs that must not touch real content."
-        ),
-    )
-    args = cli.parse_args()
+    return runs[-1].name if runs else None
 
-    brief_path = args.brief_filepath
-    if not os.path.exists(brief_path):
-        print(f"ERROR: Brief file not found: {brief_path}", file=sys.stderr)
-        sys.exit(1)
 
-    # Resolve output directory (default: content/)
-    if args.output_dir:
-        import shutil as _shutil
-        content_dir = Path(args.output_dir)
-        content_dir.mkdir(parents=True, exist_ok=True)
-        for _src in CONTENT_DIR.glob("*.json"):
-            _dst = content_dir / _src.name
-            if not _dst.exists():
-                _shutil.copy(_src, _dst)
-    else:
-        content_dir = CONTENT_DIR
+# ---------------------------------------------------------------------------
+# Batch mode (--batch)
+# ---------------------------------------------------------------------------
+
+# Label of the brief whose pipeline is printing on this thread (batch mode only)
+_output_label: contextvars.ContextVar[str | None] = contextvars.ContextVar("output_label", default=None)
+
+
+class _LabelledStream:
+    """stdout/stderr proxy that prefixes each line with the current brief's label.
+
+    Concurrent pipelines print whole lines tagged [<brief>] instead of interleaving
+    mid-line. Agent threads inherit the label because run_task_graph and the
+    Stage 1 parser pool submit work inside a copy of the caller's context.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._partial: dict[str, str] = {}
+
+    def write(self, text: str) -> int:
+        label = _output_label.get()
+        if label is None:
+            return self._stream.write(text)
+        with self._lock:
+            *lines, rest = (self._partial.get(label, "") + text).split("\n")
+            self._partial[label] = rest
+            for line in lines:
+                self._stream.write(f"[{label}] {line}\n")
+        return len(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _collect_briefs(paths: list[str]) -> list[str]:
+    """Expand directories to their *.md briefs (sorted); keep files as given."""
+    briefs: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            briefs.extend(str(p) for p in sorted(Path(path).glob("*.md")))
+        else:
+            briefs.append(path)
+    return briefs
+
+
+def run_batch(brief_paths: list[str], content_dir: Path, workers: int) -> int:
+    """Run one pipeline per brief concurrently and merge every successful role in one write.
+
+    All pipelines share the process-wide per-endpoint rate limiters. Each brief
+    gets its own checkpointed run (<batch_id>-<brief>), so a failed role can be
+    finished later with --resume. Returns the process exit code: 0 only if every
+    role was written.
+    """
+    batch_id = time.strftime("%Y%m%d-%H%M%S")
+    sys.stdout = _LabelledStream(sys.stdout)
+    sys.stderr = _LabelledStream(sys.stderr)
+
+    print(f"[Batch {batch_id}] {len(brief_paths)} brief(s), {workers} at a time → {content_dir}")
+    print()
+
+    def _run_one(brief_path: str) -> dict:
+        label = re.sub(r"[^A-Za-z0-9_-]+", "-", Path(brief_path).stem).strip("-") or "brief"
+        _output_label.set(label)
+        checkpoints = RunCheckpoints(f"{batch_id}-{label}")
+        checkpoints.write_meta(
+            run_id=checkpoints.run_id,
+            batch_id=batch_id,
+            brief_filepath=os.path.abspath(brief_path),
+            output_dir=str(content_dir.resolve()),
+        )
+        resume_cmd = f"python scripts/generate_course_content.py --resume {checkpoints.run_id}"
+        report = {"brief": brief_path, "run_id": checkpoints.run_id, "role_prefix": None}
+        t0 = time.monotonic()
+        try:
+            structural, all_outputs, shared_context = run_pipeline(brief_path, checkpoints, resume_cmd)
+            report.update(status="generated", role_prefix=shared_context["role_prefix"],
+                          outputs=(structural, all_outputs, shared_context))
+        except PipelineStageError as exc:
+            report.update(status="needs_brief_update" if exc.exit_code == 0 else "failed",
+                          stage=exc.stage, error=str(exc))
+        except (Exception, SystemExit) as exc:   # stage helpers still sys.exit() on fatal errors
+            report.update(status="failed", stage=checkpoints.current_stage,
+                          error=str(exc) if isinstance(exc, Exception) else f"exited with code {exc.code}")
+        report["duration_s"] = round(time.monotonic() - t0, 1)
+        if report["status"] != "generated":
+            print(f"✗ Stopped at Stage {report['stage']}: {report['error']}")
+        return report
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _run_one, b) for b in brief_paths]
+        reports = [f.result() for f in futures]
+
+    # ── Stage 8: merge every generated role, in brief order, then one write ──
+    print()
+    print(f"[Stage 8] Merging generated roles into {content_dir}...")
+    content = load_content_files(content_dir)
+    merged_roles = []
+    for report in reports:
+        outputs = report.pop("outputs", None)
+        if outputs is None:
+            continue
+        try:
+            content = merge_role(content, *outputs)
+        except RoleCollisionError as exc:
+            # A resume would reach the same collision; the role key itself has to change
+            report.update(
+                status="failed", stage=8, error=str(exc).split("\n")[0],
+                next_step=(
+                    f"choose a different role_prefix in the brief header, or remove the existing "
+                    f"'{report['role_prefix']}' role from {content_dir}"
+                ),
+            )
+            continue
+        report["status"] = "written"
+        merged_roles.append(report["role_prefix"])
+    manifest = write_content_files(content_dir, content) if merged_roles else None
 
+    # ── Report ──
     print()
     print("=" * 60)
-    print("AI HERO ACADEMY — Course Content Generation Pipeline")
+    print(f"BATCH {batch_id} COMPLETE — {len(merged_roles)}/{len(reports)} role(s) written")
     print("=" * 60)
-    print(f"  Brief: {brief_path}")
-    if args.output_dir:
-        print(f"  Output: {content_dir}  (test mode — real content/ not modified)")
+    for report in reports:
+        mark = "✓" if report["status"] == "written" else "✗"
+        detail = ""
+        if report["status"] != "written":
+            report.setdefault("next_step", f"resume: --resume {report['run_id']}")
+            detail = f"Stage {report['stage']}: {report['error']}  ({report['next_step']})"
+        print(
+            f"  {mark} {(report['role_prefix'] or '?'):<6} {report['status']:<18} "
+            f"{report['duration_s']:>7.1f}s  {Path(report['brief']).name}  {detail}"
+        )
+    if manifest:
+        print()
+        print(f"  Files written to {content_dir}/ — content v{manifest['version']}, {manifest['content_hash'][:12]}")
+    report_path = RUNS_DIR / f"batch-{batch_id}.json"
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(str(report_path), {
+        "batch_id": batch_id,
+        "content_dir": str(content_dir),
+        "manifest": manifest,
+        "roles": reports,
+    })
+    print(f"  Report: {report_path}")
     print()
+    if merged_roles:
+        _print_next_step()
+    return 0 if len(merged_roles) == len(reports) else 1
+
+
+# ---------------------------------------------------------------------------
+# Main orchestrator
+# ---------------------------------------------------------------------------
+
+
+class PipelineStageError(Exception):
+    """A pipeline stage stopped the run; details have already been printed."""
+
+    def __init__(self, stage: int, message: str, exit_code: int = 1):
+        super().__init__(message)
+        self.stage = stage
+        self.exit_code = exit_code
+
 
+def run_pipeline(
+    brief_path: str,
+    checkpoints: RunCheckpoints,
+    resume_cmd: str,
+) -> tuple[dict, dict, dict]:
+    """Run Stages 1–7 for one brief and return (structural, all_outputs, shared_context).
+
+    Raises PipelineStageError when a stage stops the run (Stage 3 gaps, a failed
+    or timed-out agent, Stage 7 QA); checkpoints.current_stage tracks progress.
+    """
     # ── Stage 1: Parse brief ──────────────────────────────────────────────
+    checkpoints.current_stage = 1
     print("[Stage 1] Parsing brief...")
-    spec = parse_brief(brief_path)
+    brief_text = Path(brief_path).read_text(encoding="utf-8")
+    spec = checkpoints.run("stage1_spec", 1, (brief_text,), lambda: parse_brief(brief_path))
     role_prefix = spec.get("role_prefix") or "?"
     role_display = spec.get("role_display_name") or role_prefix.upper()
     print(f"  Role detected: {role_display} ({role_prefix})")
@@ -1654,88 +2071,106 @@ def main() -> None:
     print()
 
     # ── Stage 2: Structural generator ────────────────────────────────────
+    checkpoints.current_stage = 2
     print("[Stage 2] Generating structural JSON (roles / domains / courses)...")
-    structural, shared_context = generate_structural_json(spec)
+    structural, shared_context = checkpoints.run(
+        "stage2_structural", 2, (spec,),
+        lambda: generate_structural_json(spec), decode=_decode_stage2,
+    )
     print(f"  course_id_map: {shared_context['course_id_map']}")
     print()
 
     # ── Stage 3: QA gap check ─────────────────────────────────────────────
+    checkpoints.current_stage = 3
     print("[Stage 3] Running QA gap check...")
-    passed, flags = qa_gap_check(spec, structural)
+    passed, flags = checkpoints.run(
+        "stage3_qa_gap", 3, (spec, structural), lambda: qa_gap_check(spec, structural),
+    )
     if not passed:
         followup = generate_followup_prompt(flags, brief_path)
         print(followup)
-        sys.exit(0)
+        raise PipelineStageError(3, f"QA gap check flagged {len(flags)} gap(s) in the brief", exit_code=0)
     print("  ✓ QA gap check PASSED — proceeding to content generation")
     print()
 
-    # ── Stages 4 + 5: Parallel content generation ────────────────────────
-    print("[Stage 4+5] Generating course content + diagnostic items in parallel...")
-    print(f"  Agents: 5 course content (Sonnet) + 1 assessment designer (Sonnet)")
-    print(f"  max_workers=3 (rate-limit safe at ~2 req/s)")
+    # ── Stages 4–6: Content generation as a dependency graph ─────────────
+    # Course agents and the assessment designer start immediately; each course's
+    # evaluation designer starts as soon as that course is done, alongside the
+    # remaining Stage 4 work, so the critical path is the slowest single course.
+    checkpoints.current_stage = 4
+    print("[Stage 4–6] Generating course content, diagnostic items and evaluation items...")
+    print(f"  Agents: 5 course content + 1 assessment designer + 5 evaluation designers (Sonnet)")
+    print(f"  Adaptive per-endpoint concurrency (starts at 3, ~2 req/s); evaluation starts per course as it finishes")
     print()
 
-    course_contents: dict[int, tuple[dict, dict]] = {}
-    diagnostic_items: list[dict] = []
+    agent_inputs = (spec, shared_context)
+
+    def _course_task(pos: int):
+        return lambda results: checkpoints.run(
+            f"stage4_course{pos}", 4, agent_inputs,
+            lambda: generate_course_content(pos, spec, shared_context), decode=tuple,
+        )
+
+    def _evaluation_task(pos: int):
+        def run(results):
+            reading, _ = results[f"course{pos}"]
+            return checkpoints.run(
+                f"stage6_evaluation_course{pos}", 6, (reading, *agent_inputs),
+                lambda: generate_evaluation_items(pos, reading, spec, shared_context),
+            )
+        return run
+
+    # Listed in scheduling priority: a ready evaluation task goes before any waiting course
+    # task, and the (independent, longest) assessment designer starts in the first wave
+    tasks: dict[str, tuple[tuple[str, ...], object]] = {}
+    for pos in range(1, 6):
+        tasks[f"evaluation{pos}"] = ((f"course{pos}",), _evaluation_task(pos))
+    tasks["diagnostics"] = ((), lambda results: checkpoints.run(
+        "stage5_diagnostics", 5, agent_inputs,
+        lambda: generate_diagnostic_items(spec, shared_context),
+    ))
+    for pos in range(1, 6):
+        tasks[f"course{pos}"] = ((), _course_task(pos))
+
+    def _on_result(name: str, result) -> None:
+        if name == "diagnostics":
+            print(f"  ✓ Diagnostic items done  ({len(result)} items)")
+        elif name.startswith("course"):
+            pos = int(name[len("course"):])
+            reading, _ = result
+            print(
+                f"  ✓ Course {pos} done  "
+                f"({reading.get('content_id', shared_context['course_id_map'].get(pos, ''))})"
+            )
+        else:
+            pos = int(name[len("evaluation"):])
+            print(f"  ✓ Evaluation items for course {pos} done  ({len(result)} items)")
 
     try:
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_map: dict = {}
-
-            # Submit 5 course content agents
-            for pos in range(1, 6):
-                f = executor.submit(generate_course_content, pos, spec, shared_context)
-                future_map[f] = pos
-                cid = shared_context["course_id_map"].get(pos, f"course_{pos}")
-                company = shared_context["company_map"].get(pos, "?")
-                print(f"  → Submitted: Course {pos} — {cid}  [{company}]")
-
-            # Submit assessment designer
-            diag_future = executor.submit(generate_diagnostic_items, spec, shared_context)
-            future_map[diag_future] = "diagnostics"
-            print(f"  → Submitted: Diagnostic items (12 items)")
-            print()
-
-            for future in as_completed(future_map, timeout=PARALLEL_TIMEOUT_SECONDS * 2):
-                key = future_map[future]
-                try:
-                    result = future.result(timeout=PARALLEL_TIMEOUT_SECONDS)
-                    if key == "diagnostics":
-                        diagnostic_items = result
-                        print(f"  ✓ Diagnostic items done  ({len(result)} items)")
-                    else:
-                        course_contents[key] = result
-                        reading, _ = result
-                        print(
-                            f"  ✓ Course {key} done  "
-                            f"({reading.get('content_id', shared_context['course_id_map'].get(key, ''))})"
-                        )
-                except FuturesTimeoutError:
-                    print(
-                        f"\nERROR: Agent for '{key}' timed out "
-                        f"({PARALLEL_TIMEOUT_SECONDS}s). Aborting.",
-                        file=sys.stderr,
-                    )
-                    raise SystemExit(1)
-                except Exception as exc:
-                    print(
-                        f"\nERROR: Agent for '{key}' failed: {exc}", file=sys.stderr
-                    )
-                    raise SystemExit(1)
-    except FuturesTimeoutError:
-        # as_completed(timeout=...) raises TimeoutError at the iterator level (not inside the loop)
+        results = run_task_graph(tasks, max_workers=MAX_WORKERS, on_result=_on_result)
+    except TaskTimeoutError as exc:
         print(
-            f"\nERROR: Parallel agent pool timed out after {PARALLEL_TIMEOUT_SECONDS * 2}s. "
-            "Not all agents completed. Aborting.",
+            f"\nERROR: Agent for '{exc.task}' timed out "
+            f"({PARALLEL_TIMEOUT_SECONDS}s). Aborting.\n"
+            f"  Finished agents are checkpointed — resume with: {resume_cmd}",
             file=sys.stderr,
         )
-        raise SystemExit(1)
-
-    print()
+        raise PipelineStageError(4, f"agent '{exc.task}' timed out") from exc
+    except TaskFailedError as exc:
+        print(
+            f"\nERROR: Agent for '{exc.task}' failed: {exc.__cause__}\n"
+            f"  Finished agents are checkpointed — resume with: {resume_cmd}",
+            file=sys.stderr,
+        )
+        raise PipelineStageError(4, f"agent '{exc.task}' failed: {exc.__cause__}") from exc
 
-    # ── Stage 6: Evaluation designer (sequential — needs Stage 4 output) ──
-    print("[Stage 6] Generating evaluation items (sequential; uses Stage 4 reading content)...")
-    evaluation_items = generate_evaluation_items(course_contents, spec, shared_context)
+    course_contents: dict[int, tuple[dict, dict]] = {
+        pos: results[f"course{pos}"] for pos in range(1, 6)
+    }
+    diagnostic_items: list[dict] = results["diagnostics"]
+    evaluation_items: list[dict] = [
+        item for pos in range(1, 6) for item in results[f"evaluation{pos}"]
+    ]
     print(f"  ✓ Evaluation items done  ({len(evaluation_items)} items)")
     print()
 
@@ -1745,8 +2180,12 @@ def main() -> None:
         "diagnostic_items": diagnostic_items,
         "evaluation_items": evaluation_items,
     }
+    checkpoints.current_stage = 7
     print("[Stage 7] Running final QA / cross-validation...")
-    qa_passed, qa_issues = final_qa(all_outputs, shared_context)
+    qa_passed, qa_issues = checkpoints.run(
+        "stage7_final_qa", 7, (all_outputs, shared_context),
+        lambda: final_qa(all_outputs, shared_context), keep=lambda output: output[0],
+    )
     if not qa_passed:
         print()
         print("=" * 60)
@@ -1756,11 +2195,180 @@ def main() -> None:
         for issue in qa_issues:
             print(f"  ✗ {issue}")
         print()
-        print("Fix the issues above and re-run:")
-        print(f"  python scripts/generate_course_content.py {brief_path}")
-        sys.exit(1)
+        print("Fix the issues above and re-run; stages whose inputs are unchanged are reused")
+        print("and final QA runs again:")
+        print(f"  {resume_cmd}")
+        print("To regenerate content with the same brief, re-run from Stage 4 instead:")
+        print(f"  {resume_cmd} --from-stage 4 --llm-cache refresh")
+        raise PipelineStageError(7, f"final QA found {len(qa_issues)} issue(s): {qa_issues[0]}")
     print("  ✓ Final QA passed")
     print()
+    checkpoints.current_stage = 8
+    return structural, all_outputs, shared_context
+
+
+def _print_llm_stats() -> None:
+    stats = llm_cache.get_llm_cache_stats()
+    if stats["mode"] != "off":
+        print(
+            f"LLM cache ({stats['mode']}): {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['writes']} written, {stats['evictions']} evicted, {stats['discards']} discarded"
+        )
+    for endpoint, s in ratelimit.get_rate_limit_stats().items():
+        print(
+            f"Rate limit {endpoint}: {s['calls']} calls, {s['throttled']} throttled, "
+            f"peak {s['peak_in_flight']} in flight (limit now {s['concurrency_limit']}), "
+            f"{s['wait_s']}s queued"
+        )
+
+
+def _prepare_content_dir(output_dir: str | None) -> Path:
+    """Resolve the output directory (default: content/), seeding it from content/ if new."""
+    if not output_dir:
+        return CONTENT_DIR
+    import shutil as _shutil
+    content_dir = Path(output_dir)
+    content_dir.mkdir(parents=True, exist_ok=True)
+    for _src in CONTENT_DIR.glob("*.json"):
+        _dst = content_dir / _src.name
+        if not _dst.exists():
+            _shutil.copy(_src, _dst)
+    return content_dir
+
+
+def main() -> None:
+    # Ensure UTF-8 output on Windows (symbols like ✓ ✗ ⚠ fail in cp1252 terminal)
+    if hasattr(sys.stdout, "buffer") and getattr(sys.stdout, "encoding", "utf-8").lower() != "utf-8":
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+
+    cli = argparse.ArgumentParser(
+        description=(
+            "Generate AI Hero Academy course content from a Course Design Brief.\n"
+            "Produces all 7 role-specific JSON files in content/."
+        )
+    )
+    cli.add_argument(
+        "brief_filepath",
+        nargs="?",
+        help="Path to the Course Design Brief markdown file (default with --resume: the run's brief)",
+    )
+    cli.add_argument(
+        "--output-dir",
+        metavar="DIR",
+        default=None,
+        help=(
+            "Write output JSON files to DIR instead of content/. "
+            "Existing content/*.json files are copied to DIR first so Stage 8 "
+            "can merge safely. Useful for test runs that must not touch real content."
+        ),
+    )
+    cli.add_argument(
+        "--llm-cache",
+        choices=llm_cache.MODES,
+        default=None,
+        help=(
+            "LLM reply cache mode (default: LLM_CACHE_MODE or readwrite). "
+            "readonly never writes, refresh re-calls every endpoint and overwrites, "
+            "off bypasses the cache."
+        ),
+    )
+    cli.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        default=None,
+        help=(
+            "Continue run RUN_ID (or 'latest') from .pipeline_runs/, reusing every stage "
+            "checkpoint whose inputs are unchanged."
+        ),
+    )
+    cli.add_argument(
+        "--from-stage",
+        type=int,
+        choices=range(1, 9),
+        metavar="N",
+        default=None,
+        help="With --resume: re-run stage N (1-8) and everything after it, even if unchanged.",
+    )
+    cli.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="PATH",
+        default=None,
+        help=(
+            "Generate several roles in one run: brief files and/or directories of *.md briefs. "
+            "Pipelines run concurrently under the shared rate limiters; every role that passes "
+            "final QA is merged into the content files in a single write."
+        ),
+    )
+    cli.add_argument(
+        "--batch-workers",
+        type=int,
+        default=int(os.environ.get("PIPELINE_BATCH_WORKERS", "3")),
+        metavar="N",
+        help="Briefs processed at once in --batch mode (default: PIPELINE_BATCH_WORKERS or 3)",
+    )
+    args = cli.parse_args()
+    if args.batch and (args.brief_filepath or args.resume):
+        cli.error("--batch cannot be combined with brief_filepath or --resume")
+    if args.from_stage and not args.resume:
+        cli.error("--from-stage requires --resume")
+    if not args.brief_filepath and not args.resume and not args.batch:
+        cli.error("brief_filepath is required unless --resume or --batch is given")
+    if args.llm_cache:
+        os.environ["LLM_CACHE_MODE"] = args.llm_cache
+    atexit.register(_print_llm_stats)
+
+    if args.batch:
+        briefs = _collect_briefs(args.batch)
+        missing = [b for b in briefs if not os.path.exists(b)]
+        if missing or not briefs:
+            print(f"ERROR: Brief file(s) not found: {missing or args.batch}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(run_batch(briefs, _prepare_content_dir(args.output_dir), max(args.batch_workers, 1)))
+
+    # Resolve the run: a new run id, or an existing one whose brief / output dir are the defaults
+    if args.resume:
+        run_id = _latest_run_id() if args.resume == "latest" else args.resume
+        if not run_id or not (RUNS_DIR / run_id / "run.json").exists():
+            print(f"ERROR: No pipeline run '{args.resume}' in {RUNS_DIR}", file=sys.stderr)
+            sys.exit(1)
+        checkpoints = RunCheckpoints(run_id, from_stage=args.from_stage)
+        meta = checkpoints.read_meta()
+        brief_path = args.brief_filepath or meta["brief_filepath"]
+        output_dir = args.output_dir or meta.get("output_dir")
+    else:
+        brief_path = args.brief_filepath
+        output_dir = args.output_dir
+        checkpoints = RunCheckpoints(_new_run_id(brief_path))
+
+    if not os.path.exists(brief_path):
+        print(f"ERROR: Brief file not found: {brief_path}", file=sys.stderr)
+        sys.exit(1)
+    checkpoints.write_meta(
+        run_id=checkpoints.run_id,
+        brief_filepath=os.path.abspath(brief_path),
+        output_dir=os.path.abspath(output_dir) if output_dir else None,
+    )
+    resume_cmd = f"python scripts/generate_course_content.py --resume {checkpoints.run_id}"
+    content_dir = _prepare_content_dir(output_dir)
+
+    print()
+    print("=" * 60)
+    print("AI HERO ACADEMY — Course Content Generation Pipeline")
+    print("=" * 60)
+    print(f"  Brief: {brief_path}")
+    if output_dir:
+        print(f"  Output: {content_dir}  (test mode — real content/ not modified)")
+    print(f"  Run: {checkpoints.run_id}  ({checkpoints.run_dir})")
+    if args.resume:
+        forced = f"stages {args.from_stage}+ re-run; earlier " if args.from_stage else ""
+        print(f"  Resuming — {forced}stages reused where inputs are unchanged")
+    print()
+
+    try:
+        structural, all_outputs, shared_context = run_pipeline(brief_path, checkpoints, resume_cmd)
+    except PipelineStageError as exc:
+        sys.exit(exc.exit_code)
 
     # ── Stage 8: Assemble and write ───────────────────────────────────────
     print(f"[Stage 8] Writing output files to {content_dir}...")
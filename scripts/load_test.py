@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Load test: N concurrent virtual learners driven through the real pages.
+
+Each learner is a headless Streamlit session (streamlit.testing AppTest) that
+walks Welcome → Diagnostic → Skills Profile → Home → Course Module (reading,
+practice, quiz, results) by clicking the same widgets a person would. LLM calls
+are answered by the local fake provider (LLM_PROVIDER=fake, utils/fake_llm.py), and storage is an
+embedded SQLite file (DB_BACKEND=sqlite) — no network or GCP project needed.
+
+Usage:
+    python scripts/load_test.py --learners 20 --llm-latency-ms 800
+    python scripts/load_test.py --learners 50 --compare load_test_results/run-20261017-101500.json
+
+Reports per page: p50/p95/p99 rerun latency, storage reads per rerun (round trips
+and documents), and overall throughput (reruns/s, learners completed/min).
+Results are saved as JSON (--out) so runs can be compared with --compare.
+Set LOAD_TEST_DEBUG=1 to print full tracebacks for failed learner steps.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+PAGES = {
+    "app": "app.py",
+    "welcome": "pages/00_Welcome.py",
+    "diagnostic": "pages/01_Diagnostic.py",
+    "skills_profile": "pages/02_Skills_Profile.py",
+    "home": "pages/03_Home.py",
+    "course_module": "pages/04_Course_Module.py",
+}
+
+
+# ---------------------------------------------------------------------------
+# Storage: SQLite backend wrapped with per-learner read counters
+# ---------------------------------------------------------------------------
+
+class CountingBackend:
+    """Delegates to a StorageBackend and counts reads per learner (from the document path)."""
+
+    def __init__(self, inner):
+        self._inner = inner
+        self._lock = threading.Lock()
+        self._reads = defaultdict(lambda: [0, 0])   # user_email -> [round trips, documents]
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def _count(self, path: str, docs: int) -> None:
+        parts = path.split("/")
+        user_email = parts[1] if parts[0] == "users" and len(parts) > 1 else None
+        with self._lock:
+            counter = self._reads[user_email]
+            counter[0] += 1
+            counter[1] += docs
+
+    def reads(self, user_email: str) -> tuple:
+        with self._lock:
+            return tuple(self._reads[user_email])
+
+    def get(self, path, fields=None):
+        doc = self._inner.get(path, fields)
+        self._count(path, 1)
+        return doc
+
+    def query(self, collection_path, *args, **kwargs):
+        rows = self._inner.query(collection_path, *args, **kwargs)
+        self._count(collection_path, max(len(rows), 1))
+        return rows
+
+    def query_group(self, collection, *args, **kwargs):
+        rows = self._inner.query_group(collection, *args, **kwargs)
+        self._count(collection, max(len(rows), 1))
+        return rows
+
+
+# ---------------------------------------------------------------------------
+# AppTest adjustments for concurrent sessions
+# ---------------------------------------------------------------------------
+# AppTest is written for one test at a time: every run resets the class-level
+# PagesManager.uses_pages_directory flag, installs/removes a mock Runtime
+# singleton and patches/restores the global.appTest config option, which races
+# when learners run on parallel threads; it also builds a fresh ScriptCache per run. Give AppTest its own subclasses to write to and pin
+# the shared values once, as a single Streamlit server process would have them.
+#
+# A script that calls st.switch_page() renders the target page within the same
+# run, but AppTest keeps rerunning the page it was pointed at. The final client
+# state of each run records the page actually shown; capture it per thread so
+# the learner can follow the navigation like a browser would.
+#
+# All of this relies on private AppTest / runtime internals, and every such use
+# is kept in this section: install_apptest_patches() and page_hashes(). They
+# have been checked against the Streamlit versions below only; on any other
+# version the load test refuses to start rather than measure something else.
+# Set LOAD_TEST_UNCHECKED_STREAMLIT=1 to try anyway.
+
+APPTEST_CHECKED_STREAMLIT = ("1.65",)
+
+_current_page = threading.local()
+_process_patches = contextlib.ExitStack()   # held open for the life of the process
+
+
+def _check_apptest_internals() -> None:
+    """Raise RuntimeError if this Streamlit is not a checked version or lacks an internal we patch."""
+    import streamlit
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    version = ".".join(streamlit.__version__.split(".")[:2])
+    if version not in APPTEST_CHECKED_STREAMLIT and not os.environ.get("LOAD_TEST_UNCHECKED_STREAMLIT"):
+        raise RuntimeError(
+            f"scripts/load_test.py patches private AppTest internals and has been checked against "
+            f"Streamlit {', '.join(APPTEST_CHECKED_STREAMLIT)} only (installed: {streamlit.__version__}). "
+            f"Re-check install_apptest_patches() / page_hashes() and add the version to "
+            f"APPTEST_CHECKED_STREAMLIT, or set LOAD_TEST_UNCHECKED_STREAMLIT=1 to try anyway."
+        )
+    required = {
+        "app_test.ScriptCache": hasattr(app_test, "ScriptCache"),
+        "app_test.PagesManager": hasattr(app_test, "PagesManager"),
+        "app_test.Runtime": hasattr(app_test, "Runtime"),
+        "app_test.LocalScriptRunner": hasattr(app_test, "LocalScriptRunner"),
+        "app_test.patch_config_options": hasattr(app_test, "patch_config_options"),
+        "local_script_runner.ScriptCache": hasattr(local_script_runner, "ScriptCache"),
+        "AppTest._resolve_page_hash": hasattr(app_test.AppTest, "_resolve_page_hash"),
+        "PagesManager.uses_pages_directory": hasattr(PagesManager, "uses_pages_directory"),
+        "Runtime._instance": hasattr(Runtime, "_instance"),
+    }
+    missing = [name for name, present in required.items() if not present]
+    if missing:
+        raise RuntimeError(
+            f"Streamlit {streamlit.__version__} lacks AppTest internals the load test patches: {missing}"
+        )
+
+
+def page_hashes(at) -> dict:
+    """{page script hash: page name} for PAGES, as the AppTest session resolves them."""
+    return {
+        at._resolve_page_hash(str((PROJECT_ROOT / path).resolve())): name
+        for name, path in PAGES.items()
+    }
+
+
+def install_apptest_patches() -> None:
+    _check_apptest_internals()
+
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1 import local_script_runner
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    _process_patches.enter_context(app_test.patch_config_options({"global.appTest": True}))
+    PagesManager.uses_pages_directory = True
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    script_cache = ScriptCache()
+    for path in PAGES.values():
+        # Compile up front on this thread: concurrent ast.parse() calls can trip
+        # CPython's shared AST recursion counter ("AST constructor recursion depth mismatch").
+        script_cache.get_bytecode(str(PROJECT_ROOT / path))
+
+    class IsolatedPagesManager(PagesManager):
+        pass
+
+    class IsolatedRuntime(Runtime):
+        pass
+
+    class PageTrackingRunner(LocalScriptRunner):
+        def run(self, *args, **kwargs):
+            tree = super().run(*args, **kwargs)
+            _current_page.hash = self.event_data[-1]["client_state"].page_script_hash
+            return tree
+
+    app_test.ScriptCache = lambda: script_cache
+    local_script_runner.ScriptCache = lambda: script_cache
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+    app_test.PagesManager = IsolatedPagesManager
+    app_test.Runtime = IsolatedRuntime
+    app_test.LocalScriptRunner = PageTrackingRunner
+
+
+# ---------------------------------------------------------------------------
+# Virtual learner
+# ---------------------------------------------------------------------------
+
+class LearnerError(RuntimeError):
+    pass
+
+
+class VirtualLearner:
+    def __init__(self, index: int, args, backend: CountingBackend):
+        from streamlit.testing.v1 import AppTest
+
+        self.email = f"load-{args.run_id}-{index:04d}@loadtest.local"
+        self.args = args
+        self.backend = backend
+        self.samples: list[dict] = []
+        self.modules_done = 0
+        self.at = AppTest.from_file(str(PROJECT_ROOT / PAGES["app"]), default_timeout=args.timeout)
+        self.at.session_state["load_test_user_email"] = self.email
+        self.page = "app"
+        self._page_by_hash: dict[str, str] = {}
+        self._turns = 0
+
+    # -- running ------------------------------------------------------------
+
+    def _run(self, action: str, fn=None) -> None:
+        reads_before = self.backend.reads(self.email)
+        t0 = time.perf_counter()
+        (fn() if fn else self.at).run()
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        reads_after = self.backend.reads(self.email)
+
+        page = self._page_by_hash.get(getattr(_current_page, "hash", ""), self.page)
+        self.samples.append({
+            "page": page,
+            "action": action,
+            "ms": round(elapsed_ms, 2),
+            "read_calls": reads_after[0] - reads_before[0],
+            "read_docs": reads_after[1] - reads_before[1],
+        })
+        if self.at.exception:
+            if os.environ.get("LOAD_TEST_DEBUG"):
+                print("\n".join(self.at.exception[0].stack_trace), file=sys.stderr)
+            raise LearnerError(f"{page}/{action}: {self.at.exception[0].value}")
+        if page != self.page:
+            self.page = page
+            if page != "app":
+                self.at.switch_page(PAGES[page])
+
+    def _button(self, label: str = None, key: str = None):
+        for button in self.at.button:
+            if (label is not None and button.label == label) or (key is not None and button.key == key):
+                return button
+        return None
+
+    def _click(self, action: str, label: str = None, key: str = None) -> bool:
+        button = self._button(label, key)
+        if button is None or button.disabled:
+            return False
+        self._run(action, button.click)
+        return True
+
+    def _answer_item(self, prefix_mcq: str, prefixes_text: tuple, prefix_btn: str, action: str) -> bool:
+        """Fill in the current question (one rerun), then submit it on the next step."""
+        for radio in self.at.radio:
+            if radio.key and radio.key.startswith(prefix_mcq):
+                if radio.value is None:
+                    choice = radio.options[sum(map(ord, self.email + radio.key)) % len(radio.options)]
+                    self._run("choose_option", lambda: radio.set_value(choice))
+                    return True
+                return self._click(action, key=f"{prefix_btn}{radio.key[len(prefix_mcq):]}")
+        for area in self.at.text_area:
+            prefix = next((p for p in prefixes_text if area.key and area.key.startswith(p)), None)
+            if prefix is None:
+                continue
+            if not area.value:
+                self._run("type_answer", lambda: area.input(
+                    "Summarise the client's export exposure in three bullets for my credit memo, "
+                    "citing the source figures and flagging anything I need to verify."
+                ))
+                return True
+            return self._click(action, key=f"{prefix_btn}{area.key[len(prefix):]}")
+        return False
+
+    # -- per-page behaviour ---------------------------------------------------
+
+    def _step(self) -> bool:
+        """Take the next action on the current page. Returns False when the journey is over."""
+        if self.page == "welcome":
+            for box in self.at.selectbox:
+                if box.key == "welcome_role" and box.index == 0:
+                    self._run("select_role", lambda: box.set_value(box.options[1]))
+                    return True
+            return self._click("create_profile", label="Start My Diagnostic →")
+
+        if self.page == "diagnostic":
+            return (
+                self._click("start_diagnostic", label="Start Assessment →")
+                or self._answer_item("mcq_", ("sandbox_", "microtask_"), "btn_", "answer_item")
+            )
+
+        if self.page == "skills_profile":
+            return (
+                self._click("build_course", label="🗺️  Build My Training Course")
+                or self._click("view_course", label="📚  View My Course")
+            )
+
+        if self.page == "home":
+            for button in self.at.button:
+                if button.key and button.key.startswith("module_btn_") and button.proto.type == "primary":
+                    self._run("open_module", button.click)
+                    return True
+            return False
+
+        if self.page == "course_module":
+            return self._course_module_step()
+
+        return False
+
+    def _course_module_step(self) -> bool:
+        titles = [t.value for t in self.at.title]
+        if "Module Complete!" in titles:
+            self.modules_done += 1
+            if self.modules_done >= self.args.modules:
+                return False
+            for button in self.at.button:
+                if button.label.startswith("Start Module "):
+                    self._run("next_module", button.click)
+                    return True
+            return False
+
+        if (
+            self._click("start_reading", label="Start Reading →")
+            or self._click("start_practice", label="I've read this — Start Practice →")
+            or self._click("continue_practice", label="Continue Practice →")
+            or self._click("take_quiz", label="Take Quiz →")
+        ):
+            return True
+
+        if self.at.chat_input and self._turns < self.args.practice_turns:
+            self._turns += 1
+            chat = self.at.chat_input[0]
+            self._run("coach_turn", lambda: chat.set_value("I'd ask Copilot to draft the summary, then verify the figures."))
+            return True
+        if self._click("next_task", label="Skip this task →") or self._click("next_task", label="Next Task →"):
+            self._turns = 0
+            return True
+        if self._click("complete_practice", label="Complete Practice →") or self._click("complete_practice", label="Go to Quiz →"):
+            return True
+
+        return self._answer_item("eq_", ("ep_",), "eb_", "answer_quiz")
+
+    def journey(self) -> dict:
+        t0 = time.perf_counter()
+        error = None
+        try:
+            self._run("open_app")
+            self._page_by_hash = page_hashes(self.at)
+            self.page = self._page_by_hash.get(getattr(_current_page, "hash", ""), "app")
+            if self.page != "app":
+                self.at.switch_page(PAGES[self.page])
+            for _ in range(self.args.max_steps):
+                if not self._step():
+                    break
+            else:
+                raise LearnerError(f"journey did not finish within {self.args.max_steps} steps (on {self.page})")
+            if self.modules_done < self.args.modules:
+                visible = [b.label for b in self.at.button] + [t.value for t in self.at.title]
+                raise LearnerError(f"stuck on {self.page} after {len(self.samples)} reruns; showing {visible}")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {
+            "email": self.email,
+            "completed": error is None,
+            "error": error,
+            "duration_s": round(time.perf_counter() - t0, 3),
+            "samples": self.samples,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lo = int(rank)
+    hi = min(lo + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo), 2)
+
+
+def _latency_summary(samples: list[dict]) -> dict:
+    ms = [s["ms"] for s in samples]
+    return {
+        "reruns": len(samples),
+        "p50_ms": _percentile(ms, 50),
+        "p95_ms": _percentile(ms, 95),
+        "p99_ms": _percentile(ms, 99),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+        "read_calls_per_rerun": round(sum(s["read_calls"] for s in samples) / len(samples), 2) if samples else 0.0,
+        "read_docs_per_rerun": round(sum(s["read_docs"] for s in samples) / len(samples), 2) if samples else 0.0,
+    }
+
+
+def summarise(journeys: list[dict], wall_s: float) -> dict:
+    samples = [s for j in journeys for s in j["samples"]]
+    by_page = defaultdict(list)
+    for s in samples:
+        by_page[s["page"]].append(s)
+    completed = sum(1 for j in journeys if j["completed"])
+    return {
+        "overall": _latency_summary(samples),
+        "pages": {page: _latency_summary(rows) for page, rows in sorted(by_page.items())},
+        "throughput": {
+            "wall_s": round(wall_s, 2),
+            "reruns_per_s": round(len(samples) / wall_s, 2) if wall_s else 0.0,
+            "learners_completed": completed,
+            "learners_failed": len(journeys) - completed,
+            "learners_per_min": round(completed / wall_s * 60, 2) if wall_s else 0.0,
+        },
+        "errors": sorted({j["error"] for j in journeys if j["error"]}),
+    }
+
+
+def print_report(summary: dict, baseline: dict | None = None) -> None:
+    def _delta(page: str, key: str, value: float) -> str:
+        if not baseline:
+            return ""
+        before = (baseline["overall"] if page == "overall" else baseline["pages"].get(page, {})).get(key)
+        if not before:
+            return ""
+        return f" ({(value - before) / before * 100:+.0f}%)"
+
+    print()
+    print(f"{'page':<16}{'reruns':>8}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}{'reads/rerun':>14}{'docs/rerun':>12}")
+    for page, row in [("overall", summary["overall"]), *summary["pages"].items()]:
+        print(
+            f"{page:<16}{row['reruns']:>8}"
+            f"{row['p50_ms']:>9.0f}{_delta(page, 'p50_ms', row['p50_ms']):>7}"
+            f"{row['p95_ms']:>9.0f}{_delta(page, 'p95_ms', row['p95_ms']):>7}"
+            f"{row['p99_ms']:>9.0f}{_delta(page, 'p99_ms', row['p99_ms']):>7}"
+            f"{row['read_calls_per_rerun']:>14.2f}{row['read_docs_per_rerun']:>12.2f}"
+        )
+    tp = summary["throughput"]
+    print()
+    print(
+        f"Throughput: {tp['reruns_per_s']} reruns/s, {tp['learners_per_min']} learners/min "
+        f"({tp['learners_completed']} completed, {tp['learners_failed']} failed in {tp['wall_s']}s)"
+    )
+    if baseline:
+        before = baseline["throughput"]["reruns_per_s"]
+        if before:
+            print(f"  vs baseline: {(tp['reruns_per_s'] - before) / before * 100:+.0f}% reruns/s")
+    llm = summary.get("llm")
+    if llm:
+        print(f"Fake LLM: {llm['calls']} calls, {llm['failures']} failed "
+              f"({llm['throttled']} throttled), {llm['completion_tokens']} tokens")
+    for model, rl in summary.get("rate_limit", {}).items():
+        print(f"Rate limit {model}: peak {rl['peak_in_flight']} in flight, limit now "
+              f"{rl['concurrency_limit']}, {rl['throttled']} throttled, {rl['wait_s']}s queued")
+    for error in summary["errors"]:
+        print(f"  ERROR: {error}")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    if hasattr(sys.stdout, "buffer") and getattr(sys.stdout, "encoding", "utf-8").lower() != "utf-8":
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+
+    cli = argparse.ArgumentParser(description="Drive N concurrent virtual learners through the app.")
+    cli.add_argument("--learners", type=int, default=10, help="Number of virtual learners (default 10)")
+    cli.add_argument("--concurrency", type=int, default=None, help="Learners running at once (default: all)")
+    cli.add_argument("--ramp-s", type=float, default=0.0, help="Spread learner start times over this many seconds")
+    cli.add_argument("--modules", type=int, default=1, help="Course modules each learner completes (default 1)")
+    cli.add_argument("--practice-turns", type=int, default=1, help="Coach turns per practice task, 4 tasks (default 1)")
+    cli.add_argument("--llm-latency-ms", type=float, default=800, help="Median fake LLM time to first token (default 800)")
+    cli.add_argument("--llm-jitter", type=float, default=0.4, help="Log-normal sigma of fake LLM latency (default 0.4)")
+    cli.add_argument("--llm-tokens-per-sec", type=float, default=80, help="Fake LLM generation rate (default 80)")
+    cli.add_argument("--llm-failure-rate", type=float, default=0.0, help="Fraction of fake LLM calls that fail")
+    cli.add_argument("--llm-max-concurrency", type=int, default=0,
+                     help="Fake endpoint capacity: calls beyond it get a 429 (default 0 = unlimited)")
+    cli.add_argument("--db-path", default=None, help="SQLite file (default: a fresh temp file)")
+    cli.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds (default 120)")
+    cli.add_argument("--max-steps", type=int, default=200, help="Safety cap on reruns per learner")
+    cli.add_argument("--seed", type=int, default=0, help="Seed for fake LLM replies, latencies and failures")
+    cli.add_argument("--out", default=None, help="Results JSON (default load_test_results/run-<timestamp>.json)")
+    cli.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = cli.parse_args()
+
+    # Widget deprecation notices would otherwise repeat once per rerun per learner.
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    from streamlit.logger import set_log_level
+    set_log_level(os.environ["STREAMLIT_LOGGER_LEVEL"])
+
+    args.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    # Configure the app for an offline, in-process run before utils.db is imported.
+    db_path = args.db_path or os.path.join(tempfile.mkdtemp(prefix="aha-load-"), "load.sqlite3")
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_DB_PATH"] = db_path
+    os.environ["LOAD_TEST_MODE"] = "1"
+    os.environ.pop("FIRESTORE_LISTENERS", None)
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_LATENCY_DIST": "lognormal",
+        "FAKE_LLM_LATENCY_SIGMA": str(args.llm_jitter),
+        "FAKE_LLM_TOKENS_PER_SEC": str(args.llm_tokens_per_sec),
+        "FAKE_LLM_FAILURE_RATE": str(args.llm_failure_rate),
+        "FAKE_LLM_MAX_CONCURRENCY": str(args.llm_max_concurrency),
+        "FAKE_LLM_SEED": str(args.seed),
+    })
+
+    from utils.db_backends import SQLiteBackend, set_backend
+    from utils.ai import flush_call_log
+    from utils.fake_llm import get_fake_llm_stats
+    from utils.ratelimit import get_rate_limit_stats
+
+    backend = CountingBackend(SQLiteBackend(db_path))
+    set_backend(backend)
+    try:
+        install_apptest_patches()
+    except RuntimeError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+
+    print(f"Load test {args.run_id}: {args.learners} learners, {args.modules} module(s) each, "
+          f"fake LLM median {args.llm_latency_ms:.0f}ms, SQLite at {db_path}")
+
+    def _learner(index: int) -> dict:
+        if args.ramp_s:
+            time.sleep(args.ramp_s * index / max(args.learners, 1))
+        return VirtualLearner(index, args, backend).journey()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency or args.learners, thread_name_prefix="learner") as pool:
+        journeys = list(pool.map(_learner, range(args.learners)))
+    wall_s = time.perf_counter() - t0
+    flush_call_log()
+
+    summary = summarise(journeys, wall_s)
+    summary["llm"] = get_fake_llm_stats()
+    summary["rate_limit"] = get_rate_limit_stats()
+    print_report(summary, baseline)
+
+    out = Path(args.out or PROJECT_ROOT / "load_test_results" / f"run-{args.run_id}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "summary": summary, "journeys": journeys}, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if summary["throughput"]["learners_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 Deletes all learner-schema rows for DEV_USER_EMAIL.
 Run before a clean UAT pass: python scripts/reset_uat_user.py
+Works against whichever store DB_BACKEND selects (firestore or sqlite).
 """
 import os
 import sys
@@ -18,7 +19,7 @@ try:
 except ImportError:
     pass
 
-from utils.db import execute, _get_client
+from utils.db import execute, delete_user, USER_COLLECTIONS
 
 parser = argparse.ArgumentParser(description="Reset UAT user data")
 parser.add_argument("--role", choices=["rm", "uw"], help="Seed a user_profiles row for this role")
@@ -32,28 +33,10 @@ EMAIL = os.environ.get("DEV_USER_EMAIL", "uat-test@edc.ca")
 
 print(f"Resetting UAT data for: {EMAIL}")
 
-# Use Firestore client directly for deletions since execute() doesn't support DELETE yet.
-db = _get_client()
-user_ref = db.collection("users").document(EMAIL)
-
-collections_to_delete = [
-    "coach_sessions",
-    "gap_maps",
-    "training_progress",
-    "diagnostic_sessions"
-]
-
-for sub in collections_to_delete:
-    docs = user_ref.collection(sub).stream()
-    count = 0
-    for doc in docs:
-        doc.reference.delete()
-        count += 1
-    print(f"  ✓ Deleted {count} documents from {sub}")
-
-user_doc = user_ref.get()
-if user_doc.exists:
-    user_ref.delete()
+counts = delete_user(EMAIL)
+for sub in USER_COLLECTIONS:
+    print(f"  ✓ Deleted {counts.get(sub, 0)} documents from {sub}")
+if counts.get("users"):
     print(f"  ✓ Deleted user_profiles")
 
 # 2. --role seed
@@ -0,0 +1,77 @@
+"""utils/ai.py _CallLogWriter: batching, close() and overflow (SQLite backend)."""
+
+import threading
+
+import pytest
+
+from utils import db
+from utils.ai import _CallLogWriter
+from utils.db_backends import SQLiteBackend, set_backend
+
+LONG = 60.0   # flush interval no test waits for
+
+
+class RecordingBackend(SQLiteBackend):
+    """SQLiteBackend that records the size of each commit and can hold commits at a gate."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.batches = []
+        self.committing = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def commit(self, writes):
+        self.committing.set()
+        self.gate.wait(5)
+        self.batches.append(len(writes))
+        return super().commit(writes)
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_CACHE_TTL_SECONDS", "0")
+    backend = RecordingBackend(str(tmp_path / "test.sqlite3"))
+    set_backend(backend)
+    yield backend
+    backend.gate.set()
+    set_backend(None)
+
+
+def _record(i: int) -> dict:
+    return {"log_id": f"log-{i}", "user_email": "learner@example.com", "call_type": "coach",
+            "model_endpoint": "test-model", "latency_ms": 10}
+
+
+def test_full_batch_is_written_without_waiting_for_the_interval(backend):
+    writer = _CallLogWriter(batch_size=3, flush_interval=LONG, max_queue=100)
+    for i in range(3):
+        writer.enqueue(_record(i))
+    with writer._written:
+        assert writer._written.wait_for(lambda: writer._pending == 0, timeout=5)
+    assert backend.batches == [3]
+    assert writer._thread.is_alive()
+    writer.close()
+
+
+def test_close_writes_a_partial_batch(backend):
+    writer = _CallLogWriter(batch_size=50, flush_interval=LONG, max_queue=100)
+    for i in range(2):
+        writer.enqueue(_record(i))
+    writer.close()
+    assert backend.batches == [2]
+    assert len(db.list_ai_calls()) == 2
+    assert writer.stats() == {"enqueued": 2, "written": 2, "dropped": 0, "failed": 0, "queued": 0}
+
+
+def test_full_queue_drops_and_counts(backend):
+    writer = _CallLogWriter(batch_size=1, flush_interval=LONG, max_queue=2)
+    backend.gate.clear()                  # hold the worker inside its first commit
+    writer.enqueue(_record(0))
+    assert backend.committing.wait(5)
+    for i in range(1, 4):                 # two fit in the queue, the third is dropped
+        writer.enqueue(_record(i))
+    assert writer.stats()["dropped"] == 1
+    backend.gate.set()
+    writer.close()
+    assert writer.stats() == {"enqueued": 3, "written": 3, "dropped": 1, "failed": 0, "queued": 0}
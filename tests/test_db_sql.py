@@ -0,0 +1,76 @@
+"""utils/db.py SQL compatibility shim: statement parsing and diagnostic_sessions reads (SQLite backend)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import db
+from utils.db_backends import SQLiteBackend, set_backend
+
+USER = "learner@example.com"
+T0 = datetime(2026, 1, 1, 9, 0)
+
+
+def test_parse_select():
+    stmt = db._parse_statement(
+        "SELECT session_id, completed_at FROM diagnostic_sessions "
+        "WHERE user_email = ? AND completed_at IS NOT NULL ORDER BY started_at DESC, session_id LIMIT 1"
+    )
+    assert stmt.op == "SELECT"
+    assert stmt.table == "diagnostic_sessions"
+    assert stmt.columns == ("session_id", "completed_at")
+    assert [c[:2] for c in stmt.conditions] == [("user_email", "="), ("completed_at", "is not null")]
+    assert stmt.order_by == (("started_at", True), ("session_id", False))
+    assert stmt.limit == 1
+
+
+def test_parse_insert_and_update():
+    insert = db._parse_statement("INSERT INTO user_profiles (user_email, role_id) VALUES (?, 'rm')")
+    assert insert.table == "users"
+    assert insert.columns == ("user_email", "role_id")
+    assert len(insert.values) == 2
+
+    update = db._parse_statement("UPDATE training_progress SET is_locked = ? WHERE progress_id = ?")
+    assert update.op == "UPDATE"
+    assert [a[0] for a in update.assignments] == ["is_locked"]
+
+
+def test_parse_rejects_unsupported_statement():
+    with pytest.raises(RuntimeError):
+        db._parse_statement("DELETE FROM users")
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """Three diagnostic sessions: s1 oldest, s2 completed last, s3 newest and still open."""
+    monkeypatch.setenv("DB_CACHE_TTL_SECONDS", "0")
+    set_backend(SQLiteBackend(str(tmp_path / "test.sqlite3")))
+    rows = {
+        "s1": (T0, T0 + timedelta(minutes=50)),
+        "s2": (T0 + timedelta(hours=1), T0 + timedelta(hours=3)),
+        "s3": (T0 + timedelta(hours=2), None),
+    }
+    db._commit([
+        ("set", f"users/{USER}/diagnostic_sessions/{sid}",
+         {"session_id": sid, "user_email": USER, "started_at": started, "completed_at": completed})
+        for sid, (started, completed) in rows.items()
+    ])
+    yield
+    set_backend(None)
+
+
+def _ids(statement: str) -> list:
+    return [r["session_id"] for r in db.execute(statement, [USER])]
+
+
+def test_order_by_is_applied_with_limit(sessions):
+    base = "SELECT session_id FROM diagnostic_sessions WHERE user_email = ?"
+    assert _ids(f"{base} ORDER BY started_at DESC LIMIT 1") == ["s3"]
+    assert _ids(f"{base} ORDER BY started_at LIMIT 2") == ["s1", "s2"]
+
+
+def test_completed_only_orders_by_completed_at(sessions):
+    base = "SELECT session_id FROM diagnostic_sessions WHERE user_email = ? AND completed_at IS NOT NULL"
+    assert _ids(f"{base} ORDER BY completed_at DESC LIMIT 1") == ["s2"]
+    assert _ids(f"{base} ORDER BY started_at LIMIT 1") == ["s1"]
+    assert _ids(f"{base} ORDER BY started_at DESC") == ["s2", "s1"]
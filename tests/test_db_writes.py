@@ -0,0 +1,82 @@
+"""utils/db.py typed writes and routing state (SQLite backend)."""
+
+from datetime import datetime
+
+import pytest
+
+from utils import db
+from utils.db_backends import SQLiteBackend, set_backend
+
+USER = "learner@example.com"
+
+
+class CountingBackend(SQLiteBackend):
+    """SQLiteBackend that counts point reads and queries."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.reads = 0
+
+    def get(self, *args, **kwargs):
+        self.reads += 1
+        return super().get(*args, **kwargs)
+
+    def query(self, *args, **kwargs):
+        self.reads += 1
+        return super().query(*args, **kwargs)
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_CACHE_TTL_SECONDS", "0")
+    backend = CountingBackend(str(tmp_path / "test.sqlite3"))
+    set_backend(backend)
+    yield backend
+    set_backend(None)
+
+
+@pytest.fixture
+def legacy_user(backend):
+    """A profile written before state_summary existed, with a completed diagnostic."""
+    db._commit([
+        ("set", f"users/{USER}", {"user_email": USER, "display_name": "L", "role_id": "rm"}),
+        ("set", f"users/{USER}/diagnostic_sessions/d1",
+         {"session_id": "d1", "user_email": USER, "started_at": datetime(2026, 1, 1),
+          "completed_at": datetime(2026, 1, 1)}),
+    ])
+    backend.reads = 0
+
+
+def test_writes_do_not_read(legacy_user, backend):
+    db.insert_progress("p1", USER, "rm_c1_prompting", 1, is_locked=False)
+    db.insert_diagnostic_session("d2", USER)
+    assert backend.reads == 0
+
+
+def test_partial_summary_on_legacy_profile_is_backfilled(legacy_user):
+    db.insert_progress("p1", USER, "rm_c1_prompting", 1, is_locked=False)
+    assert db.get_user(USER)["state_summary"] == {"has_training_progress": True}
+    assert db.get_user_state(USER) == ("in_training", "rm")
+    summary = db.get_user(USER)["state_summary"]
+    assert summary["diagnostic_completed"] is True
+    assert summary["latest_diagnostic_session_id"] == "d1"
+
+
+def test_second_enroll_keeps_progress(backend):
+    courses = ["rm_c1_prompting", "rm_c2_verification", "rm_c3_data_safety"]
+    db.create_user(USER, "L", "rm")
+    db.enroll_courses(USER, courses)
+    first = db.progress_doc_id(USER, courses[0])
+    db.update_progress(USER, first, evaluation_score=3.5, evaluation_completed_at=datetime(2026, 1, 2))
+    db.update_progress(USER, db.progress_doc_id(USER, courses[1]), is_locked=False)
+    backend.reads = 0
+
+    db.enroll_courses(USER, courses + ["rm_c4_tool_fluency"])
+
+    assert backend.reads == 0
+    rows = {r["course_id"]: r for r in db.list_progress(USER)}
+    assert len(rows) == 4
+    assert rows[courses[0]]["evaluation_score"] == 3.5
+    assert rows[courses[0]]["evaluation_completed_at"] == datetime(2026, 1, 2)
+    assert rows[courses[1]]["is_locked"] is False
+    assert rows["rm_c4_tool_fluency"]["is_locked"] is True
@@ -0,0 +1,173 @@
+"""scripts/generate_course_content.py: LLM reply caching, the Stage 4–6 task graph and stage checkpoints."""
+
+import importlib.util
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("databricks.sdk", reason="the content pipeline needs databricks-sdk")
+
+_SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "generate_course_content.py"
+_spec = importlib.util.spec_from_file_location("generate_course_content", _SCRIPT)
+gcc = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gcc)
+
+SHARED_CONTEXT = {
+    "role_prefix": "uw",
+    "role_display_name": "Underwriter",
+    "company_map": {1: "Acme"},
+    "framework_names": ["CRAFT"],
+    "course_id_map": {1: "uw_c1_prompting"},
+    "real_use_cases": {},
+}
+
+
+@pytest.fixture
+def endpoint(tmp_path, monkeypatch):
+    """Serve the queued replies in order from a stand-in endpoint; records each prompt sent."""
+    monkeypatch.setenv("LLM_CACHE_MODE", "readwrite")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    replies, prompts = [], []
+
+    def query(name, messages, temperature, max_tokens):
+        prompts.append(messages[-1].content)
+        message = SimpleNamespace(content=replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(serving_endpoints=SimpleNamespace(query=query))
+    monkeypatch.setattr(gcc, "_get_client", lambda: client)
+    return SimpleNamespace(replies=replies, prompts=prompts)
+
+
+def test_unparseable_stage1_reply_is_not_replayed(endpoint):
+    endpoint.replies += ["Sorry, I cannot help with that.", '{"role_prefix": "uw"}']
+    with pytest.raises(ValueError):
+        gcc._parse_structural("brief text")
+    assert gcc._parse_structural("brief text") == {"role_prefix": "uw"}
+    assert len(endpoint.prompts) == 2
+    assert gcc._parse_structural("brief text") == {"role_prefix": "uw"}   # accepted reply is cached
+    assert len(endpoint.prompts) == 2
+
+
+def test_stage4_reply_missing_a_field_is_not_replayed(endpoint):
+    endpoint.replies += [
+        '{"reading_content": {"concept_text": "..."}}',
+        '{"reading_content": {"concept_text": "..."}, "practice_scenario": {"scenario_text": "..."}}',
+    ]
+    with pytest.raises(KeyError):
+        gcc.generate_course_content(1, {}, SHARED_CONTEXT)
+    reading, scenario = gcc.generate_course_content(1, {}, SHARED_CONTEXT)
+    assert scenario == {"scenario_text": "..."}
+    assert len(endpoint.prompts) == 2
+
+
+def test_stage7_reply_of_the_wrong_shape_is_not_replayed(endpoint):
+    endpoint.replies += ['["not", "an", "object"]', '{"issues": []}']
+    outputs = {"course_contents": {}, "evaluation_items": [], "diagnostic_items": []}
+    with pytest.raises(AttributeError):
+        gcc._llm_final_qa(outputs, SHARED_CONTEXT)
+    assert gcc._llm_final_qa(outputs, SHARED_CONTEXT) == []
+    assert len(endpoint.prompts) == 2
+
+
+def test_failed_stage_is_not_checkpointed(tmp_path, monkeypatch):
+    monkeypatch.setattr(gcc, "RUNS_DIR", tmp_path)
+    verdicts = [(False, ["issue"]), (True, [])]
+
+    def run():
+        return gcc.RunCheckpoints("run-1").run(
+            "stage7_final_qa", 7, ("outputs",), lambda: verdicts.pop(0), keep=lambda output: output[0],
+        )
+
+    assert run() == (False, ["issue"])
+    assert run() == (True, [])          # --resume ran QA again
+    assert run() == [True, []]          # and now reuses the passing verdict
+    assert verdicts == []
+
+
+def test_task_graph_runs_dependencies_first_in_listed_order():
+    started = []
+
+    def task(name, value):
+        def run(results):
+            started.append(name)
+            return value(results)
+        return run
+
+    tasks = {
+        "evaluation1": (("course1",), task("evaluation1", lambda r: r["course1"] + "+eval")),
+        "diagnostics": ((), task("diagnostics", lambda r: "diag")),
+        "course1": ((), task("course1", lambda r: "c1")),
+        "course2": ((), task("course2", lambda r: "c2")),
+    }
+    finished = []
+    results = gcc.run_task_graph(tasks, max_workers=1, on_result=lambda name, _: finished.append(name))
+    assert results == {"diagnostics": "diag", "course1": "c1", "course2": "c2", "evaluation1": "c1+eval"}
+    # One worker: ready tasks start in listed order; evaluation1 jumps ahead once course1 is done
+    assert started == ["diagnostics", "course1", "evaluation1", "course2"]
+    assert finished == started
+
+
+def test_task_graph_failure_stops_dependents():
+    ran = []
+
+    def fail(results):
+        raise RuntimeError("endpoint down")
+
+    tasks = {
+        "course1": ((), fail),
+        "evaluation1": (("course1",), lambda results: ran.append("evaluation1")),
+    }
+    with pytest.raises(gcc.TaskFailedError) as info:
+        gcc.run_task_graph(tasks, max_workers=2)
+    assert info.value.task == "course1"
+    assert str(info.value.__cause__) == "endpoint down"
+    assert ran == []
+
+
+def test_task_graph_timeout_and_unsatisfiable_dependencies():
+    release = threading.Event()
+    with pytest.raises(gcc.TaskTimeoutError) as info:
+        gcc.run_task_graph({"slow": ((), lambda results: release.wait(5))}, timeout=0.1)
+    release.set()
+    assert info.value.task == "slow"
+
+    with pytest.raises(ValueError):
+        gcc.run_task_graph({"evaluation1": (("course1",), lambda results: None)})
+
+
+def test_checkpoints_round_trip_for_resume_and_from_stage(tmp_path, monkeypatch):
+    monkeypatch.setattr(gcc, "RUNS_DIR", tmp_path)
+    computed = []
+
+    def run_stages(checkpoints, spec):
+        def stage2():
+            computed.append(2)
+            return {"role_entry": {}}, {"role_prefix": "uw", "company_map": {1: "Acme"},
+                                       "course_id_map": {1: "uw_c1_prompting"}, "real_use_cases": {}}
+
+        def stage5():
+            computed.append(5)
+            return [{"item_id": "uw_diag_p1_mcq"}]
+
+        structural, shared_context = checkpoints.run(
+            "stage2_structural", 2, (spec,), stage2, decode=gcc._decode_stage2,
+        )
+        items = checkpoints.run("stage5_diagnostics", 5, (spec, shared_context), stage5)
+        return shared_context, items
+
+    first = run_stages(gcc.RunCheckpoints("run-1"), {"role_prefix": "uw"})
+    assert computed == [2, 5]
+
+    resumed = run_stages(gcc.RunCheckpoints("run-1"), {"role_prefix": "uw"})
+    assert computed == [2, 5]                          # --resume: nothing recomputed
+    assert resumed == first                            # int course positions survive the JSON round trip
+
+    run_stages(gcc.RunCheckpoints("run-1", from_stage=5), {"role_prefix": "uw"})
+    assert computed == [2, 5, 5]                       # --from-stage 5 re-runs only stage 5 onward
+
+    run_stages(gcc.RunCheckpoints("run-1"), {"role_prefix": "uw", "edited": True})
+    assert computed == [2, 5, 5, 2, 5]                 # changed inputs invalidate downstream stages
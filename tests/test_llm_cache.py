@@ -0,0 +1,70 @@
+"""utils/llm_cache.py: hits, misses, and retries after a rejected reply."""
+
+import pytest
+
+from utils import llm_cache
+
+REQUEST = dict(
+    endpoint_name="test-endpoint",
+    system_prompt="system",
+    user_prompt="user",
+    temperature=0.3,
+    max_tokens=100,
+)
+
+
+@pytest.fixture
+def endpoint(tmp_path, monkeypatch):
+    """A cached fake LLM call returning "reply 1", "reply 2", ... and counting real calls."""
+    monkeypatch.setenv("LLM_CACHE_MODE", "readwrite")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    calls = []
+
+    @llm_cache.cached
+    def call_llm(endpoint_name, system_prompt, user_prompt, temperature=0.7, max_tokens=4000):
+        calls.append(user_prompt)
+        return f"reply {len(calls)}"
+
+    call_llm.calls = calls
+    return call_llm
+
+
+def test_miss_then_hit(endpoint):
+    assert endpoint(**REQUEST) == "reply 1"
+    assert endpoint(**REQUEST) == "reply 1"
+    assert len(endpoint.calls) == 1
+
+
+def test_different_request_misses(endpoint):
+    endpoint(**REQUEST)
+    assert endpoint(**{**REQUEST, "user_prompt": "other"}) == "reply 2"
+    assert endpoint(**{**REQUEST, "max_tokens": 200}) == "reply 3"
+
+
+def test_retry_reaches_endpoint_and_replaces_rejected_reply(endpoint):
+    assert endpoint(**REQUEST) == "reply 1"
+    llm_cache.discard(**REQUEST)                    # reply 1 failed validation
+    assert endpoint(**REQUEST, cache_refresh=True) == "reply 2"
+    assert endpoint(**REQUEST) == "reply 2"         # later runs replay the accepted retry
+    assert len(endpoint.calls) == 2
+
+
+def test_discarded_reply_is_not_replayed(endpoint):
+    endpoint(**REQUEST)
+    llm_cache.discard(**REQUEST)
+    assert endpoint(**REQUEST) == "reply 2"
+
+
+def test_readonly_never_writes(endpoint, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MODE", "readonly")
+    endpoint(**REQUEST)
+    endpoint(**REQUEST)
+    assert len(endpoint.calls) == 2
+
+
+def test_off_bypasses_cache(endpoint, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MODE", "off")
+    endpoint(**REQUEST)
+    endpoint(**REQUEST)
+    assert len(endpoint.calls) == 2
@@ -0,0 +1,61 @@
+"""utils/ratelimit.py: AIMD concurrency limit and throttle classification."""
+
+import pytest
+
+from utils import ratelimit
+
+
+def _limiter(**kwargs) -> ratelimit.EndpointLimiter:
+    return ratelimit.EndpointLimiter("test-endpoint", **{"initial_concurrency": 8, "max_concurrency": 16, **kwargs})
+
+
+def test_throttle_halves_the_limit_once_per_cooldown():
+    limiter = _limiter()
+    permits = [limiter.acquire() for _ in range(8)]
+    limiter.release(permits.pop(), "throttled")
+    assert limiter.stats()["concurrency_limit"] == 4
+    limiter.release(permits.pop(), "throttled")     # in flight with the first one: not counted again
+    assert limiter.stats()["concurrency_limit"] == 4
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_limit_climbs_back_after_successes():
+    limiter = _limiter()
+    permits = [limiter.acquire() for _ in range(8)]
+    limiter.release(permits.pop(), "throttled")
+    for permit in permits[:5]:                       # +1/limit per success: about +1 per window of 4
+        limiter.release(permit, "ok")
+    assert limiter.stats()["concurrency_limit"] == 5
+
+
+def test_limit_stays_within_bounds():
+    limiter = _limiter(initial_concurrency=2, min_concurrency=2, max_concurrency=3)
+    permit = limiter.acquire()
+    limiter.release(permit, "throttled")
+    assert limiter.stats()["concurrency_limit"] == 2
+    limiter._paused_until = 0.0                      # skip the post-throttle pause
+    for _ in range(20):
+        limiter.release(limiter.acquire(), "ok")
+    assert limiter.stats()["concurrency_limit"] == 3
+
+
+def test_slot_classifies_exceptions():
+    limiter = _limiter()
+    with pytest.raises(KeyError):
+        with limiter.slot():
+            raise KeyError("bug")
+    with pytest.raises(TimeoutError):
+        with limiter.slot():
+            raise TimeoutError("read timed out")
+    stats = limiter.stats()
+    assert (stats["throttled"], stats["errors"], stats["in_flight"]) == (1, 1, 0)
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (RuntimeError("429 Too Many Requests"), True),
+    (RuntimeError("RESOURCE_EXHAUSTED: quota exceeded"), True),
+    (TimeoutError(), True),
+    (ValueError("bad prompt"), False),
+])
+def test_is_throttle(exc, expected):
+    assert ratelimit.is_throttle(exc) is expected
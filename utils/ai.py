@@ -1,13 +1,109 @@
 import os
 import re
 import time
+import queue
+import atexit
 import uuid
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
+import httpx
 from google import genai
 from google.genai import types
 
+from utils import fake_llm, ratelimit
+
+
+# ── Gemini client pool ────────────────────────────────────────────────────────
+# One genai.Client per (api_key, model family), shared by every thread in the
+# process. Each client owns an httpx connection pool, so keep-alive connections
+# (and their TLS sessions) are reused across calls instead of being rebuilt per
+# call. GEMINI_CLIENT_POOL_SIZE caps the connections held open per client.
+# Every request carries an httpcore trace hook, so get_client_pool_stats()
+# reports how many requests went out over an already-open connection.
+
+_clients: dict[tuple[str, str], genai.Client] = {}
+_clients_lock = threading.Lock()
+_pool_stats = {"client_cache_hits": 0, "client_cache_misses": 0, "requests": 0, "connections_opened": 0}
+
+
+def _count_pool(name: str) -> None:
+    with _clients_lock:
+        _pool_stats[name] += 1
+
+
+def _trace_connection(event_name: str, info: dict) -> None:
+    """httpcore "trace" extension callback: a new TCP connection was opened."""
+    if event_name == "connection.connect_tcp.complete":
+        _count_pool("connections_opened")
+
+
+def _on_request(request: httpx.Request) -> None:
+    """httpx request hook: count the request and trace its connection use."""
+    request.extensions["trace"] = _trace_connection
+    _count_pool("requests")
+
+
+def _model_family(model: str) -> str:
+    return "flash" if "flash" in model else "pro"
+
+
+def _get_genai_client(api_key: str | None, model: str) -> genai.Client:
+    """Return the shared client for this API key and model family, creating it on first use."""
+    key = (api_key or "", _model_family(model))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _pool_stats["client_cache_hits"] += 1
+            return client
+
+        pool_size = int(os.environ.get("GEMINI_CLIENT_POOL_SIZE", "10"))
+        http_options = types.HttpOptions(
+            client_args={
+                "limits": httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size,
+                    keepalive_expiry=float(os.environ.get("GEMINI_KEEPALIVE_SECONDS", "120")),
+                ),
+                "event_hooks": {"request": [_on_request]},
+            },
+        )
+        if api_key:
+            client = genai.Client(api_key=api_key, http_options=http_options)
+        else:
+            client = genai.Client(http_options=http_options)
+        _clients[key] = client
+        _pool_stats["client_cache_misses"] += 1
+        return client
+
+
+def get_client_pool_stats() -> dict:
+    """
+    Return Gemini client pool stats: client_cache_hits / client_cache_misses
+    (lookups of the shared genai.Client), pooled_clients, and at connection
+    level the HTTP requests sent, connections_opened and connections_reused
+    (requests that went out on an already-open keep-alive connection).
+    """
+    with _clients_lock:
+        stats = {**_pool_stats, "pooled_clients": len(_clients)}
+    stats["connections_reused"] = max(stats["requests"] - stats["connections_opened"], 0)
+    return stats
+
+
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+# Every Gemini call takes a slot on its model's process-wide limiter (utils/ratelimit.py):
+# concurrency adapts to 429s / timeouts and waiting sessions are served in order.
+# No request-rate or token cap by default; set them per model with LLM_RATE_LIMITS.
+MODEL_LIMITS = {"initial_concurrency": 32, "max_concurrency": 128}
+
+
+def _limiter_slot(model: str, messages: list[dict]):
+    prompt_tokens = ratelimit.estimate_tokens("".join(m["content"] for m in messages))
+    return ratelimit.get_limiter(model, **MODEL_LIMITS).slot(prompt_tokens)
+
 
 def call_llm(
     messages: list[dict],
@@ -22,14 +118,87 @@ def call_llm(
     Returns the assistant reply string.
     Logs call details to console (DB logging disabled in Phase 2).
     """
+    client, model, contents, config = _build_request(messages, temperature, call_type)
+
+    t0 = time.time()
+    try:
+        with _limiter_slot(model, messages) as permit:
+            resp = client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+            content = resp.text
+            permit.tokens_used = permit.reserved + ratelimit.estimate_tokens(content or "")
+
+        latency_ms = int((time.time() - t0) * 1000)
+        _log_call(user_email, call_type, model, latency_ms, success=True)
+        return content
+    except Exception as e:
+        latency_ms = int((time.time() - t0) * 1000)
+        _log_call(user_email, call_type, model, latency_ms, success=False, error=str(e))
+        raise
+
+
+def call_llm_stream(
+    messages: list[dict],
+    temperature: float = 0.1,
+    user_email: str = None,
+    call_type: str = "unknown",
+) -> Iterator[str]:
+    """
+    Streaming variant of call_llm — yields reply text chunks as Gemini generates them.
+
+    The call is logged once the stream is exhausted (latency = full generation time);
+    time-to-first-token is written to the application log.
+    """
+    client, model, contents, config = _build_request(messages, temperature, call_type)
+
+    t0 = time.time()
+    first_token_ms = None
+    try:
+        with _limiter_slot(model, messages) as permit:
+            completion_chars = 0
+            for chunk in client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config,
+            ):
+                if not chunk.text:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = int((time.time() - t0) * 1000)
+                completion_chars += len(chunk.text)
+                yield chunk.text
+            permit.tokens_used = permit.reserved + completion_chars // ratelimit.CHARS_PER_TOKEN
+    except Exception as e:
+        latency_ms = int((time.time() - t0) * 1000)
+        _log_call(user_email, call_type, model, latency_ms, success=False, error=str(e))
+        raise
+
+    latency_ms = int((time.time() - t0) * 1000)
+    logging.info(f"AI stream {call_type} via {model}: first token {first_token_ms}ms, complete {latency_ms}ms")
+    _log_call(user_email, call_type, model, latency_ms, success=True)
+
+
+def _build_request(
+    messages: list[dict],
+    temperature: float,
+    call_type: str,
+) -> tuple[genai.Client, str, str, types.GenerateContentConfig]:
+    """Resolve model + pooled client and flatten messages into Gemini contents/config."""
     # Model selection based on call type
     if call_type in ["coach_response"]:
         model = os.environ.get("GEMINI_FLASH_MODEL", "gemini-3-flash-preview")
     else:
         model = os.environ.get("GEMINI_PRO_MODEL", "gemini-3.1-pro-preview")
 
-    api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key) if api_key else genai.Client()
+    if fake_llm.enabled():
+        # LLM_PROVIDER=fake: local stand-in for offline benchmarking (utils/fake_llm.py)
+        client = fake_llm.GenaiClient()
+    else:
+        api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+        client = _get_genai_client(api_key, model)
 
     # Extract system instruction if present
     system_instruction = None
@@ -52,47 +221,189 @@ def call_llm(
     # Remove trailing newline
     conversation_content = conversation_content.rstrip()
 
-    t0 = time.time()
-    try:
-        config = types.GenerateContentConfig(temperature=temperature)
-        if system_instruction:
-            config.system_instruction = system_instruction
-
-        resp = client.models.generate_content(
-            model=model,
-            contents=conversation_content,
-            config=config,
-        )
+    config = types.GenerateContentConfig(temperature=temperature)
+    if system_instruction:
+        config.system_instruction = system_instruction
 
-        content = resp.text
-        latency_ms = int((time.time() - t0) * 1000)
-        _log_call(user_email, call_type, model, latency_ms, success=True)
-        return content
-    except Exception as e:
-        latency_ms = int((time.time() - t0) * 1000)
-        _log_call(user_email, call_type, model, latency_ms, success=False, error=str(e))
-        raise
+    return client, model, conversation_content, config
 
 
-def _log_call(user_email, call_type, model, latency_ms, success, error=None):
-    """Log AI call details to Firestore ai_call_log collection."""
-    try:
-        from utils.db import execute
+# ── ai_call_log write-behind ──────────────────────────────────────────────────
+# LLM call records are queued in memory and batch-committed to Firestore by a
+# background thread, so the log write never sits on the user-facing latency path.
+
+class _CallLogWriter:
+    """
+    Bounded write-behind queue for ai_call_log records.
+
+    A daemon worker collects records into a batch until AI_CALL_LOG_BATCH_SIZE
+    are waiting or AI_CALL_LOG_FLUSH_SECONDS have passed since the batch's first
+    record, then commits it with one WriteBatch. When the queue
+    (AI_CALL_LOG_QUEUE_SIZE) is full, records are dropped and counted rather than
+    blocking the caller. flush() writes everything queued without stopping the
+    worker; close() stops it for good and is registered with atexit.
+    """
 
-        log_id = str(uuid.uuid4())
-        execute(f"""
-            INSERT INTO ai_call_log
-              (log_id, user_email, call_type, model_endpoint, prompt_tokens, completion_tokens, latency_ms, success, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, [log_id, user_email or "", call_type, model, None, None, latency_ms, success, error])
+    _POLL_S = 0.1   # how often the worker checks for flush() / close() while waiting for records
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = max(1, min(batch_size, 500))   # Firestore batch limit
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._flush_now = threading.Event()
+        self._lock = threading.Lock()
+        self._written = threading.Condition(self._lock)
+        self._pending = 0               # queued or being written; 0 means flushed
+        self._thread: threading.Thread | None = None
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0}
+
+    def enqueue(self, record: dict) -> None:
+        self._ensure_worker()
+        with self._lock:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(record)
+            with self._lock:
+                self._stats["enqueued"] += 1
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self._stats["dropped"] += 1
+        if self._stop.is_set():
+            # Closed (interpreter shutting down) — write through instead of queueing
+            self._write_batch(self._take_available())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Write every queued record now and wait for it; the worker keeps running."""
+        if self._thread is None or not self._thread.is_alive():
+            while self._write_batch(self._take_available()):
+                pass
+            return
+        self._flush_now.set()
+        deadline = time.monotonic() + timeout
+        with self._written:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.warning(f"ai_call_log flush timed out with {self._pending} records pending")
+                    break
+                self._written.wait(remaining)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop the worker and flush every queued record (process exit)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        while self._write_batch(self._take_available()):
+            pass
 
-        if success:
-            logging.info(f"AI call successful: {call_type} via {model} ({latency_ms}ms)")
-        else:
-            logging.error(f"AI call failed: {call_type} via {model} - {error}")
-    except Exception:
-        # Never let logging failures break the main flow
-        pass
+    def _ensure_worker(self) -> None:
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ai-call-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._write_batch(self._collect())
+            if self._queue.empty():
+                self._flush_now.clear()
+
+    def _collect(self) -> list:
+        """Wait for a first record, then gather until batch_size or flush_interval after it."""
+        try:
+            # Short waits: _run() checks for close() between them
+            records = [self._queue.get(timeout=self._POLL_S)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(records) < self.batch_size:
+            if self._flush_now.is_set() or self._stop.is_set():
+                return records + self._take_available(self.batch_size - len(records))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                records.append(self._queue.get(timeout=min(remaining, self._POLL_S)))
+            except queue.Empty:
+                continue
+        return records
+
+    def _take_available(self, limit: int | None = None) -> list:
+        """Take up to limit (default batch_size) records without waiting."""
+        records = []
+        try:
+            while len(records) < (limit or self.batch_size):
+                records.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return records
+
+    def _write_batch(self, records: list) -> int:
+        """Commit records with one WriteBatch. Returns the count written or failed."""
+        if not records:
+            return 0
+        try:
+            from utils.db import write_batch
+
+            with write_batch() as batch:
+                for record in records:
+                    batch.insert_ai_call_log(**record)
+            with self._lock:
+                self._stats["written"] += len(records)
+        except Exception as e:
+            # Never let logging failures break the main flow
+            with self._lock:
+                self._stats["failed"] += len(records)
+            logging.warning(f"ai_call_log batch write failed ({len(records)} records): {e}")
+        finally:
+            with self._written:
+                self._pending -= len(records)
+                self._written.notify_all()
+        return len(records)
+
+
+_call_log_writer = _CallLogWriter(
+    batch_size=int(os.environ.get("AI_CALL_LOG_BATCH_SIZE", "50")),
+    flush_interval=float(os.environ.get("AI_CALL_LOG_FLUSH_SECONDS", "2.0")),
+    max_queue=int(os.environ.get("AI_CALL_LOG_QUEUE_SIZE", "1000")),
+)
+atexit.register(_call_log_writer.close)
+
+
+def get_call_log_stats() -> dict:
+    """Return {"enqueued", "written", "dropped", "failed", "queued"} for the ai_call_log writer."""
+    return _call_log_writer.stats()
+
+
+def flush_call_log() -> None:
+    """Write every queued ai_call_log record now; the background writer keeps running."""
+    _call_log_writer.flush()
+
+
+def _log_call(user_email, call_type, model, latency_ms, success, error=None):
+    """Queue AI call details for the ai_call_log collection (written behind by a worker thread)."""
+    _call_log_writer.enqueue({
+        "log_id": str(uuid.uuid4()),
+        "user_email": user_email or "",
+        "call_type": call_type,
+        "model_endpoint": model,
+        "latency_ms": latency_ms,
+        "success": success,
+        "error_message": error,
+    })
+
+    if success:
+        logging.info(f"AI call successful: {call_type} via {model} ({latency_ms}ms)")
+    else:
+        logging.error(f"AI call failed: {call_type} via {model} - {error}")
 
 
 def _extract_json(raw: str) -> dict:
@@ -168,9 +479,47 @@ Rules:
     return {**local_scores, **llm_scores}
 
 
+def _score_domains(by_domain: dict[str, list], user_email: str, call_type: str) -> dict:
+    """
+    Score every domain batch concurrently and merge item_scores in by_domain order.
+
+    Concurrency is bounded by SCORING_MAX_WORKERS (default 4). As with sequential
+    scoring, a failure in any batch is raised to the caller — the first failing
+    domain in by_domain order wins.
+    """
+    latencies: dict[str, float] = {}
+
+    def _timed(domain_id: str, items: list) -> dict:
+        t = time.time()
+        try:
+            return _score_batch(items, user_email, call_type=call_type)
+        finally:
+            latencies[domain_id] = time.time() - t
+
+    if not by_domain:
+        return {}
+
+    max_workers = min(len(by_domain), int(os.environ.get("SCORING_MAX_WORKERS", "4")))
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="scoring") as pool:
+        futures = [pool.submit(_timed, domain_id, items) for domain_id, items in by_domain.items()]
+        all_item_scores: dict[str, float] = {}
+        for future in futures:
+            all_item_scores.update(future.result())
+
+    wall_ms = int((time.time() - t0) * 1000)
+    sum_ms = int(sum(latencies.values()) * 1000)
+    logging.info(
+        f"{call_type}: {len(by_domain)} domain batches in {wall_ms}ms wall "
+        f"(sum of per-call latencies {sum_ms}ms)"
+    )
+    return all_item_scores
+
+
 def score_diagnostic(responses_with_rubrics: list[dict], user_email: str = None) -> dict:
     """
-    Score all diagnostic responses by batching per domain (one LLM call per domain).
+    Score all diagnostic responses by batching per domain (one LLM call per domain,
+    issued concurrently).
 
     responses_with_rubrics: list of {
         "item_id": str,
@@ -192,12 +541,8 @@ def score_diagnostic(responses_with_rubrics: list[dict], user_email: str = None)
     for item in responses_with_rubrics:
         by_domain.setdefault(item["domain_id"], []).append(item)
 
-    all_item_scores: dict[str, float] = {}
-
     # Score each domain in a separate LLM call (avoids token-limit issues)
-    for domain_id, items in by_domain.items():
-        batch_scores = _score_batch(items, user_email, call_type="diagnostic_scoring")
-        all_item_scores.update(batch_scores)
+    all_item_scores = _score_domains(by_domain, user_email, call_type="diagnostic_scoring")
 
     # Compute domain scores
     domain_scores: dict[str, float] = {}
@@ -229,7 +574,7 @@ def generate_gap_map(
     Returns list of {"priority": int, "domain_id": str, "bullet": str}
     """
     scores_text = json.dumps(domain_scores, ensure_ascii=False, indent=2)
-    descs_text = json.dumps(domain_descriptions, ensure_ascii=False, indent=2)
+    descs_text = json.dumps(dict(domain_descriptions), ensure_ascii=False, indent=2)
 
     prompt = f"""You are a learning coach generating a personalized gap analysis for a learner at a Canadian export finance institution.
 
@@ -294,10 +639,33 @@ def coach_response(
     )
 
 
+def coach_response_stream(
+    system_prompt: str,
+    conversation: list[dict],
+    user_input: str,
+    user_email: str = None,
+) -> Iterator[str]:
+    """
+    Streaming variant of coach_response — yields the coach reply in chunks.
+    Suitable for st.write_stream(), which returns the joined reply.
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        *conversation,
+        {"role": "user", "content": user_input},
+    ]
+    return call_llm_stream(
+        messages,
+        temperature=0.4,
+        user_email=user_email,
+        call_type="coach_response",
+    )
+
+
 def score_evaluation(responses_with_rubrics: list[dict], user_email: str = None) -> dict:
     """
     Score evaluation quiz responses. Mirrors score_diagnostic: MCQ scored locally,
-    open-ended via LLM (one call per domain), aggregates computed in Python.
+    open-ended via LLM (one concurrent call per domain), aggregates computed in Python.
 
     Returns: {
         "item_scores": {"item_id": float, ...},
@@ -311,11 +679,7 @@ def score_evaluation(responses_with_rubrics: list[dict], user_email: str = None)
     for item in responses_with_rubrics:
         by_domain.setdefault(item["domain_id"], []).append(item)
 
-    all_item_scores: dict[str, float] = {}
-
-    for domain_id, items in by_domain.items():
-        batch_scores = _score_batch(items, user_email, call_type="evaluation_scoring")
-        all_item_scores.update(batch_scores)
+    all_item_scores = _score_domains(by_domain, user_email, call_type="evaluation_scoring")
 
     # Compute domain scores in Python (equal weight per item)
     domain_scores: dict[str, float] = {}
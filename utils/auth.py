@@ -6,7 +6,18 @@ def get_user_email() -> str:
     Returns the authenticated user's email address.
     In Databricks Apps, injected as DATABRICKS_USER_EMAIL env var.
     Falls back to DEV_USER_EMAIL for local development.
+
+    With LOAD_TEST_MODE set, a session may carry its own identity in
+    st.session_state["load_test_user_email"] — scripts/load_test.py runs many
+    virtual learners in one process, where the env vars are shared.
     """
+    if os.environ.get("LOAD_TEST_MODE"):
+        import streamlit as st
+
+        email = st.session_state.get("load_test_user_email")
+        if email:
+            return email
+
     email = os.environ.get("DATABRICKS_USER_EMAIL")
     if not email:
         email = os.environ.get("DEV_USER_EMAIL", "dev@example.com")
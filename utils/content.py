@@ -1,91 +1,664 @@
 """
 Content loader for AI Hero Academy.
 
-Loads all static content JSON files once at module import time (i.e., once per
-container process). Replaces the previous pattern of querying the content.*
-Delta tables via SQL Warehouse on every page load.
+Serves the static content JSON files in content/ from an in-memory, immutable
+bundle (once per container process). Replaces the previous pattern of querying
+the content.* Delta tables via SQL Warehouse on every page load.
+
+The bundle is versioned by content/manifest.json (a version number plus the
+SHA-256 of every content file). Publishing new role content writes the JSON
+files first and the manifest last; a background watcher in the app process
+polls the manifest every CONTENT_RELOAD_SECONDS, loads and verifies the new
+files, and swaps the bundle in with a single reference assignment — so no
+redeploy is needed and readers never see a half-loaded bundle. A Streamlit
+script run keeps the bundle it first read from until it finishes: every page
+calls pin_content_for_run() first, and the run's first read pins the bundle
+in st.session_state.
+
+Publishing also compiles the content into a binary snapshot
+(content/shards/content.snap, built by write_manifest / scripts/build_content.py):
+a small header with the role index (roles, course → role and domain → role
+maps) followed by one marshal-encoded shard per role, with repeated strings
+interned. The app memory-maps the snapshot, so worker processes on one host
+share its pages; startup decodes only the header, and each role's shard is
+decoded on first use and kept in an LRU of CONTENT_SHARD_CACHE_SIZE roles —
+cold start and resident memory stay flat as roles are added. A snapshot that
+is missing, from another Python version, whose content hash differs from the
+manifest, or built from content files that have since changed (checked by
+size and mtime, then by the manifest's per-file hashes — e.g. a hand edit
+without rebuilding) is ignored and every JSON file is loaded instead.
+
+ROLES, DOMAINS, COURSES, etc. are module attributes resolved against the
+current bundle on each access, so read them after pin_content_for_run() (e.g.
+content.ROLES) rather than binding them with a module-level import. Apart from
+ROLES they merge every role's shard on each access — prefer the getters.
 
 All exported getters raise KeyError if the requested ID does not exist —
 callers should handle this at the page level with a graceful error message.
 """
 
+import os
+import re
+import sys
 import json
+import mmap
+import time
+import struct
+import marshal
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
 
 _CONTENT_DIR = Path(__file__).parent.parent / "content"
 
+MANIFEST_FILE = "manifest.json"
+SHARD_DIR = "shards"
+SNAPSHOT_FILE = "content.snap"
+_SNAPSHOT_MAGIC = b"AHACSNAP"
+_SNAPSHOT_FORMAT = 2
+_SNAPSHOT_PREAMBLE = struct.Struct("<8sHI")   # magic, format, header length
+CONTENT_FILES = (
+    "roles.json",
+    "domains.json",
+    "diagnostic_items.json",
+    "courses.json",
+    "reading_content.json",
+    "practice_scenarios.json",
+    "evaluation_items.json",
+)
+
+
+class ContentBundleError(Exception):
+    """Content files on disk do not match the manifest (publish still in progress)."""
+
+
+# ── Role shards ───────────────────────────────────────────────────────────────
+
+class _RoleShard(NamedTuple):
+    role_id: str
+    domains: dict                   # role-scoped keys, as in domains.json
+    diagnostic_items: tuple         # ordered by display_order
+    courses: dict
+    reading: dict
+    scenarios: dict
+    eval_items: dict
+    # Indexes — built once per shard so getters never scan the full data.
+    # Values are shared, read-only views (MappingProxyType / tuple): callers must
+    # copy before modifying.
+    domain_by_id: Mapping           # domain_id -> domain
+    descriptions: Mapping           # domain_id -> description
+
+
+_EMPTY_MAPPING: Mapping = MappingProxyType({})
+_EMPTY_SHARD = _RoleShard("", {}, (), {}, {}, {}, {}, _EMPTY_MAPPING, _EMPTY_MAPPING)
+
+
+def _make_shard(data: dict) -> _RoleShard:
+    domain_by_id: dict = {}
+    for d in data["domains"].values():
+        domain_by_id.setdefault(d["domain_id"], MappingProxyType(d))
+    return _RoleShard(
+        role_id=data["role_id"],
+        domains=data["domains"],
+        diagnostic_items=tuple(data["diagnostic_items"]),
+        courses=data["courses"],
+        reading=data["reading"],
+        scenarios=data["scenarios"],
+        eval_items=data["eval_items"],
+        domain_by_id=MappingProxyType(domain_by_id),
+        descriptions=MappingProxyType({k: d["description"] for k, d in domain_by_id.items()}),
+    )
 
-def _load(filename: str):
-    with open(_CONTENT_DIR / filename, encoding="utf-8") as f:
-        return json.load(f)
 
+def _course_role(course_id: str, courses: dict) -> str:
+    if course_id in courses:
+        return courses[course_id].get("role_id") or ""
+    m = re.match(r"^(.+?)_c\d+_", course_id)    # pipeline pattern: <role>_c<N>_<domain>
+    return m.group(1) if m else ""
 
-# ── Module-level caches — loaded once at startup ──────────────────────────────
 
-ROLES: dict = _load("roles.json")
-DOMAINS: dict = _load("domains.json")
-DIAGNOSTIC_ITEMS: list = _load("diagnostic_items.json")   # ordered by display_order
-COURSES: dict = _load("courses.json")
-READING: dict = _load("reading_content.json")
-SCENARIOS: dict = _load("practice_scenarios.json")
-EVAL_ITEMS: dict = _load("evaluation_items.json")
+def _split_roles(data: dict) -> tuple[dict, dict]:
+    """
+    Split the parsed content files into ({role_id: shard data}, index). The index
+    holds roles.json plus the course_id -> role_id and domain_id -> role_id maps
+    the getters need to find a shard.
+    """
+    courses = data["courses.json"]
+    shards: dict = {}
 
-# Convenience mapping for generate_gap_map(): domain_id -> description string
-# domains.json uses role-scoped top-level keys (e.g. "rm_prompting"); the domain_id
-# field inside each entry is still the flat key ("prompting"). Build the mapping
-# from field values so callers continue to use flat keys as before.
-DOMAIN_DESCRIPTIONS: dict = {
-    d["domain_id"]: d["description"]
-    for d in DOMAINS.values()
+    def _shard(role_id: str) -> dict:
+        if role_id not in shards:
+            shards[role_id] = {
+                "role_id": role_id, "domains": {}, "diagnostic_items": [], "courses": {},
+                "reading": {}, "scenarios": {}, "eval_items": {},
+            }
+        return shards[role_id]
+
+    domain_roles: dict = {}
+    for key, d in data["domains.json"].items():
+        role_id = d.get("role_id") or ""
+        _shard(role_id)["domains"][key] = d
+        domain_roles.setdefault(d["domain_id"], role_id)   # first match wins, as get_domain's fallback
+    for item in data["diagnostic_items.json"]:
+        _shard(item.get("role_id") or "")["diagnostic_items"].append(item)
+
+    course_roles: dict = {}
+    for field, filename in (
+        ("courses", "courses.json"),
+        ("reading", "reading_content.json"),
+        ("scenarios", "practice_scenarios.json"),
+        ("eval_items", "evaluation_items.json"),
+    ):
+        for course_id, entry in data[filename].items():
+            role_id = course_roles.setdefault(course_id, _course_role(course_id, courses))
+            _shard(role_id)[field][course_id] = entry
+
+    index = {
+        "roles": data["roles.json"],
+        "course_roles": course_roles,
+        "domain_roles": domain_roles,
+    }
+    return shards, index
+
+
+def _atomic_write_json(path: Path, data, indent: Optional[int] = None) -> None:
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, delete=False, suffix=".tmp", encoding="utf-8"
+    ) as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        tmp_path = f.name
+    os.replace(tmp_path, path)
+
+
+def _intern(value):
+    """Intern every string in a JSON value so marshal stores each distinct string once."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(k): _intern(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+
+def _build_snapshot(content_dir: Path, content_hash: str) -> dict:
+    """
+    Compile the content files into shards/content.snap for this content_hash and
+    return its header. Layout: preamble (magic, format, header length), the
+    marshal-encoded header, then each role's marshal-encoded shard at the
+    (offset, length) the header records, relative to the end of the header.
+    The file is replaced atomically; processes that mapped the previous
+    snapshot keep reading it until they drop that bundle.
+    """
+    # Stat before reading: a file rewritten in between leaves a mismatch, never a false match
+    sources = _source_stats(content_dir)
+    data = {name: json.loads((content_dir / name).read_bytes()) for name in CONTENT_FILES}
+    shards, index = _split_roles(data)
+
+    blobs = []
+    spans = {}
+    offset = 0
+    for role_id, shard in shards.items():
+        blob = marshal.dumps(_intern(shard))
+        spans[role_id] = (offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+    header = {
+        "content_hash": content_hash,
+        "python": list(sys.version_info[:2]),
+        "sources": sources,
+        "index": _intern(index),
+        "shards": spans,
+    }
+    header_blob = marshal.dumps(header)
+
+    shard_dir = content_dir / SHARD_DIR
+    shard_dir.mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=shard_dir, delete=False, suffix=".tmp") as f:
+        f.write(_SNAPSHOT_PREAMBLE.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_FORMAT, len(header_blob)))
+        f.write(header_blob)
+        for blob in blobs:
+            f.write(blob)
+        tmp_path = f.name
+    os.chmod(tmp_path, 0o644)   # readable by every worker process that maps it
+    os.replace(tmp_path, shard_dir / SNAPSHOT_FILE)
+    return header
+
+
+def _source_stats(content_dir: Path) -> dict:
+    """{file name: [size, mtime_ns]} of each content file; None for a missing one."""
+    stats = {}
+    for name in CONTENT_FILES:
+        try:
+            st = os.stat(content_dir / name)
+        except FileNotFoundError:
+            stats[name] = None
+            continue
+        stats[name] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def _files_match_manifest(content_dir: Path, manifest: dict) -> bool:
+    """True if every content file on disk has the SHA-256 the manifest records for it."""
+    files = manifest.get("files", {})
+    try:
+        return all(_sha256((content_dir / name).read_bytes()) == files.get(name) for name in CONTENT_FILES)
+    except FileNotFoundError:
+        return False
+
+
+# ── Manifest ──────────────────────────────────────────────────────────────────
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _bundle_hash(file_hashes: dict) -> str:
+    """Content hash of the whole bundle: SHA-256 over the sorted per-file hashes."""
+    return _sha256("".join(f"{name}:{file_hashes[name]}\n" for name in sorted(file_hashes)).encode())
+
+
+def read_manifest(content_dir: Optional[Path] = None) -> Optional[dict]:
+    """Return the parsed manifest.json, or None if it is missing or unreadable."""
+    try:
+        with open(Path(content_dir or _CONTENT_DIR) / MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_manifest(content_dir: Optional[Path] = None) -> dict:
+    """
+    Hash the content files, recompile the snapshot and atomically write
+    manifest.json with the next version number. Call this after every content
+    file has been written — the manifest is the publish signal running app
+    processes watch for.
+    """
+    content_dir = Path(content_dir or _CONTENT_DIR)
+    files = {name: _sha256((content_dir / name).read_bytes()) for name in CONTENT_FILES}
+    previous = read_manifest(content_dir) or {}
+    manifest = {
+        "version": int(previous.get("version", 0)) + 1,
+        "content_hash": _bundle_hash(files),
+        "files": files,
+    }
+    _build_snapshot(content_dir, manifest["content_hash"])
+    if previous.get("content_hash") == manifest["content_hash"]:
+        return previous   # nothing changed — keep the published version
+
+    _atomic_write_json(content_dir / MANIFEST_FILE, manifest, indent=2)
+    return manifest
+
+
+# ── Bundle ────────────────────────────────────────────────────────────────────
+
+# Module attributes served from the current bundle (see __getattr__)
+_BUNDLE_ATTRS = {
+    "ROLES", "DOMAINS", "DIAGNOSTIC_ITEMS", "COURSES", "READING", "SCENARIOS", "EVAL_ITEMS",
+    "DOMAIN_DESCRIPTIONS",
 }
 
 
+class _Bundle:
+    """
+    One immutable content version: the role index plus its role shards, either
+    all resident (loaded from the content files) or decoded from the mapped
+    snapshot on first use into an LRU of cache_size roles.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        content_hash: str,
+        index: dict,
+        shards: Optional[dict] = None,
+        snapshot: Optional[memoryview] = None,
+        spans: Optional[dict] = None,
+        cache_size: int = 8,
+    ):
+        self.version = version
+        self.content_hash = content_hash
+        self.loaded_at = time.time()
+        self.roles: dict = index["roles"]
+        self.course_roles: dict = index["course_roles"]
+        self.domain_roles: dict = index["domain_roles"]
+        self._resident = shards            # role_id -> _RoleShard, when fully loaded
+        self._snapshot = snapshot          # shard blobs, addressed by spans
+        self._spans: dict = spans or {}
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size = max(cache_size, 1)
+        self._lock = threading.Lock()
+        self._stats = {"shard_hits": 0, "shard_loads": 0, "shard_evictions": 0}
+
+    @property
+    def mode(self) -> str:
+        return "full" if self._resident is not None else "snapshot"
+
+    def shard(self, role_id: str) -> _RoleShard:
+        if self._resident is not None:
+            return self._resident.get(role_id, _EMPTY_SHARD)
+        if role_id not in self._spans:
+            return _EMPTY_SHARD
+        with self._lock:
+            shard = self._cache.get(role_id)
+            if shard is not None:
+                self._cache.move_to_end(role_id)
+                self._stats["shard_hits"] += 1
+                return shard
+        shard = self._read_shard(role_id)
+        with self._lock:
+            self._cache[role_id] = shard
+            self._stats["shard_loads"] += 1
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+                self._stats["shard_evictions"] += 1
+        return shard
+
+    def _read_shard(self, role_id: str) -> _RoleShard:
+        offset, length = self._spans[role_id]
+        return _make_shard(marshal.loads(self._snapshot[offset:offset + length]))
+
+    def all_shards(self) -> list:
+        """Every role's shard in index order (read directly, bypassing the LRU)."""
+        if self._resident is not None:
+            return list(self._resident.values())
+        return [self._read_shard(role_id) for role_id in self._spans]
+
+    def merged(self, name: str):
+        """Rebuild a whole-file view (DOMAINS, COURSES, ...) across every role shard."""
+        if name == "ROLES":
+            return self.roles
+        shards = self.all_shards()
+        if name == "DIAGNOSTIC_ITEMS":
+            return [item for s in shards for item in s.diagnostic_items]
+        if name == "DOMAIN_DESCRIPTIONS":
+            # domain_id -> description string, flat keys across all roles (for generate_gap_map())
+            return {d["domain_id"]: d["description"] for s in shards for d in s.domains.values()}
+        field = {
+            "DOMAINS": "domains", "COURSES": "courses", "READING": "reading",
+            "SCENARIOS": "scenarios", "EVAL_ITEMS": "eval_items",
+        }[name]
+        return {k: v for s in shards for k, v in getattr(s, field).items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = list(self._resident or self._cache)
+            return {**self._stats, "resident_roles": resident}
+
+
+def _shard_cache_size() -> int:
+    return int(os.environ.get("CONTENT_SHARD_CACHE_SIZE", "8"))
+
+
+def _map_snapshot(content_dir: Path) -> Optional[tuple[mmap.mmap, dict, int]]:
+    """Map shards/content.snap and decode its header: (mapping, header, shard data offset), or None."""
+    try:
+        with open(Path(content_dir) / SHARD_DIR / SNAPSHOT_FILE, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError, OSError):
+        return None
+    try:
+        magic, fmt, header_len = _SNAPSHOT_PREAMBLE.unpack_from(mapped, 0)
+        if magic != _SNAPSHOT_MAGIC or fmt != _SNAPSHOT_FORMAT:
+            raise ValueError("not a content snapshot")
+        start = _SNAPSHOT_PREAMBLE.size
+        header = marshal.loads(mapped[start:start + header_len])
+    except (struct.error, ValueError, EOFError, TypeError) as e:
+        logging.warning(f"Ignoring unreadable content snapshot: {e}")
+        mapped.close()
+        return None
+    return mapped, header, start + header_len
+
+
+def read_snapshot_header(content_dir: Optional[Path] = None) -> Optional[dict]:
+    """Return the snapshot header ({"content_hash", "python", "index", "shards"}), or None."""
+    snapshot = _map_snapshot(content_dir or _CONTENT_DIR)
+    if snapshot is None:
+        return None
+    mapped, header, _ = snapshot
+    mapped.close()
+    return header
+
+
+def _load_snapshot_bundle(content_dir: Path, manifest: Optional[dict]) -> Optional[_Bundle]:
+    """The snapshot-backed bundle, or None if no usable snapshot matches the manifest."""
+    if not manifest:
+        return None
+    snapshot = _map_snapshot(content_dir)
+    if snapshot is None:
+        return None
+    mapped, header, data_offset = snapshot
+    if header.get("content_hash") != manifest.get("content_hash") or header.get("python") != list(sys.version_info[:2]):
+        mapped.close()
+        return None
+    # Size / mtime changed (a hand edit, or just a copy): trust the snapshot only if the files still hash to the manifest
+    if header.get("sources") != _source_stats(content_dir) and not _files_match_manifest(content_dir, manifest):
+        logging.warning(
+            "Content files changed since the snapshot was built — run scripts/build_content.py; "
+            "loading the JSON files instead"
+        )
+        mapped.close()
+        return None
+    return _Bundle(
+        version=int(manifest.get("version", 0)),
+        content_hash=header["content_hash"],
+        index=header["index"],
+        snapshot=memoryview(mapped)[data_offset:],
+        spans=header["shards"],
+        cache_size=_shard_cache_size(),
+    )
+
+
+def _load_full_bundle(content_dir: Path, manifest: Optional[dict]) -> _Bundle:
+    """
+    Read, verify and split every content file. Raises ContentBundleError if a
+    file's hash differs from the manifest — the caller keeps its current bundle.
+    """
+    raw = {name: (content_dir / name).read_bytes() for name in CONTENT_FILES}
+    file_hashes = {name: _sha256(data) for name, data in raw.items()}
+    if manifest:
+        stale = sorted(n for n in CONTENT_FILES if manifest.get("files", {}).get(n) != file_hashes[n])
+        if stale:
+            raise ContentBundleError(f"content files do not match manifest v{manifest.get('version')}: {stale}")
+
+    shards, index = _split_roles({name: json.loads(raw[name]) for name in CONTENT_FILES})
+    return _Bundle(
+        version=int((manifest or {}).get("version", 0)),
+        content_hash=_bundle_hash(file_hashes),
+        index=index,
+        shards={role_id: _make_shard(shard) for role_id, shard in shards.items()},
+    )
+
+
+def _load_bundle(content_dir: Path, manifest: Optional[dict]) -> _Bundle:
+    bundle = _load_snapshot_bundle(content_dir, manifest)
+    if bundle is None:
+        logging.info("No content snapshot matches the manifest — loading every content file")
+        bundle = _load_full_bundle(content_dir, manifest)
+    return bundle
+
+
+_bundle: Optional[_Bundle] = None
+_bundle_lock = threading.Lock()
+_watcher: Optional[threading.Thread] = None
+
+
+def _loaded_bundle() -> _Bundle:
+    global _bundle
+    bundle = _bundle
+    if bundle is not None:
+        return bundle
+    with _bundle_lock:
+        if _bundle is None:
+            manifest = read_manifest()
+            try:
+                _bundle = _load_bundle(_CONTENT_DIR, manifest)
+            except ContentBundleError as e:
+                # Nothing to fall back to at startup: serve what is on disk, unverified
+                logging.warning(f"Loading content without manifest verification: {e}")
+                _bundle = _load_full_bundle(_CONTENT_DIR, None)
+        return _bundle
+
+
+_PIN_KEY = "_content_bundle_pin"
+
+
+def pin_content_for_run() -> None:
+    """
+    Start a new content pin for this Streamlit script run. Every page calls it
+    right after st.set_page_config(); the run's first content read then pins
+    the newest bundle in st.session_state for the rest of the run.
+    """
+    import streamlit as st
+
+    st.session_state.pop(_PIN_KEY, None)
+
+
+def _current() -> _Bundle:
+    """
+    The bundle for this read. Inside a Streamlit script run the first bundle read
+    is pinned in st.session_state until the next pin_content_for_run(), so a
+    reload mid-run cannot mix versions.
+    """
+    bundle = _loaded_bundle()
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return bundle
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return bundle
+
+    _start_watcher()
+    pin = st.session_state.get(_PIN_KEY)
+    if pin is not None:
+        return pin
+    st.session_state[_PIN_KEY] = bundle
+    return bundle
+
+
+def reload_content(force: bool = False) -> bool:
+    """
+    Reload the bundle if the manifest's content_hash changed (or always, with
+    force). Returns True if a new bundle was swapped in. Raises
+    ContentBundleError if the files on disk do not match the manifest yet.
+    """
+    global _bundle
+    manifest = read_manifest()
+    current = _loaded_bundle()
+    if not force and (manifest is None or manifest.get("content_hash") == current.content_hash):
+        return False
+    bundle = _load_bundle(_CONTENT_DIR, manifest)
+    with _bundle_lock:
+        _bundle = bundle
+    logging.info(f"Content bundle v{bundle.version} loaded ({bundle.content_hash[:12]}, {bundle.mode})")
+    return True
+
+
+def _watch_manifest(interval: float) -> None:
+    """Daemon loop: reload the bundle whenever manifest.json changes."""
+    last_stat = None
+    while True:
+        time.sleep(interval)
+        try:
+            stat = os.stat(_CONTENT_DIR / MANIFEST_FILE)
+        except FileNotFoundError:
+            continue
+        if (stat.st_mtime_ns, stat.st_size) == last_stat:
+            continue
+        try:
+            reload_content()
+            last_stat = (stat.st_mtime_ns, stat.st_size)
+        except ContentBundleError as e:
+            logging.info(f"Content reload deferred: {e}")   # retried on the next tick
+        except Exception as e:
+            logging.warning(f"Content reload failed: {e}")
+
+
+def _start_watcher() -> None:
+    global _watcher
+    interval = float(os.environ.get("CONTENT_RELOAD_SECONDS", "30"))
+    if _watcher is not None or interval <= 0:
+        return
+    with _bundle_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(
+                target=_watch_manifest, args=(interval,), name="content-watcher", daemon=True
+            )
+            _watcher.start()
+
+
+def get_content_version() -> dict:
+    """
+    Return {"version", "content_hash", "loaded_at", "mode", "resident_roles",
+    "shard_hits", "shard_loads", "shard_evictions"} for the bundle being served.
+    """
+    bundle = _loaded_bundle()
+    return {
+        "version": bundle.version,
+        "content_hash": bundle.content_hash,
+        "loaded_at": bundle.loaded_at,
+        "mode": bundle.mode,
+        **bundle.stats(),
+    }
+
+
+def __getattr__(name: str):
+    if name in _BUNDLE_ATTRS:
+        return _current().merged(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # ── Typed getters ─────────────────────────────────────────────────────────────
 
 def get_role(role_id: str) -> dict:
-    return ROLES[role_id]
+    return _current().roles[role_id]
 
 
-def get_domain(domain_id: str, role_id: str = "rm") -> dict:
+def get_domain(domain_id: str, role_id: str = "rm") -> Mapping:
     # DOMAINS keys are role-scoped ("rm_prompting"); look up by domain_id + role_id.
-    match = next(
-        (d for d in DOMAINS.values() if d["domain_id"] == domain_id and d.get("role_id") == role_id),
-        None,
-    )
-    if match is None:
+    bundle = _current()
+    match = bundle.shard(role_id).domain_by_id.get(domain_id)
+    if match is None and domain_id in bundle.domain_roles:
         # Fallback: any domain with matching domain_id
-        match = next((d for d in DOMAINS.values() if d["domain_id"] == domain_id), None)
+        match = bundle.shard(bundle.domain_roles[domain_id]).domain_by_id.get(domain_id)
     if match is None:
         raise KeyError(f"No domain with domain_id={domain_id!r} found in domains.json")
     return match
 
 
-def get_domain_descriptions(role_id: str = "rm") -> dict:
-    """Return {domain_id: description} for the given role."""
-    return {
-        d["domain_id"]: d["description"]
-        for d in DOMAINS.values()
-        if d.get("role_id") == role_id
-    }
+def get_domain_descriptions(role_id: str = "rm") -> Mapping:
+    """Return a read-only {domain_id: description} view for the given role."""
+    return _current().shard(role_id).descriptions
+
+
+def get_diagnostic_items(role_id: str = "rm") -> tuple:
+    """Returns diagnostic items for the given role as a tuple, ordered by display_order."""
+    return _current().shard(role_id).diagnostic_items
 
 
-def get_diagnostic_items(role_id: str = "rm") -> list:
-    """Returns diagnostic items for the given role, ordered by display_order."""
-    return [i for i in DIAGNOSTIC_ITEMS if i.get("role_id") == role_id]
+def _course_shard(course_id: str) -> _RoleShard:
+    bundle = _current()
+    return bundle.shard(bundle.course_roles[course_id])
 
 
 def get_course(course_id: str) -> dict:
-    return COURSES[course_id]
+    return _course_shard(course_id).courses[course_id]
 
 
 def get_reading(course_id: str) -> dict:
-    return READING[course_id]
+    return _course_shard(course_id).reading[course_id]
 
 
 def get_scenario(course_id: str) -> dict:
-    return SCENARIOS[course_id]
+    return _course_shard(course_id).scenarios[course_id]
 
 
 def get_eval_items(course_id: str) -> list:
     """Returns list of 4 evaluation items for the given course, ordered by sequence."""
-    return EVAL_ITEMS[course_id]
+    return _course_shard(course_id).eval_items[course_id]
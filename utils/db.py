@@ -1,271 +1,1261 @@
 """
 Firestore database layer for AI Hero Academy.
 
-Replaces Databricks Delta tables with GCP Firestore collections.
-Maintains same API interface (execute, query_one) for backward compatibility.
+Replaces Databricks Delta tables with GCP Firestore collections. Storage goes
+through a backend from utils/db_backends.py (DB_BACKEND=firestore|sqlite), so the
+same API also runs against an embedded SQLite file with no GCP project.
+
+Two interfaces:
+- Typed repository API (get_user, latest_completed_diagnostic, list_progress,
+  update_progress, insert_*...) — each function maps directly onto one Firestore
+  point read, query or write, with limit()/order_by() and field projection.
+- write_batch() / WriteBatch — unit of work that queues typed writes and
+  commits them atomically in one round trip.
+- execute / query_one — the original SQL-like interface, kept as a compatibility
+  shim. Statements are parsed once (cached per statement text) and dispatched to
+  the typed API; placeholders are bound to the column they belong to.
+
+Reads are cached per Streamlit session (DB_CACHE_TTL_SECONDS). With
+FIRESTORE_LISTENERS=1 they are instead served from a per-learner in-memory
+mirror kept current by on_snapshot listeners, released when the session ends.
 
 Firestore Schema:
-- users/{user_email} → user_profiles
+- users/{user_email} → user_profiles (+ denormalized state_summary, see below)
 - users/{user_email}/diagnostic_sessions/{session_id}
 - users/{user_email}/gap_maps/{gap_map_id}
 - users/{user_email}/training_progress/{progress_id}
 - users/{user_email}/coach_sessions/{session_id}
 - ai_call_log/{log_id} → top-level collection
+
+state_summary is a map on users/{user_email} that mirrors what routing needs to
+know about the subcollections, so get_user_state() is a single point read:
+- diagnostic_completed: bool
+- latest_diagnostic_session_id: str | None
+- latest_diagnostic_completed_at: timestamp | None
+- has_training_progress: bool
+It is written in the same batch as the diagnostic_sessions / training_progress
+row that changes it.
 """
 
 import os
-import json
+import re
+import copy
+import time
 import uuid
+import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Any
+
+from utils.db_backends import OrderBy, get_backend, merge_fields
+
+
+def _user_path(user_email: str) -> str:
+    return f"users/{user_email}"
+
+
+def _commit(writes: List[tuple]) -> None:
+    """
+    Apply (op, path, data) writes atomically through the storage backend — op is
+    "set", "merge", "update" or "create" (only if absent). Cached reads of every
+    touched (user, collection) are invalidated afterwards, and the writes are
+    applied to any attached snapshot-listener mirror (with their server update
+    times, when the backend returns them).
+    """
+    versions = get_backend().commit(writes)
+
+    cache = _session_cache()
+    if cache is not None:
+        for _, path, _ in writes:
+            cache.invalidate(_cache_scope(path))
+    _apply_to_mirrors(writes, versions)
+
+
+# ── Per-session read-through cache ────────────────────────────────────────────
+# Streamlit reruns the whole page on every interaction, so the same guard reads
+# (profile, latest diagnostic, training_progress) would otherwise hit Firestore
+# on every button click. Typed reads are cached in st.session_state, keyed by the
+# normalized call (function + arguments) and scoped to (user_email, collection).
+# Writes through this module invalidate their scope; entries also expire after
+# DB_CACHE_TTL_SECONDS (0 disables the cache). Calls made outside a Streamlit
+# script run (scripts, worker threads) bypass the cache.
+
+_SESSION_CACHE_KEY = "_db_read_cache"
+
+
+class _ReadCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[tuple, tuple] = {}   # key -> (expires_at, scope, value)
+
+    def get_or_load(self, key: tuple, scope: tuple, loader):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+        self.misses += 1
+        value = loader()
+        self._entries[key] = (now + self.ttl, scope, value)
+        return copy.deepcopy(value)
+
+    def invalidate(self, scope: tuple) -> None:
+        self._entries = {k: e for k, e in self._entries.items() if e[1] != scope}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def _session_cache() -> Optional[_ReadCache]:
+    """The current Streamlit session's cache, or None outside a script run / when disabled."""
+    ttl = float(os.environ.get("DB_CACHE_TTL_SECONDS", "60"))
+    if ttl <= 0:
+        return None
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    cache = st.session_state.get(_SESSION_CACHE_KEY)
+    if cache is None:
+        cache = st.session_state[_SESSION_CACHE_KEY] = _ReadCache(ttl)
+    return cache
+
+
+def _cache_scope(path: str) -> tuple:
+    """Map a document path to its (user_email, collection) invalidation scope."""
+    parts = path.split("/")
+    if parts[0] == "users" and len(parts) >= 2:
+        return (parts[1], parts[2] if len(parts) > 2 else "users")
+    return (None, parts[0])
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _cached_read(collection: str):
+    """Decorator: serve a typed read from the session cache, scoped to (user_email, collection)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = _session_cache()
+            if cache is None:
+                return fn(*args, **kwargs)
+            user_email = None
+            if collection != "ai_call_log":
+                user_email = args[0] if args else kwargs.get("user_email")
+                if _user_mirror(user_email, collection) is not None:
+                    return fn(*args, **kwargs)   # already a local lookup, always current
+            key = (fn.__name__, _freeze(args), _freeze(kwargs))
+            return cache.get_or_load(key, (user_email, collection), lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def get_read_cache_stats() -> Dict:
+    """Hit/miss counters and entry count for the current session's read cache."""
+    cache = _session_cache()
+    return cache.stats() if cache is not None else {"hits": 0, "misses": 0, "entries": 0}
+
+
+# ── Snapshot-listener mirror ──────────────────────────────────────────────────
+# With FIRESTORE_LISTENERS=1, the first read for a learner inside a Streamlit
+# script run attaches on_snapshot listeners to users/{email} and its four
+# subcollections. Firestore pushes every change into an in-memory mirror, and
+# typed reads for that learner are answered from it synchronously (no round trip,
+# no TTL). Writes through _commit are applied to the mirror as well, so a page
+# never reads back older data than it just wrote. Mirrors are shared by all
+# sessions of the same learner and released by a reaper thread once none of
+# those sessions is still active in the Streamlit runtime.
+
+_MIRRORED_COLLECTIONS = ("diagnostic_sessions", "gap_maps", "training_progress", "coach_sessions")
+
+_mirrors: Dict[str, "_UserMirror"] = {}
+_mirrors_lock = threading.Lock()
+_reaper: Optional[threading.Thread] = None
+
+
+def _listeners_enabled() -> bool:
+    if os.environ.get("FIRESTORE_LISTENERS", "").lower() not in ("1", "true", "yes"):
+        return False
+    return get_backend().supports_listeners
+
+
+def _sort_key(value):
+    # Firestore orders null before any other value; keep mixed None/values sortable.
+    return (value is not None, value)
+
+
+class _UserMirror:
+    """In-memory copy of users/{user_email} and its subcollections, fed by snapshot listeners."""
+
+    def __init__(self, user_email: str):
+        self.user_email = user_email
+        self.sessions = set()
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Dict[str, Dict]] = {c: {} for c in ("users",) + _MIRRORED_COLLECTIONS}
+        # Server update time of each mirrored document's current data (from a snapshot or our own write)
+        self._versions: Dict[str, Dict[str, Any]] = {c: {} for c in self._docs}
+        self._ready = set()
+        self._watches = []
+
+    def start(self) -> None:
+        backend = get_backend()
+        user_path = _user_path(self.user_email)
+        self._watches.append(backend.listen(user_path, functools.partial(self._on_snapshot, "users")))
+        for collection in _MIRRORED_COLLECTIONS:
+            self._watches.append(
+                backend.listen(f"{user_path}/{collection}", functools.partial(self._on_snapshot, collection))
+            )
+
+    def stop(self) -> None:
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+        self._watches = []
+        with self._lock:
+            self._ready.clear()
+
+    def _on_snapshot(self, collection: str, changes: List[tuple]) -> None:
+        # Patch document by document. A snapshot can arrive after one of our own writes
+        # was applied locally without containing it yet; never roll such a document back.
+        with self._lock:
+            docs, versions = self._docs[collection], self._versions[collection]
+            for doc_id, data, update_time in changes:
+                local = versions.get(doc_id)
+                if local is not None and update_time is not None and update_time < local:
+                    continue
+                if data is None:
+                    docs.pop(doc_id, None)
+                    versions.pop(doc_id, None)
+                else:
+                    docs[doc_id] = data
+                    versions[doc_id] = update_time
+            self._ready.add(collection)
+
+    def is_ready(self, collection: str) -> bool:
+        return collection in self._ready
+
+    def apply(self, op: str, collection: str, doc_id: str, data: Dict, version: Any = None) -> None:
+        with self._lock:
+            docs = self._docs[collection]
+            if op == "set":
+                docs[doc_id] = copy.deepcopy(data)
+            elif op == "create":
+                if doc_id in docs:
+                    return
+                docs[doc_id] = copy.deepcopy(data)
+            elif op == "merge" or doc_id in docs:
+                merge_fields(docs.setdefault(doc_id, {}), data)
+            else:
+                return
+            if version is not None:
+                self._versions[collection][doc_id] = version
+
+    def get(self, collection: str, doc_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        with self._lock:
+            doc = self._docs[collection].get(doc_id)
+            if doc is None:
+                return None
+            return copy.deepcopy({k: v for k, v in doc.items() if k in fields} if fields else doc)
+
+    def query(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        not_null: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        order_by: Optional[OrderBy] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """Same semantics as the Firestore query _query() would build, evaluated locally."""
+        with self._lock:
+            rows = [
+                doc for doc in self._docs[collection].values()
+                if all(doc.get(f) == v for f, v in (filters or {}).items())
+                and (not_null is None or doc.get(not_null) is not None)
+            ]
+        for field, descending in reversed(order_by or ()):
+            rows = [r for r in rows if field in r]
+            rows.sort(key=lambda r: _sort_key(r[field]), reverse=descending)
+        if limit is not None:
+            rows = rows[:limit]
+        if fields:
+            rows = [{k: v for k, v in r.items() if k in fields} for r in rows]
+        return copy.deepcopy(rows)
+
+
+def _user_mirror(user_email: Optional[str], collection: str) -> Optional[_UserMirror]:
+    """
+    The learner's mirror if it is ready to serve collection, else None. Attaches
+    listeners on first use from a script run and registers the calling session.
+    """
+    if not user_email or not _listeners_enabled():
+        return None
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        mirror = _mirrors.get(user_email)
+        return mirror if mirror is not None and mirror.is_ready(collection) else None
+
+    with _mirrors_lock:
+        mirror = _mirrors.get(user_email)
+        if mirror is None:
+            mirror = _mirrors[user_email] = _UserMirror(user_email)
+            mirror.start()
+            _start_reaper()
+        mirror.sessions.add(ctx.session_id)
+    return mirror if mirror.is_ready(collection) else None
+
+
+def _apply_to_mirrors(writes: List[tuple], versions: Optional[List[Any]] = None) -> None:
+    if not _mirrors:
+        return
+    for i, (op, path, data) in enumerate(writes):
+        user_email, collection = _cache_scope(path)
+        mirror = _mirrors.get(user_email)
+        if mirror is not None:
+            mirror.apply(op, collection, path.rsplit("/", 1)[1], data, versions[i] if versions else None)
+
+
+def detach_user_mirror(user_email: str) -> None:
+    """Unsubscribe the learner's listeners and drop the mirror (e.g. on sign-out or reset)."""
+    with _mirrors_lock:
+        mirror = _mirrors.pop(user_email, None)
+    if mirror is not None:
+        mirror.stop()
+
+
+def _reap_mirrors() -> None:
+    """Release mirrors whose sessions have all ended. Runs on a daemon thread."""
+    interval = float(os.environ.get("FIRESTORE_LISTENER_REAP_SECONDS", "30"))
+    from streamlit.runtime import Runtime
+
+    while True:
+        time.sleep(interval)
+        if not Runtime.exists():
+            continue
+        runtime = Runtime.instance()
+        with _mirrors_lock:
+            idle = []
+            for user_email, mirror in _mirrors.items():
+                mirror.sessions = {s for s in mirror.sessions if runtime.is_active_session(s)}
+                if not mirror.sessions:
+                    idle.append(user_email)
+            released = [_mirrors.pop(user_email) for user_email in idle]
+        for mirror in released:
+            mirror.stop()
+
+
+def _start_reaper() -> None:
+    global _reaper
+    if _reaper is None:
+        _reaper = threading.Thread(target=_reap_mirrors, name="firestore-mirror-reaper", daemon=True)
+        _reaper.start()
+
+
+def get_listener_stats() -> Dict:
+    """Attached mirrors and the sessions holding them, for diagnostics."""
+    with _mirrors_lock:
+        return {
+            "mirrors": len(_mirrors),
+            "sessions": sum(len(m.sessions) for m in _mirrors.values()),
+        }
+
+
+def _write_op(build):
+    """
+    Decorator for typed writes. build(...) returns (writes, doc_data); the decorated
+    function commits the writes immediately and returns doc_data. The builder stays
+    reachable as .build so WriteBatch can queue the same writes instead.
+    """
+    @functools.wraps(build)
+    def commit_now(*args, **kwargs) -> Dict:
+        writes, doc_data = build(*args, **kwargs)
+        _commit(writes)
+        return doc_data
+
+    commit_now.build = build
+    return commit_now
+
+
+# ── Typed repository API: reads ───────────────────────────────────────────────
+
+def _query(
+    user_email: str,
+    collection: str,
+    filters: Optional[Dict[str, Any]] = None,
+    not_null: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    order_by: Optional[OrderBy] = None,
+    limit: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Query users/{user_email}/{collection}: equality filters, an optional
+    "field != null" condition, ordering, limit and projection. Served from the
+    learner's snapshot mirror when one is attached, otherwise from the backend.
+    """
+    mirror = _user_mirror(user_email, collection)
+    if mirror is not None:
+        return mirror.query(collection, filters, not_null, fields, order_by, limit)
+    return get_backend().query(f"{_user_path(user_email)}/{collection}", filters, not_null, fields, order_by, limit)
+
+
+@_cached_read("users")
+def get_user(user_email: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    """Return the users/{user_email} profile (optionally only fields), or None."""
+    mirror = _user_mirror(user_email, "users")
+    if mirror is not None:
+        return mirror.get("users", user_email, fields)
+    return get_backend().get(_user_path(user_email), fields)
+
+
+@_cached_read("diagnostic_sessions")
+def list_diagnostics(
+    user_email: str,
+    completed_only: bool = True,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    order_by: Optional[OrderBy] = None,
+) -> List[Dict]:
+    """
+    Diagnostic sessions; completed_only returns completed sessions, newest first
+    (the != filter fixes that order). order_by applies to the unfiltered read.
+    """
+    if completed_only:
+        return _query(user_email, "diagnostic_sessions", not_null="completed_at",
+                      fields=fields, order_by=(("completed_at", True),), limit=limit)
+    return _query(user_email, "diagnostic_sessions", fields=fields, order_by=order_by, limit=limit)
+
+
+@_cached_read("diagnostic_sessions")
+def latest_completed_diagnostic(user_email: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    """Most recent completed diagnostic session, or None. Reads one document."""
+    rows = list_diagnostics(user_email, completed_only=True, fields=fields, limit=1)
+    return rows[0] if rows else None
+
+
+@_cached_read("gap_maps")
+def list_gap_maps(
+    user_email: str,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    order_by: Optional[OrderBy] = (("generated_at", True),),
+) -> List[Dict]:
+    """Gap maps, newest first by default."""
+    return _query(user_email, "gap_maps", fields=fields, order_by=order_by, limit=limit)
+
+
+@_cached_read("gap_maps")
+def latest_gap_map(user_email: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    """Most recently generated gap map, or None. Reads one document."""
+    rows = list_gap_maps(user_email, fields=fields, limit=1)
+    return rows[0] if rows else None
+
+
+@_cached_read("training_progress")
+def list_progress(
+    user_email: str,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    order_by: Optional[OrderBy] = (("module_sequence_order", False),),
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict]:
+    """
+    training_progress rows for the user, ordered by module_sequence_order by default.
+    filters are equality conditions evaluated by Firestore (single-field indexes).
+    """
+    return _query(user_email, "training_progress", filters=filters,
+                  fields=fields, order_by=order_by, limit=limit)
+
+
+@_cached_read("training_progress")
+def get_progress_by_course(user_email: str, course_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    """The user's training_progress row for course_id, or None. One indexed read."""
+    rows = list_progress(user_email, fields, limit=1, order_by=None, filters={"course_id": course_id})
+    return rows[0] if rows else None
+
+
+@_cached_read("training_progress")
+def get_progress_by_sequence(
+    user_email: str,
+    module_sequence_order: int,
+    fields: Optional[List[str]] = None,
+) -> Optional[Dict]:
+    """The user's training_progress row at module_sequence_order, or None. One indexed read."""
+    rows = list_progress(
+        user_email, fields, limit=1, order_by=None,
+        filters={"module_sequence_order": int(module_sequence_order)},
+    )
+    return rows[0] if rows else None
+
+
+@_cached_read("coach_sessions")
+def list_coach_sessions(
+    user_email: str,
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    order_by: Optional[OrderBy] = None,
+) -> List[Dict]:
+    return _query(user_email, "coach_sessions", fields=fields, order_by=order_by, limit=limit)
+
+
+@_cached_read("ai_call_log")
+def list_ai_calls(
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    order_by: Optional[OrderBy] = None,
+) -> List[Dict]:
+    return get_backend().query("ai_call_log", fields=fields, order_by=order_by, limit=limit)
+
+
+# ── Typed repository API: writes ──────────────────────────────────────────────
+
+@_write_op
+def create_user(user_email: str, display_name: str, role_id: str):
+    doc_data = {
+        "user_email": user_email,
+        "display_name": display_name,
+        "role_id": role_id,
+        "created_at": datetime.now(),
+        "state_summary": {
+            "diagnostic_completed": False,
+            "latest_diagnostic_session_id": None,
+            "latest_diagnostic_completed_at": None,
+            "has_training_progress": False,
+        },
+    }
+    return [("set", _user_path(user_email), doc_data)], doc_data
+
+
+@_write_op
+def insert_diagnostic_session(
+    session_id: str,
+    user_email: str,
+    responses: str = "{}",
+    item_scores: str = "{}",
+    domain_scores: str = "{}",
+    overall_score: float = 0.0,
+    completed: bool = True,
+):
+    """Write a diagnostic session; a completed one also updates state_summary in the same batch."""
+    now = datetime.now()
+    doc_data = {
+        "session_id": session_id,
+        "user_email": user_email,
+        "started_at": now,
+        "completed_at": now if completed else None,
+        "responses": responses or "{}",
+        "item_scores": item_scores or "{}",
+        "domain_scores": domain_scores or "{}",
+        "overall_score": float(overall_score) if overall_score else 0.0,
+    }
+    user_path = _user_path(user_email)
+    writes = [("set", f"{user_path}/diagnostic_sessions/{session_id}", doc_data)]
+    if completed:
+        writes.append(_state_summary_write(
+            user_email,
+            diagnostic_completed=True,
+            latest_diagnostic_session_id=session_id,
+            latest_diagnostic_completed_at=now,
+        ))
+    return writes, doc_data
+
+
+@_write_op
+def insert_gap_map(
+    gap_map_id: str,
+    user_email: str,
+    source_type: str,
+    source_id: str,
+    bullets: Any,
+):
+    doc_data = {
+        "gap_map_id": gap_map_id,
+        "user_email": user_email,
+        "source_type": source_type,
+        "source_id": source_id,
+        "bullets": bullets,
+        "generated_at": datetime.now(),
+    }
+    return [("set", f"{_user_path(user_email)}/gap_maps/{gap_map_id}", doc_data)], doc_data
+
+
+def _progress_doc(
+    progress_id: str, user_email: str, course_id: str, module_sequence_order: int, is_locked: bool,
+) -> Dict:
+    """A new training_progress row: nothing completed yet."""
+    return {
+        "progress_id": progress_id,
+        "user_email": user_email,
+        "course_id": course_id,
+        "module_sequence_order": int(module_sequence_order),
+        "is_locked": bool(is_locked) if is_locked is not None else True,
+        "reading_completed_at": None,
+        "practice_completed_at": None,
+        "evaluation_score": None,
+        "evaluation_completed_at": None,
+        "domain_score_after": None,
+    }
+
+
+@_write_op
+def insert_progress(
+    progress_id: str,
+    user_email: str,
+    course_id: str,
+    module_sequence_order: int,
+    is_locked: bool = True,
+):
+    """Write a training_progress row and flag has_training_progress in the same batch."""
+    doc_data = _progress_doc(progress_id, user_email, course_id, module_sequence_order, is_locked)
+    return [
+        ("set", f"{_user_path(user_email)}/training_progress/{progress_id}", doc_data),
+        _state_summary_write(user_email, has_training_progress=True),
+    ], doc_data
+
+
+def progress_doc_id(user_email: str, course_id: str) -> str:
+    """Deterministic progress_id for (user_email, course_id) — re-enrolling never duplicates a row."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"training_progress/{user_email}/{course_id}"))
 
-from google.cloud import firestore
 
-_client = None
+@_write_op
+def enroll_courses(user_email: str, course_ids: List[str]):
+    """
+    Write the learner's whole personalised sequence in one batch: one
+    training_progress row per course (module 1 unlocked, the rest locked) plus the
+    state_summary flag. Document IDs come from progress_doc_id() and rows are
+    created only if absent, so a repeated call (a double click, a second tab)
+    leaves existing rows and their progress untouched. Returns the rows as a
+    first enrolment writes them.
+    """
+    writes, rows = [], []
+    user_path = _user_path(user_email)
+    for i, course_id in enumerate(course_ids):
+        progress_id = progress_doc_id(user_email, course_id)
+        row = _progress_doc(progress_id, user_email, course_id, i + 1, is_locked=i > 0)
+        writes.append(("create", f"{user_path}/training_progress/{progress_id}", row))
+        rows.append(row)
+    if rows:
+        writes.append(_state_summary_write(user_email, has_training_progress=True))
+    return writes, rows
+
+
+@_write_op
+def insert_coach_session(
+    session_id: str,
+    user_email: str,
+    course_id: str,
+    conversation_json: str = "[]",
+    turn_count: int = 0,
+    completed: bool = False,
+    started_at: Optional[datetime] = None,
+):
+    """Write a coach session; started_at defaults to now (pass the practice start for a real duration)."""
+    now = datetime.now()
+    doc_data = {
+        "session_id": session_id,
+        "user_email": user_email,
+        "course_id": course_id,
+        "started_at": started_at or now,
+        "completed_at": now if completed else None,
+        "turn_count": int(turn_count or 0),
+        "conversation_json": conversation_json or "[]",
+    }
+    return [("set", f"{_user_path(user_email)}/coach_sessions/{session_id}", doc_data)], doc_data
+
+
+@_write_op
+def insert_ai_call_log(
+    log_id: str,
+    user_email: str,
+    call_type: str,
+    model_endpoint: str,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    latency_ms: int = 0,
+    success: bool = True,
+    error_message: Optional[str] = None,
+):
+    doc_data = {
+        "log_id": log_id,
+        "user_email": user_email,
+        "call_type": call_type,
+        "model_endpoint": model_endpoint,
+        "prompt_tokens": int(prompt_tokens) if prompt_tokens else None,
+        "completion_tokens": int(completion_tokens) if completion_tokens else None,
+        "latency_ms": int(latency_ms or 0),
+        "success": bool(success),
+        "error_message": error_message,
+        "called_at": datetime.now(),
+    }
+    return [("set", f"ai_call_log/{log_id}", doc_data)], doc_data
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() not in ("false", "0", "")
+    return bool(value)
+
+
+# Value coercion for training_progress fields written through update_progress
+_PROGRESS_FIELD_TYPES = {
+    "module_sequence_order": int,
+    "is_locked": _to_bool,
+    "evaluation_score": float,
+    "domain_score_after": float,
+}
+
+
+@_write_op
+def update_progress(user_email: str, progress_id: str, **fields):
+    """
+    Update fields on users/{user_email}/training_progress/{progress_id} — one write,
+    addressed by document ID (progress_id is the document ID).
+    Returns the applied update dict.
+    """
+    update_data = {
+        k: (_PROGRESS_FIELD_TYPES[k](v) if k in _PROGRESS_FIELD_TYPES and v is not None else v)
+        for k, v in fields.items()
+    }
+    path = f"{_user_path(user_email)}/training_progress/{progress_id}"
+    return [("update", path, update_data)], update_data
+
+
+def _find_progress_owner(progress_id: str) -> Optional[str]:
+    """
+    Resolve the user_email owning a progress_id when the caller did not supply it.
+    One collection-group read on progress_id (requires the collection-group
+    single-field index on training_progress.progress_id).
+    """
+    docs = get_backend().query_group(
+        "training_progress", {"progress_id": progress_id}, fields=["user_email"], limit=1,
+    )
+    return docs[0].get("user_email") if docs else None
+
+
+# ── Unit of work ──────────────────────────────────────────────────────────────
+
+class WriteBatch:
+    """
+    Queue typed writes and commit them together in one atomic Firestore
+    WriteBatch — one round trip, and either every write lands or none does.
+
+    Methods mirror the typed write API and return the doc_data that will be
+    written. Use via write_batch(), which commits on a clean exit.
+    """
+
+    # Firestore rejects batches with more than 500 writes
+    MAX_WRITES = 500
+
+    def __init__(self):
+        self._writes: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def _queue(self, built: tuple) -> Dict:
+        writes, doc_data = built
+        if len(self._writes) + len(writes) > self.MAX_WRITES:
+            raise RuntimeError(f"WriteBatch exceeds {self.MAX_WRITES} writes")
+        self._writes.extend(writes)
+        return doc_data
+
+    def create_user(self, *args, **kwargs) -> Dict:
+        return self._queue(create_user.build(*args, **kwargs))
+
+    def insert_diagnostic_session(self, *args, **kwargs) -> Dict:
+        return self._queue(insert_diagnostic_session.build(*args, **kwargs))
+
+    def insert_gap_map(self, *args, **kwargs) -> Dict:
+        return self._queue(insert_gap_map.build(*args, **kwargs))
+
+    def insert_progress(self, *args, **kwargs) -> Dict:
+        return self._queue(insert_progress.build(*args, **kwargs))
+
+    def enroll_courses(self, *args, **kwargs) -> List[Dict]:
+        return self._queue(enroll_courses.build(*args, **kwargs))
+
+    def insert_coach_session(self, *args, **kwargs) -> Dict:
+        return self._queue(insert_coach_session.build(*args, **kwargs))
+
+    def insert_ai_call_log(self, *args, **kwargs) -> Dict:
+        return self._queue(insert_ai_call_log.build(*args, **kwargs))
+
+    def update_progress(self, *args, **kwargs) -> Dict:
+        return self._queue(update_progress.build(*args, **kwargs))
+
+    def commit(self) -> None:
+        """Commit every queued write in one round trip, then reset the batch."""
+        if self._writes:
+            _commit(self._writes)
+        self._writes = []
+
+
+@contextmanager
+def write_batch():
+    """
+    with write_batch() as batch:
+        batch.update_progress(user_email, progress_id, evaluation_score=3.5)
+        batch.insert_gap_map(...)
+
+    Commits on a clean exit; if the block raises, nothing is written.
+    """
+    batch = WriteBatch()
+    yield batch
+    batch.commit()
+
+
+# Subcollections under users/{user_email}, in the order delete_user() clears them
+USER_COLLECTIONS = ("coach_sessions", "gap_maps", "training_progress", "diagnostic_sessions")
+
+
+def delete_user(user_email: str) -> Dict[str, int]:
+    """
+    Delete users/{user_email} and every subcollection document. Returns the number
+    of documents removed per collection ("users" is 0 or 1).
+    """
+    counts = get_backend().delete_user(user_email, USER_COLLECTIONS)
+    cache = _session_cache()
+    if cache is not None:
+        for collection in ("users",) + USER_COLLECTIONS:
+            cache.invalidate((user_email, collection))
+    detach_user_mirror(user_email)
+    return counts
+
+
+# ── Routing state ─────────────────────────────────────────────────────────────
+
+@_cached_read("users")
+def get_user_state(user_email: str) -> tuple[str, Optional[str]]:
+    """
+    Returns (state, role_id) where state is one of:
+    new_user | needs_diagnostic | needs_course | in_training
+    role_id is None for new_user, otherwise the role from user_profiles.
+
+    Resolved from users/{user_email}.state_summary in one point read. Profiles
+    created before state_summary existed (or holding only the flags a write
+    merged in since) are backfilled on first access.
+    """
+    profile = get_user(user_email)
+    if profile is None:
+        return "new_user", None
+
+    role_id = profile.get("role_id")
+    summary = profile.get("state_summary")
+    if summary is None or not _STATE_SUMMARY_FIELDS <= summary.keys():
+        summary = _backfill_state_summary(user_email)
+
+    if not summary.get("diagnostic_completed"):
+        return "needs_diagnostic", role_id
+    if not summary.get("has_training_progress"):
+        return "needs_course", role_id
+    return "in_training", role_id
+
+
+_STATE_SUMMARY_FIELDS = frozenset({
+    "diagnostic_completed",
+    "latest_diagnostic_session_id",
+    "latest_diagnostic_completed_at",
+    "has_training_progress",
+})
 
 
-def _get_client() -> firestore.Client:
-    """Get Firestore client instance."""
-    global _client
-    if _client is None:
-        project_id = os.environ.get("GCP_PROJECT_ID") or os.environ.get("GOOGLE_CLOUD_PROJECT")
-        if not project_id:
-            raise RuntimeError("GCP_PROJECT_ID or GOOGLE_CLOUD_PROJECT environment variable not set")
-        _client = firestore.Client(project=project_id)
-    return _client
+def _backfill_state_summary(user_email: str) -> Dict:
+    """Derive the full state_summary from the subcollections and persist it (legacy profiles only)."""
+    latest = latest_completed_diagnostic(user_email, fields=["session_id", "completed_at"])
+    has_progress = bool(list_progress(user_email, fields=["progress_id"], limit=1, order_by=None))
 
+    summary = {
+        "diagnostic_completed": latest is not None,
+        "latest_diagnostic_session_id": latest.get("session_id") if latest else None,
+        "latest_diagnostic_completed_at": latest.get("completed_at") if latest else None,
+        "has_training_progress": has_progress,
+    }
+    _commit([("merge", _user_path(user_email), {"state_summary": summary})])
+    return summary
+
+
+def _state_summary_write(user_email: str, **changes) -> tuple:
+    """
+    The blind merge write that applies changes to users/{user_email}.state_summary.
+    On a legacy profile this leaves a partial summary, which get_user_state()
+    backfills from the subcollections.
+    """
+    return ("merge", _user_path(user_email), {"state_summary": dict(changes)})
+
+
+# ── SQL compatibility shim ────────────────────────────────────────────────────
 
 def execute(statement: str, parameters: list = None) -> List[Dict]:
     """
     Execute a 'SQL-like' statement against Firestore.
 
-    This function parses simplified SQL statements and converts them to Firestore operations.
-    Supports: SELECT, INSERT, UPDATE for the 6 main collections.
+    Supports SELECT, INSERT and UPDATE for the 6 main collections by mapping the
+    parsed statement onto the typed repository API above.
 
     Returns list of dicts (same interface as original Databricks version).
     """
-    statement = statement.strip()
-
-    # Parse statement type
-    if statement.upper().startswith("SELECT"):
-        return _execute_select(statement, parameters)
-    elif statement.upper().startswith("INSERT"):
-        return _execute_insert(statement, parameters)
-    elif statement.upper().startswith("UPDATE"):
-        return _execute_update(statement, parameters)
-    else:
-        raise RuntimeError(f"Unsupported statement type: {statement[:20]}...")
+    return _execute(_parse_statement(statement.strip()), parameters or [])
 
 
 def query_one(statement: str, parameters: list = None) -> Optional[Dict]:
-    """Execute a statement and return the first row, or None."""
-    rows = execute(statement, parameters)
+    """Execute a statement and return the first row, or None. Reads at most one document."""
+    stmt = _parse_statement(statement.strip())
+    if stmt.op == "SELECT":
+        stmt = stmt._replace(limit=1)
+    rows = _execute(stmt, parameters or [])
     return rows[0] if rows else None
 
 
+def _execute(stmt: "_Statement", parameters: list) -> List[Dict]:
+    if stmt.op == "SELECT":
+        return _execute_select(stmt, parameters)
+    elif stmt.op == "INSERT":
+        return _execute_insert(stmt, parameters)
+    elif stmt.op == "UPDATE":
+        return _execute_update(stmt, parameters)
+    raise RuntimeError(f"Unsupported statement type: {stmt.op}")
+
+
 def escape(s: str) -> str:
     """Legacy function for SQL compatibility - no-op in Firestore."""
     return s
 
 
-def _execute_select(statement: str, parameters: list = None) -> List[Dict]:
-    """Parse SELECT statement and execute Firestore query."""
-    db = _get_client()
+class _Statement(NamedTuple):
+    """A parsed SQL-like statement. Value slots are ("param"|"now"|"literal", value) tokens."""
+    op: str
+    table: str
+    columns: tuple          # SELECT projection / INSERT column list ("*" → empty)
+    values: tuple           # INSERT value tokens, aligned with columns
+    assignments: tuple      # UPDATE ((column, token), ...)
+    conditions: tuple       # WHERE ((column, "=" | "is null" | "is not null", token), ...)
+    order_by: tuple         # ((column, descending), ...)
+    limit: Optional[int]
 
-    # Simple parser for the 6 main table patterns used in the app
-    statement_lower = statement.lower()
 
-    if "from users" in statement_lower or "user_profiles" in statement_lower:
-        user_email = parameters[0] if parameters else None
-        if user_email:
-            doc = db.collection("users").document(user_email).get()
-            return [doc.to_dict()] if doc.exists else []
-        return []
+_TABLE_RE = {
+    "SELECT": re.compile(r"^SELECT\s+(?P<cols>.+?)\s+FROM\s+(?P<table>\w+)", re.I | re.S),
+    "INSERT": re.compile(
+        r"^INSERT\s+INTO\s+(?P<table>\w+)\s*\((?P<cols>[^)]*)\)\s*VALUES\s*\((?P<vals>.*)\)\s*$",
+        re.I | re.S,
+    ),
+    "UPDATE": re.compile(r"^UPDATE\s+(?P<table>\w+)\s+SET\s+(?P<set>.+?)(?:\s+WHERE\s+|$)", re.I | re.S),
+}
+_WHERE_RE = re.compile(r"\bWHERE\s+(?P<where>.+?)(?=\s+ORDER\s+BY\b|\s+LIMIT\b|$)", re.I | re.S)
+_ORDER_RE = re.compile(r"\bORDER\s+BY\s+(?P<order>.+?)(?=\s+LIMIT\b|$)", re.I | re.S)
+_LIMIT_RE = re.compile(r"\bLIMIT\s+(?P<limit>\d+)", re.I)
+_TABLE_ALIASES = {"user_profiles": "users"}
 
-    elif "diagnostic_sessions" in statement_lower:
-        user_email = parameters[0] if parameters else None
-        if user_email:
-            ref = db.collection("users").document(user_email).collection("diagnostic_sessions")
-            if "completed_at is not null" in statement_lower:
-                # Get completed sessions only
-                query = ref.where("completed_at", "!=", None)
-                if "order by completed_at desc" in statement_lower:
-                    query = query.order_by("completed_at", direction=firestore.Query.DESCENDING)
-                sessions = query.stream()
-            else:
-                sessions = ref.stream()
-            return [doc.to_dict() for doc in sessions]
-        return []
 
-    elif "gap_maps" in statement_lower:
-        user_email = parameters[0] if parameters else None
-        if user_email:
-            maps = db.collection("users").document(user_email).collection("gap_maps").stream()
-            return [doc.to_dict() for doc in maps]
-        return []
+@lru_cache(maxsize=256)
+def _parse_statement(statement: str) -> _Statement:
+    """Parse a statement once; later calls with the same text hit the cache."""
+    op = statement.split(None, 1)[0].upper() if statement else ""
+    pattern = _TABLE_RE.get(op)
+    match = pattern.match(statement) if pattern else None
+    if not match:
+        raise RuntimeError(f"Unsupported statement: {statement[:50]}...")
 
-    elif "training_progress" in statement_lower:
-        user_email = parameters[0] if parameters else None
-        if user_email:
-            query = db.collection("users").document(user_email).collection("training_progress")
-            if "order by module_sequence_order" in statement_lower:
-                query = query.order_by("module_sequence_order")
-            progress = query.stream()
-            return [doc.to_dict() for doc in progress]
-        return []
+    table = match.group("table").lower()
+    table = _TABLE_ALIASES.get(table, table)
+    columns, values, assignments = (), (), ()
 
-    elif "coach_sessions" in statement_lower:
-        user_email = parameters[0] if parameters else None
-        if user_email:
-            sessions = db.collection("users").document(user_email).collection("coach_sessions").stream()
-            return [doc.to_dict() for doc in sessions]
-        return []
+    if op == "SELECT":
+        cols = [c.strip() for c in match.group("cols").split(",")]
+        columns = () if cols == ["*"] else tuple(cols)
+    elif op == "INSERT":
+        columns = tuple(c.strip() for c in match.group("cols").split(","))
+        values = tuple(_parse_value(v) for v in _split_top_level(match.group("vals")))
+        if len(columns) != len(values):
+            raise RuntimeError(f"INSERT column/value count mismatch: {statement[:50]}...")
+    elif op == "UPDATE":
+        assignments = tuple(
+            (col.strip(), _parse_value(val))
+            for col, val in (a.split("=", 1) for a in _split_top_level(match.group("set")))
+        )
+
+    conditions = ()
+    where = _WHERE_RE.search(statement) if op != "INSERT" else None
+    if where:
+        conditions = tuple(_parse_condition(c) for c in re.split(r"\s+AND\s+", where.group("where").strip(), flags=re.I))
+
+    order_by = ()
+    order = _ORDER_RE.search(statement)
+    if order:
+        order_by = tuple(
+            (parts[0], len(parts) > 1 and parts[1].upper() == "DESC")
+            for parts in (o.split() for o in order.group("order").split(","))
+        )
+
+    limit = _LIMIT_RE.search(statement)
+    return _Statement(
+        op, table, columns, values, assignments, conditions, order_by,
+        int(limit.group("limit")) if limit else None,
+    )
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses or quotes."""
+    parts, depth, quote, current = [], 0, False, []
+    for ch in text:
+        if ch == "'":
+            quote = not quote
+        elif not quote and ch == "(":
+            depth += 1
+        elif not quote and ch == ")":
+            depth -= 1
+        elif not quote and depth == 0 and ch == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _parse_value(token: str) -> tuple:
+    token = token.strip()
+    lowered = token.lower()
+    if "?" in token:                         # ? or CAST(? AS TIMESTAMP)
+        return ("param", None)
+    if lowered in ("current_timestamp()", "current_timestamp", "now()"):
+        return ("now", None)
+    if token.startswith("'") and token.endswith("'"):
+        return ("literal", token[1:-1].replace("''", "'"))
+    if lowered in ("true", "false"):
+        return ("literal", lowered == "true")
+    if lowered == "null":
+        return ("literal", None)
+    try:
+        return ("literal", int(token))
+    except ValueError:
+        try:
+            return ("literal", float(token))
+        except ValueError:
+            return ("literal", token)
+
+
+def _parse_condition(text: str) -> tuple:
+    text = text.strip()
+    null_match = re.match(r"^(\w+)\s+IS\s+(NOT\s+)?NULL$", text, re.I)
+    if null_match:
+        return (null_match.group(1), "is not null" if null_match.group(2) else "is null", None)
+    col, val = text.split("=", 1)
+    return (col.strip(), "=", _parse_value(val))
+
+
+def _bind(tokens, params) -> list:
+    """Resolve value tokens against the positional parameter iterator."""
+    bound = []
+    for kind, value in tokens:
+        if kind == "param":
+            bound.append(next(params))
+        elif kind == "now":
+            bound.append(datetime.now())
+        else:
+            bound.append(value)
+    return bound
+
+
+def _bind_conditions(stmt: _Statement, params) -> tuple[Dict, List[tuple]]:
+    """Return (equality filters {column: value}, null checks [(column, op)])."""
+    equals, null_checks = {}, []
+    for col, op, token in stmt.conditions:
+        if op == "=":
+            equals[col] = _bind([token], params)[0]
+        else:
+            null_checks.append((col, op))
+    return equals, null_checks
 
-    elif "ai_call_log" in statement_lower:
-        # Top-level collection
-        logs = db.collection("ai_call_log").stream()
-        return [doc.to_dict() for doc in logs]
 
+def _matches(row: Dict, equals: Dict, null_checks: List[tuple]) -> bool:
+    for col, value in equals.items():
+        if row.get(col) != value:
+            return False
+    for col, op in null_checks:
+        if (row.get(col) is None) != (op == "is null"):
+            return False
+    return True
+
+
+def _execute_select(stmt: _Statement, parameters: list) -> List[Dict]:
+    """
+    Map a parsed SELECT onto the typed read API.
+
+    ORDER BY and LIMIT are pushed down to Firestore whenever every WHERE condition
+    is also evaluated server-side; otherwise the residual conditions are applied
+    here and the limit after them.
+    """
+    equals, null_checks = _bind_conditions(stmt, iter(parameters))
+    fields = list(stmt.columns) or None
+    user_email = equals.pop("user_email", None)
+
+    if stmt.table == "users":
+        row = get_user(user_email, fields) if user_email else None
+        return [row] if row else []
+
+    completed_only = stmt.table == "diagnostic_sessions" and ("completed_at", "is not null") in null_checks
+    if completed_only:
+        null_checks.remove(("completed_at", "is not null"))
+    # The != filter orders completed sessions by completed_at DESC server-side; any other
+    # ORDER BY is applied here, on the full set, before the limit.
+    sort_here = bool(completed_only and stmt.order_by and stmt.order_by != (("completed_at", True),))
+    residual = bool(equals or null_checks) or sort_here
+    # Residual filter columns may be outside the projection — fetch full rows, project below.
+    query_fields = None if residual else fields
+    limit = None if residual else stmt.limit
+    order_kw = {"order_by": stmt.order_by} if stmt.order_by else {}
+
+    if stmt.table == "ai_call_log":
+        rows = list_ai_calls(query_fields, limit, **order_kw)
+    elif not user_email:
+        return []
+    elif stmt.table == "diagnostic_sessions":
+        if completed_only:
+            rows = list_diagnostics(user_email, completed_only=True, fields=query_fields, limit=limit)
+        else:
+            rows = list_diagnostics(user_email, completed_only=False, fields=query_fields, limit=limit, **order_kw)
+    elif stmt.table == "gap_maps":
+        rows = list_gap_maps(user_email, query_fields, limit, **order_kw)
+    elif stmt.table == "training_progress":
+        # Equality filters are indexed server-side; combined with ORDER BY they would
+        # need a composite index, so a filtered read (at most 5 rows) is sorted here.
+        filters = dict(equals)
+        equals.clear()
+        residual = bool(null_checks)
+        query_fields = None if residual else fields
+        limit = None if residual else stmt.limit
+        if filters:
+            rows = _sort_rows(list_progress(user_email, query_fields, limit, order_by=None, filters=filters), stmt.order_by)
+        else:
+            rows = list_progress(user_email, query_fields, limit, **order_kw)
+    elif stmt.table == "coach_sessions":
+        rows = list_coach_sessions(user_email, query_fields, limit, **order_kw)
     else:
-        raise RuntimeError(f"Unsupported SELECT statement: {statement[:50]}...")
-
-
-def _execute_insert(statement: str, parameters: list = None) -> List[Dict]:
-    """Parse INSERT statement and execute Firestore write."""
-    db = _get_client()
-    statement_lower = statement.lower()
-
-    if "user_profiles" in statement_lower or "into users" in statement_lower:
-        # Extract values from INSERT statement (simplified parser)
-        # Expected: INSERT INTO users (user_email, display_name, role_id) VALUES (?, ?, ?)
-        if parameters and len(parameters) >= 3:
-            user_email, display_name, role_id = parameters[0], parameters[1], parameters[2]
-            doc_data = {
-                "user_email": user_email,
-                "display_name": display_name,
-                "role_id": role_id,
-                "created_at": datetime.now()
-            }
-            db.collection("users").document(user_email).set(doc_data)
-            return [doc_data]
-
-    elif "diagnostic_sessions" in statement_lower:
-        if parameters and len(parameters) >= 7:
-            session_id, user_email = parameters[0], parameters[1]
-            doc_data = {
-                "session_id": session_id,
-                "user_email": user_email,
-                "started_at": datetime.now(),
-                "completed_at": datetime.now() if parameters[2] else None,
-                "responses": parameters[3] or "{}",
-                "item_scores": parameters[4] or "{}",
-                "domain_scores": parameters[5] or "{}",
-                "overall_score": float(parameters[6]) if parameters[6] else 0.0
-            }
-            db.collection("users").document(user_email).collection("diagnostic_sessions").document(session_id).set(doc_data)
-            return [doc_data]
-
-    elif "gap_maps" in statement_lower:
-        if parameters and len(parameters) >= 5:
-            gap_map_id, user_email = parameters[0], parameters[1]
-            doc_data = {
-                "gap_map_id": gap_map_id,
-                "user_email": user_email,
-                "source_type": parameters[2],
-                "source_id": parameters[3],
-                "bullets": parameters[4],
-                "generated_at": datetime.now()
-            }
-            db.collection("users").document(user_email).collection("gap_maps").document(gap_map_id).set(doc_data)
-            return [doc_data]
-
-    elif "training_progress" in statement_lower:
-        if parameters and len(parameters) >= 5:
-            progress_id, user_email = parameters[0], parameters[1]
-            doc_data = {
-                "progress_id": progress_id,
-                "user_email": user_email,
-                "course_id": parameters[2],
-                "module_sequence_order": int(parameters[3]),
-                "is_locked": bool(parameters[4]) if parameters[4] is not None else True,
-                "reading_completed_at": None,
-                "practice_completed_at": None,
-                "evaluation_score": None,
-                "evaluation_completed_at": None,
-                "domain_score_after": None
-            }
-            db.collection("users").document(user_email).collection("training_progress").document(progress_id).set(doc_data)
-            return [doc_data]
-
-    elif "coach_sessions" in statement_lower:
-        if parameters and len(parameters) >= 4:
-            session_id, user_email = parameters[0], parameters[1]
-            doc_data = {
-                "session_id": session_id,
-                "user_email": user_email,
-                "course_id": parameters[2],
-                "started_at": datetime.now(),
-                "completed_at": None,
-                "turn_count": 0,
-                "conversation_json": parameters[3] or "[]"
-            }
-            db.collection("users").document(user_email).collection("coach_sessions").document(session_id).set(doc_data)
-            return [doc_data]
-
-    elif "ai_call_log" in statement_lower:
-        if parameters and len(parameters) >= 6:
-            log_id = parameters[0]
-            doc_data = {
-                "log_id": log_id,
-                "user_email": parameters[1],
-                "call_type": parameters[2],
-                "model_endpoint": parameters[3],
-                "prompt_tokens": int(parameters[4]) if parameters[4] else None,
-                "completion_tokens": int(parameters[5]) if parameters[5] else None,
-                "latency_ms": int(parameters[6]) if len(parameters) > 6 else 0,
-                "success": bool(parameters[7]) if len(parameters) > 7 else True,
-                "error_message": parameters[8] if len(parameters) > 8 else None,
-                "called_at": datetime.now()
-            }
-            db.collection("ai_call_log").document(log_id).set(doc_data)
-            return [doc_data]
+        raise RuntimeError(f"Unsupported SELECT table: {stmt.table}")
 
-    return []
+    if residual:
+        rows = [r for r in rows if _matches(r, equals, null_checks)]
+        if sort_here:
+            rows = _sort_rows(rows, stmt.order_by)
+        rows = rows[:stmt.limit]
+        if fields:
+            rows = [{f: r.get(f) for f in fields} for r in rows]
+    return rows
+
+
+def _sort_rows(rows: List[Dict], order_by: OrderBy) -> List[Dict]:
+    """Sort rows in place by ((column, descending), ...); None sorts after values ascending."""
+    for col, descending in reversed(order_by):
+        rows.sort(key=lambda r: (r.get(col) is None, "" if r.get(col) is None else r.get(col)), reverse=descending)
+    return rows
+
+
+def _execute_insert(stmt: _Statement, parameters: list) -> List[Dict]:
+    """Map a parsed INSERT onto the typed write API, binding values by column name."""
+    row = dict(zip(stmt.columns, _bind(stmt.values, iter(parameters))))
+
+    if stmt.table == "users":
+        return [create_user(row["user_email"], row.get("display_name"), row.get("role_id"))]
 
+    if stmt.table == "diagnostic_sessions":
+        return [insert_diagnostic_session(
+            row["session_id"], row["user_email"],
+            responses=row.get("responses"),
+            item_scores=row.get("item_scores"),
+            domain_scores=row.get("domain_scores"),
+            overall_score=row.get("overall_score"),
+            completed=bool(row.get("completed_at")),
+        )]
 
-def _execute_update(statement: str, parameters: list = None) -> List[Dict]:
-    """Parse UPDATE statement and execute Firestore update."""
-    db = _get_client()
-    statement_lower = statement.lower()
-
-    if "training_progress" in statement_lower:
-        # Most UPDATE statements are for training_progress
-        # Pattern: UPDATE training_progress SET field=? WHERE user_email=? AND course_id=?
-        if parameters and len(parameters) >= 3:
-            field_value, user_email = parameters[0], parameters[1]
-
-            # Find the document to update
-            progress_docs = db.collection("users").document(user_email).collection("training_progress").stream()
-
-            for doc in progress_docs:
-                doc_data = doc.to_dict()
-                if len(parameters) > 2 and doc_data.get("course_id") == parameters[2]:
-                    # Determine which field to update based on statement content
-                    update_data = {}
-                    if "reading_completed_at" in statement_lower:
-                        update_data["reading_completed_at"] = datetime.now()
-                    elif "practice_completed_at" in statement_lower:
-                        update_data["practice_completed_at"] = datetime.now()
-                    elif "evaluation_score" in statement_lower:
-                        update_data["evaluation_score"] = float(field_value)
-                        update_data["evaluation_completed_at"] = datetime.now()
-                    elif "domain_score_after" in statement_lower:
-                        update_data["domain_score_after"] = float(field_value)
-                    elif "is_locked" in statement_lower:
-                        update_data["is_locked"] = bool(field_value)
-
-                    if update_data:
-                        doc.reference.update(update_data)
-                        return [doc_data | update_data]
+    if stmt.table == "gap_maps":
+        return [insert_gap_map(
+            row["gap_map_id"], row["user_email"],
+            row.get("source_type"), row.get("source_id"), row.get("bullets"),
+        )]
+
+    if stmt.table == "training_progress":
+        return [insert_progress(
+            row["progress_id"], row["user_email"], row["course_id"],
+            row["module_sequence_order"], row.get("is_locked", True),
+        )]
+
+    if stmt.table == "coach_sessions":
+        return [insert_coach_session(
+            row["session_id"], row["user_email"], row.get("course_id"),
+            conversation_json=row.get("conversation_json"),
+            turn_count=row.get("turn_count"),
+            completed=bool(row.get("completed_at")),
+        )]
+
+    if stmt.table == "ai_call_log":
+        return [insert_ai_call_log(
+            row["log_id"], row.get("user_email"), row.get("call_type"), row.get("model_endpoint"),
+            prompt_tokens=row.get("prompt_tokens"),
+            completion_tokens=row.get("completion_tokens"),
+            latency_ms=row.get("latency_ms"),
+            success=row.get("success", True),
+            error_message=row.get("error_message"),
+        )]
 
     return []
+
+
+def _execute_update(stmt: _Statement, parameters: list) -> List[Dict]:
+    """
+    Map a parsed UPDATE training_progress onto update_progress.
+
+    WHERE progress_id = ? updates the document by ID (one write; the owning user is
+    resolved with one indexed read if user_email is not in the WHERE clause).
+    Other equality conditions, e.g. (user_email, course_id) or
+    (user_email, module_sequence_order), become an indexed query for the target row.
+    """
+    if stmt.table != "training_progress":
+        return []
+
+    params = iter(parameters)
+    update_data = {col: value for (col, _), value in zip(stmt.assignments, _bind([t for _, t in stmt.assignments], params))}
+    equals, null_checks = _bind_conditions(stmt, params)
+    user_email = equals.pop("user_email", None)
+    progress_id = equals.pop("progress_id", None)
+
+    if progress_id is not None and not equals and not null_checks:
+        user_email = user_email or _find_progress_owner(progress_id)
+        if not user_email:
+            return []
+        return [{"progress_id": progress_id} | update_progress(user_email, progress_id, **update_data)]
+
+    if progress_id is not None:
+        equals["progress_id"] = progress_id
+        user_email = user_email or _find_progress_owner(progress_id)
+    if not user_email or not equals:
+        return []
+
+    updated = []
+    for row in list_progress(user_email, order_by=None, filters=equals):
+        if _matches(row, {}, null_checks):
+            updated.append(row | update_progress(user_email, row["progress_id"], **update_data))
+    return updated
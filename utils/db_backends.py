@@ -0,0 +1,440 @@
+"""
+Storage backends for utils/db.py.
+
+The typed repository API in utils/db.py is written against a small
+document-store interface keyed by Firestore-style paths:
+
+- users/{user_email}                               (document)
+- users/{user_email}/training_progress             (collection)
+- users/{user_email}/training_progress/{id}        (document)
+- ai_call_log/{log_id}                             (document)
+
+Two implementations:
+- FirestoreBackend — the production store (google.cloud.firestore).
+- SQLiteBackend    — an embedded, WAL-mode SQLite file with the same
+  collections and the same single-field indexes. Needs no GCP project, so it
+  is used for local runs, UAT resets, load tests and small single-container
+  deployments.
+
+Selected with DB_BACKEND=firestore|sqlite (default firestore); the SQLite file
+location comes from SQLITE_DB_PATH.
+"""
+
+import os
+import copy
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any, Sequence, Tuple
+
+# ((field, descending), ...)
+OrderBy = Sequence[Tuple[str, bool]]
+
+# (op, document_path, data) — op is "set", "merge", "update" or "create"
+# (create-if-absent: an existing document is left untouched)
+Write = Tuple[str, str, Dict]
+
+# (doc_id, data — None when the document was removed, server update time)
+DocChange = Tuple[str, Optional[Dict], Any]
+
+
+def merge_fields(target: Dict, data: Dict) -> None:
+    """Firestore set(merge=True) semantics: nested maps merge, everything else replaces."""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_fields(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _split_path(path: str) -> Tuple[str, str, str]:
+    """users/a@b.c/gap_maps/g1 -> ("users/a@b.c/gap_maps", "gap_maps", "g1")"""
+    parent, doc_id = path.rsplit("/", 1)
+    return parent, parent.rsplit("/", 1)[-1], doc_id
+
+
+class StorageBackend:
+    """Document-store operations used by utils/db.py."""
+
+    name = "base"
+    supports_listeners = False
+
+    def get(self, path: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """The document at path (optionally only fields), or None."""
+        raise NotImplementedError
+
+    def query(
+        self,
+        collection_path: str,
+        filters: Optional[Dict[str, Any]] = None,
+        not_null: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        order_by: Optional[OrderBy] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Documents in collection_path matching every equality filter and, if given,
+        with not_null set. Ordering drops documents missing an order field, as
+        Firestore does.
+        """
+        raise NotImplementedError
+
+    def query_group(
+        self,
+        collection: str,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """Like query(), across every collection with this name (collection-group query)."""
+        raise NotImplementedError
+
+    def commit(self, writes: List[Write]) -> Optional[List[Any]]:
+        """
+        Apply writes atomically. Backends with listeners return the server update
+        time of each write (in order), comparable with DocChange update times.
+        """
+        raise NotImplementedError
+
+    def delete_user(self, user_email: str, collections: Sequence[str]) -> Dict[str, int]:
+        """Delete users/{user_email} and its subcollections; returns counts per collection."""
+        raise NotImplementedError
+
+    def listen(self, path: str, callback: Callable[[List[DocChange]], None]):
+        """
+        Call callback([(doc_id, data, update_time), ...]) with the documents that
+        changed under a document or collection path — every document on the first
+        call, data None for a removed one. Returns a handle with .unsubscribe().
+        """
+        raise NotImplementedError(f"{self.name} backend does not support listeners")
+
+
+# ── Firestore ─────────────────────────────────────────────────────────────────
+
+class FirestoreBackend(StorageBackend):
+    name = "firestore"
+    supports_listeners = True
+
+    def __init__(self):
+        from google.cloud import firestore
+
+        self._firestore = firestore
+        self._client = None
+
+    @property
+    def client(self):
+        """Get Firestore client instance."""
+        if self._client is None:
+            project_id = os.environ.get("GCP_PROJECT_ID") or os.environ.get("GOOGLE_CLOUD_PROJECT")
+            if not project_id:
+                raise RuntimeError("GCP_PROJECT_ID or GOOGLE_CLOUD_PROJECT environment variable not set")
+            self._client = self._firestore.Client(project=project_id)
+        return self._client
+
+    def _stream(self, query, fields, order_by, limit) -> List[Dict]:
+        # Ordering, limit and projection are all applied server-side, so only the
+        # requested documents/fields are read.
+        for field, descending in order_by or ():
+            query = query.order_by(
+                field,
+                direction=self._firestore.Query.DESCENDING if descending else self._firestore.Query.ASCENDING,
+            )
+        if limit is not None:
+            query = query.limit(limit)
+        if fields:
+            query = query.select(fields)
+        return [doc.to_dict() for doc in query.stream()]
+
+    def get(self, path, fields=None):
+        ref = self.client.document(path)
+        doc = ref.get(field_paths=fields) if fields else ref.get()
+        return doc.to_dict() if doc.exists else None
+
+    def query(self, collection_path, filters=None, not_null=None, fields=None, order_by=None, limit=None):
+        query = self.client.collection(collection_path)
+        for field, value in (filters or {}).items():
+            query = query.where(field, "==", value)
+        if not_null:
+            query = query.where(not_null, "!=", None)
+        return self._stream(query, fields, order_by, limit)
+
+    def query_group(self, collection, filters, fields=None, limit=None):
+        query = self.client.collection_group(collection)
+        for field, value in filters.items():
+            query = query.where(field, "==", value)
+        return self._stream(query, fields, None, limit)
+
+    def commit(self, writes):
+        if any(op == "create" for op, _, _ in writes):
+            return self._commit_in_transaction(writes)
+        # A single write goes straight to the document; several share one WriteBatch.
+        if len(writes) == 1:
+            op, path, data = writes[0]
+            ref = self.client.document(path)
+            if op == "update":
+                result = ref.update(data)
+            else:
+                result = ref.set(data, merge=(op == "merge"))
+            return [result.update_time]
+        batch = self.client.batch()
+        for op, path, data in writes:
+            ref = self.client.document(path)
+            if op == "update":
+                batch.update(ref, data)
+            else:
+                batch.set(ref, data, merge=(op == "merge"))
+        return [result.update_time for result in batch.commit()]
+
+    def _commit_in_transaction(self, writes):
+        # A batch create() fails as a whole if any document exists, so create-if-absent
+        # reads the targets first, inside a transaction that retries on contention.
+        # The transaction does not expose its write results; no update times are returned.
+        @self._firestore.transactional
+        def run(transaction):
+            refs = [self.client.document(path) for op, path, _ in writes if op == "create"]
+            existing = {snap.reference.path for snap in transaction.get_all(refs) if snap.exists}
+            for op, path, data in writes:
+                ref = self.client.document(path)
+                if op == "create":
+                    if ref.path not in existing:
+                        transaction.create(ref, data)
+                elif op == "update":
+                    transaction.update(ref, data)
+                else:
+                    transaction.set(ref, data, merge=(op == "merge"))
+
+        run(self.client.transaction())
+        return None
+
+    def delete_user(self, user_email, collections):
+        user_ref = self.client.collection("users").document(user_email)
+        counts = {}
+        for sub in collections:
+            count = 0
+            for doc in user_ref.collection(sub).stream():
+                doc.reference.delete()
+                count += 1
+            counts[sub] = count
+        counts["users"] = 0
+        if user_ref.get().exists:
+            user_ref.delete()
+            counts["users"] = 1
+        return counts
+
+    def listen(self, path, callback):
+        if path.count("/") % 2:
+            ref = self.client.document(path)
+        else:
+            ref = self.client.collection(path)
+
+        def on_snapshot(docs, changes, read_time):
+            callback([
+                (change.document.id, None, read_time) if change.type.name == "REMOVED"
+                else (change.document.id, change.document.to_dict(), change.document.update_time)
+                for change in changes
+            ])
+
+        return ref.on_snapshot(on_snapshot)
+
+
+# ── SQLite ────────────────────────────────────────────────────────────────────
+# Every document is one row: its full path, its parent collection path, the
+# collection name (for collection-group queries) and the data as JSON. Datetimes
+# are stored as {"$dt": iso} so they round-trip and order correctly. Field
+# filters use json_extract() expressions, and the single-field indexes Firestore
+# maintains for the queries utils/db.py issues are declared as expression indexes
+# on the same expressions.
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path       TEXT PRIMARY KEY,
+    parent     TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_documents_parent ON documents (parent);
+CREATE INDEX IF NOT EXISTS ix_documents_collection ON documents (collection);
+"""
+
+# (index scope column, field) — mirrors the equality lookups in utils/db.py
+_SQLITE_FIELD_INDEXES = (
+    ("parent", "course_id"),
+    ("parent", "module_sequence_order"),
+    ("parent", "completed_at"),
+    ("collection", "progress_id"),
+)
+
+
+def _field_expr(field: str) -> str:
+    return f"json_extract(data, '$.\"{field}\"')"
+
+
+def _order_expr(field: str) -> str:
+    # Datetimes are objects; order by their ISO string, other values by themselves.
+    return f"COALESCE(json_extract(data, '$.\"{field}\".\"$dt\"'), {_field_expr(field)})"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in SQLite backend")
+
+
+def _decode(obj: Dict):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _dumps(data: Dict) -> str:
+    return json.dumps(data, default=_encode)
+
+
+def _loads(text: str) -> Dict:
+    return json.loads(text, object_hook=_decode)
+
+
+def _project(doc: Dict, fields: Optional[List[str]]) -> Dict:
+    return {k: v for k, v in doc.items() if k in fields} if fields else doc
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("SQLITE_DB_PATH", "data/aha.sqlite3")
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SQLITE_SCHEMA)
+            for scope, field in _SQLITE_FIELD_INDEXES:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_documents_{scope}_{field} "
+                    f"ON documents ({scope}, {_field_expr(field)})"
+                )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside the writer."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _select(self, scope: str, value: str, filters, not_null, order_by, limit) -> List[Dict]:
+        sql = [f"SELECT data FROM documents WHERE {scope} = ?"]
+        params: List[Any] = [value]
+        for field, expected in (filters or {}).items():
+            if expected is None:
+                sql.append(f"AND {_field_expr(field)} IS NULL")
+            else:
+                sql.append(f"AND {_field_expr(field)} = ?")
+                params.append(_dumps(expected) if isinstance(expected, datetime) else expected)
+        if not_null:
+            sql.append(f"AND {_field_expr(not_null)} IS NOT NULL")
+        for field, _ in order_by or ():
+            sql.append(f"AND json_type(data, '$.\"{field}\"') IS NOT NULL")
+        if order_by:
+            sql.append("ORDER BY " + ", ".join(
+                f"{_order_expr(field)} {'DESC' if descending else 'ASC'}" for field, descending in order_by
+            ))
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(int(limit))
+        rows = self._conn().execute(" ".join(sql), params).fetchall()
+        return [_loads(row[0]) for row in rows]
+
+    def get(self, path, fields=None):
+        row = self._conn().execute("SELECT data FROM documents WHERE path = ?", (path,)).fetchone()
+        return _project(_loads(row[0]), fields) if row else None
+
+    def query(self, collection_path, filters=None, not_null=None, fields=None, order_by=None, limit=None):
+        rows = self._select("parent", collection_path, filters, not_null, order_by, limit)
+        return [_project(doc, fields) for doc in rows]
+
+    def query_group(self, collection, filters, fields=None, limit=None):
+        rows = self._select("collection", collection, filters, None, None, limit)
+        return [_project(doc, fields) for doc in rows]
+
+    def commit(self, writes):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for op, path, data in writes:
+                parent, collection, _ = _split_path(path)
+                if op == "create":
+                    conn.execute(
+                        "INSERT OR IGNORE INTO documents (path, parent, collection, data) VALUES (?, ?, ?, ?)",
+                        (path, parent, collection, _dumps(data)),
+                    )
+                    continue
+                if op == "set":
+                    doc = data
+                else:
+                    row = conn.execute("SELECT data FROM documents WHERE path = ?", (path,)).fetchone()
+                    if row is None and op == "update":
+                        raise KeyError(f"No document to update: {path}")
+                    doc = _loads(row[0]) if row else {}
+                    if op == "merge":
+                        merge_fields(doc, data)
+                    else:
+                        doc.update(data)
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (path, parent, collection, data) VALUES (?, ?, ?, ?)",
+                    (path, parent, collection, _dumps(doc)),
+                )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def delete_user(self, user_email, collections):
+        conn = self._conn()
+        user_path = f"users/{user_email}"
+        counts = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sub in collections:
+                cur = conn.execute("DELETE FROM documents WHERE parent = ?", (f"{user_path}/{sub}",))
+                counts[sub] = cur.rowcount
+            counts["users"] = conn.execute("DELETE FROM documents WHERE path = ?", (user_path,)).rowcount
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return counts
+
+
+# ── Selection ─────────────────────────────────────────────────────────────────
+
+_BACKENDS = {
+    "firestore": FirestoreBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StorageBackend:
+    """The process-wide backend named by DB_BACKEND (default firestore)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("DB_BACKEND", "firestore").strip().lower()
+                if name not in _BACKENDS:
+                    raise RuntimeError(f"Unknown DB_BACKEND {name!r}; expected one of {sorted(_BACKENDS)}")
+                _backend = _BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend: StorageBackend) -> None:
+    """Install a backend instance explicitly (scripts, load tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
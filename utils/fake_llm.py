@@ -0,0 +1,561 @@
+"""
+Local stand-in LLM provider for offline benchmarking (LLM_PROVIDER=fake).
+
+Replaces the Gemini client used by utils/ai.py and the Databricks serving client
+used by scripts/generate_course_content.py with in-process fakes that speak the
+same interface, so retries, call logging and streaming all run unchanged. Each
+reply is a schema-valid canned response picked from the request itself — the
+prompt of each app call_type, the agent system prompt of each pipeline stage —
+and is deterministic for a given prompt and FAKE_LLM_SEED.
+
+Timing and failures are simulated per call:
+    FAKE_LLM_LATENCY_MS      median time to first token (default 800)
+    FAKE_LLM_LATENCY_DIST    lognormal | exponential | uniform | fixed (default lognormal)
+    FAKE_LLM_LATENCY_SIGMA   log-normal sigma, or ± fraction for uniform (default 0.4)
+    FAKE_LLM_TOKENS_PER_SEC  generation rate after the first token, 0 = instant (default 80)
+    FAKE_LLM_FAILURE_RATE    probability that a call raises instead of replying (default 0)
+    FAKE_LLM_MAX_CONCURRENCY calls in flight beyond this are rejected with a 429, 0 = no cap (default 0)
+    FAKE_LLM_SEED            seeds the replies and the latency/failure sampler
+"""
+
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+from typing import Callable, Iterator, NamedTuple
+
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 4     # streamed chunk size, roughly what Gemini / Databricks emit
+
+
+def enabled() -> bool:
+    """True when LLM_PROVIDER=fake selects this provider."""
+    return os.environ.get("LLM_PROVIDER", "").strip().lower() == "fake"
+
+
+class FakeLLMError(Exception):
+    """Failure injected by FAKE_LLM_FAILURE_RATE."""
+
+
+class _Settings(NamedTuple):
+    latency_ms: float
+    dist: str
+    sigma: float
+    tokens_per_sec: float
+    failure_rate: float
+    max_concurrency: int
+    seed: str
+
+
+def _settings() -> _Settings:
+    # Read per call so a benchmark can change them between runs in one process
+    return _Settings(
+        latency_ms=float(os.environ.get("FAKE_LLM_LATENCY_MS", "800")),
+        dist=os.environ.get("FAKE_LLM_LATENCY_DIST", "lognormal").lower(),
+        sigma=float(os.environ.get("FAKE_LLM_LATENCY_SIGMA", "0.4")),
+        tokens_per_sec=float(os.environ.get("FAKE_LLM_TOKENS_PER_SEC", "80")),
+        failure_rate=float(os.environ.get("FAKE_LLM_FAILURE_RATE", "0")),
+        max_concurrency=int(os.environ.get("FAKE_LLM_MAX_CONCURRENCY", "0")),
+        seed=os.environ.get("FAKE_LLM_SEED", "0"),
+    )
+
+
+# ── Timing, failures and stats ────────────────────────────────────────────────
+
+_sampler: random.Random | None = None
+_sampler_lock = threading.Lock()
+_stats = {"calls": 0, "failures": 0, "throttled": 0, "completion_tokens": 0, "by_kind": {}}
+_in_flight = 0
+
+
+def _sample(settings: _Settings) -> tuple[float, bool]:
+    """Draw (time to first token in seconds, inject failure?) from the shared sampler."""
+    global _sampler
+    median = max(settings.latency_ms, 0.0) / 1000
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = random.Random(settings.seed)
+        if settings.dist == "fixed" or median == 0:
+            latency = median
+        elif settings.dist == "uniform":
+            latency = median * _sampler.uniform(1 - settings.sigma, 1 + settings.sigma)
+        elif settings.dist == "exponential":
+            latency = _sampler.expovariate(math.log(2) / median)
+        else:
+            latency = median * _sampler.lognormvariate(0, settings.sigma)
+        failed = _sampler.random() < settings.failure_rate
+    return max(latency, 0.0), failed
+
+
+def _record(kind: str, tokens: int, failed: bool, throttled: bool = False) -> None:
+    with _sampler_lock:
+        _stats["calls"] += 1
+        _stats["failures"] += int(failed)
+        _stats["throttled"] += int(throttled)
+        _stats["completion_tokens"] += tokens
+        _stats["by_kind"][kind] = _stats["by_kind"].get(kind, 0) + 1
+
+
+def get_fake_llm_stats() -> dict:
+    """Return {"calls", "failures", "throttled", "completion_tokens", "by_kind"} for fake calls so far."""
+    with _sampler_lock:
+        return {**_stats, "by_kind": dict(_stats["by_kind"])}
+
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _generate(
+    system: str,
+    prompt: str,
+    error_cls: type[Exception],
+    max_tokens: int | None = None,
+) -> Iterator[str]:
+    """
+    Yield the canned reply in token-sized chunks, paced like a live endpoint:
+    first-token latency, then FAKE_LLM_TOKENS_PER_SEC. Replies longer than
+    max_tokens are cut off there, as a real endpoint would truncate them.
+    """
+    settings = _settings()
+    kind, builder = _classify(system, prompt)
+    reply = builder(system, prompt, _reply_rng(settings.seed, kind, system + prompt))
+    if max_tokens:
+        reply = reply[: max_tokens * CHARS_PER_TOKEN]
+
+    global _in_flight
+    first_token_s, failed = _sample(settings)
+    with _sampler_lock:
+        throttled = 0 < settings.max_concurrency <= _in_flight
+        if not throttled:
+            _in_flight += 1
+    if throttled:
+        time.sleep(first_token_s / 10)   # rejected before any generation
+        _record(kind, 0, failed=True, throttled=True)
+        raise error_cls(f"429 Too Many Requests: fake endpoint over FAKE_LLM_MAX_CONCURRENCY ({kind})")
+
+    try:
+        time.sleep(first_token_s)
+        if failed:
+            _record(kind, 0, failed=True)
+            raise error_cls(f"Injected fake LLM failure ({kind})")
+
+        step = CHUNK_TOKENS * CHARS_PER_TOKEN
+        per_chunk_s = CHUNK_TOKENS / settings.tokens_per_sec if settings.tokens_per_sec > 0 else 0.0
+        for i in range(0, len(reply), step):
+            if i and per_chunk_s:
+                time.sleep(per_chunk_s)
+            yield reply[i:i + step]
+        _record(kind, _token_count(reply), failed=False)
+    finally:
+        with _sampler_lock:
+            _in_flight -= 1
+
+
+def _complete(system: str, prompt: str, error_cls: type[Exception], max_tokens: int | None = None) -> str:
+    return "".join(_generate(system, prompt, error_cls, max_tokens))
+
+
+# ── Client fakes ──────────────────────────────────────────────────────────────
+
+class _GenaiModels:
+    def generate_content(self, model: str, contents: str, config=None):
+        system = getattr(config, "system_instruction", None) or ""
+        return SimpleNamespace(text=_complete(system, contents, FakeLLMError))
+
+    def generate_content_stream(self, model: str, contents: str, config=None):
+        system = getattr(config, "system_instruction", None) or ""
+        for chunk in _generate(system, contents, FakeLLMError):
+            yield SimpleNamespace(text=chunk)
+
+
+class GenaiClient:
+    """Duck-types google.genai.Client for models.generate_content / generate_content_stream."""
+
+    def __init__(self):
+        self.models = _GenaiModels()
+
+
+class _ServingEndpoints:
+    def __init__(self, error_cls: type[Exception]):
+        self._error_cls = error_cls
+
+    def query(self, name: str, messages: list, temperature: float = None, max_tokens: int = None, **kwargs):
+        system, prompt = "", ""
+        for message in messages:
+            role = getattr(message.role, "value", message.role)
+            if role == "system":
+                system = message.content
+            else:
+                prompt += message.content
+        content = _complete(system, prompt, self._error_cls, max_tokens)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class ServingClient:
+    """
+    Duck-types databricks.sdk.WorkspaceClient for serving_endpoints.query.
+    Injected failures raise error_cls, so callers' retry policies apply to them.
+    """
+
+    def __init__(self, error_cls: type[Exception] = FakeLLMError):
+        self.serving_endpoints = _ServingEndpoints(error_cls)
+
+
+# ── Canned replies ────────────────────────────────────────────────────────────
+
+def _reply_rng(seed: str, kind: str, text: str) -> random.Random:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return random.Random(f"{seed}:{kind}:{digest}")
+
+
+def _fenced(data) -> str:
+    return "```json\n" + json.dumps(data, indent=2, ensure_ascii=False) + "\n```"
+
+
+def _json_after(text: str, heading: str, default):
+    """Parse the JSON value that follows heading in a prompt, or return default."""
+    idx = text.find(heading)
+    if idx == -1:
+        return default
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[idx + len(heading):].lstrip())
+        return value
+    except json.JSONDecodeError:
+        return default
+
+
+def _match(pattern: str, text: str, default: str = "") -> str:
+    m = re.search(pattern, text)
+    return m.group(1).strip() if m else default
+
+
+def _split_ids(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+DEFAULT_DOMAINS = ["prompting", "verification", "data_safety", "tool_fluency"]
+
+
+def _mcq(rng: random.Random, topic: str) -> dict:
+    correct = rng.choice("ABCD")
+    return {
+        "options": [
+            {"label": label, "text": f"{'Recommended' if label == correct else 'Plausible'} approach to {topic} ({label})"}
+            for label in "ABCD"
+        ],
+        "correct_option": correct,
+    }
+
+
+# App call types (utils/ai.py) — matched on the flattened Gemini contents
+
+def _item_scores(system: str, prompt: str, rng: random.Random) -> str:
+    item_ids = dict.fromkeys(re.findall(r'"item_id":\s*"([^"]+)"', prompt))
+    return json.dumps({"item_scores": {i: round(rng.uniform(1.0, 3.5), 2) for i in item_ids}})
+
+
+def _gap_map(system: str, prompt: str, rng: random.Random) -> str:
+    scores = _json_after(prompt, "Champion):", {})
+    ordered = sorted(scores, key=lambda d: scores[d]) if isinstance(scores, dict) else []
+    return json.dumps({"gap_bullets": [
+        {
+            "priority": i + 1,
+            "domain_id": domain,
+            "bullet": f"Build confidence in {domain.replace('_', ' ')} by applying it to one live file this week.",
+        }
+        for i, domain in enumerate(ordered[:6])
+    ]})
+
+
+def _coach_note(system: str, prompt: str, rng: random.Random) -> str:
+    return rng.choice([
+        "You applied the framework consistently — keep using it on real drafts to make it a habit.",
+        "You are close: tightening how you verify AI output will lift your next score.",
+        "You showed solid judgement here; the next module builds directly on it.",
+    ])
+
+
+def _coach_reply(system: str, prompt: str, rng: random.Random) -> str:
+    return rng.choice([
+        "Good start. Tighten the prompt by naming the audience, the output format and the source data "
+        "you want the AI to use, then tell me how you would check the result.",
+        "That covers the context well. What constraints would you add so the draft is usable without "
+        "heavy editing — length, tone, or sections?",
+        "Nice — you flagged the right risk. Before you paste anything, which fields would you abstract "
+        "or remove, and why?",
+    ])
+
+
+# Pipeline stages (scripts/generate_course_content.py) — matched on the agent system prompt
+
+def _header_fields(text: str) -> dict[str, dict | list]:
+    """Collect `key:` blocks of `course_N: value` lines and `* bullet` lines from a brief header."""
+    fields: dict[str, dict | list] = {}
+    key = None
+    for line in text.replace("\\_", "_").splitlines():
+        line = line.strip()
+        m = re.match(r"^(\w+):\s*$", line)
+        if m:
+            key = m.group(1)
+            continue
+        m = re.match(r"^course_(\d):\s*(.+)$", line)
+        if m and key:
+            fields.setdefault(key, {})[m.group(1)] = m.group(2).replace("&#x20;", "").strip()
+            continue
+        m = re.match(r"^[*-]\s+(.+)$", line)
+        if m and key:
+            fields.setdefault(key, [])
+            if isinstance(fields[key], list):
+                fields[key].append(m.group(1).strip())
+    return fields
+
+
+def _brief_domains(text: str) -> list[str]:
+    found = re.findall(r"^### (?:Domain|Diagnostic):\s*(\S+)", text.replace("\\_", "_"), re.MULTILINE)
+    return list(dict.fromkeys(found)) or DEFAULT_DOMAINS
+
+
+def _level_fields(domain: str) -> dict:
+    labels = ["Unaware", "Explorer", "Practitioner", "Advanced", "Champion"]
+    fields = {"description": f"Applying {domain.replace('_', ' ')} to this role's daily work."}
+    for lvl, label in enumerate(labels):
+        fields[f"level_{lvl}_label"] = label
+        fields[f"level_{lvl}_descriptor"] = f"{label}: level {lvl} {domain.replace('_', ' ')} in role workflows."
+    return fields
+
+
+def _parse_structural(system: str, prompt: str, rng: random.Random) -> str:
+    text = prompt.replace("\\_", "_")
+    header = _header_fields(text)
+    companies = header.get("company_map") if isinstance(header.get("company_map"), dict) else {}
+    use_cases = header.get("real_use_case") or header.get("real_use_cases")
+    use_cases = use_cases if isinstance(use_cases, dict) else {}
+    frameworks = header.get("framework_names") if isinstance(header.get("framework_names"), list) else []
+    titles = dict(re.findall(r"^### Course (\d) — (.+)$", text, re.MULTILINE))
+    domains = _brief_domains(text)
+    n = [str(i) for i in range(1, 6)]
+    return _fenced({
+        "role_prefix": _match(r"role_prefix:\s*([A-Za-z]{2,3})\b", text, "fk").lower(),
+        "role_display_name": _match(r"role_display_name:\s*(.+)", text) or None,
+        "company_map": {i: companies.get(i) or f"Fakeworks {i} Ltd." for i in n},
+        "framework_names": (frameworks + [f"Framework {i}" for i in n])[:5],
+        "real_use_cases": {i: use_cases.get(i) or f"Use case {i}" for i in n},
+        "domain_seeds": {d: _level_fields(d) for d in domains},
+        "course_seeds": {
+            i: {
+                "title": titles.get(i, f"Course {i}"),
+                "tagline": f"Course {i} tagline",
+                "description": f"Course {i} description.",
+                "real_use_case": use_cases.get(i) or f"Use case {i}",
+                "primary_domain": domains[(int(i) - 1) % len(domains)],
+            }
+            for i in n
+        },
+    })
+
+
+def _parse_scenarios(system: str, prompt: str, rng: random.Random) -> str:
+    n = [str(i) for i in range(1, 6)]
+    return _fenced({
+        "scenario_seeds": {
+            i: {
+                "scenario_text": f"Course {i} scenario: a client file that tempts the learner to paste it into Copilot Chat.",
+                **{f"task_{t}_text": f"Course {i} task {t}." for t in range(1, 5)},
+                "coach_system_prompt": "You are a practice coach. If the learner appears to input real client data, flag it.",
+            }
+            for i in n
+        },
+        "reading_seeds": {
+            i: {
+                "framework_name": f"Framework {i}",
+                "concept_text": f"Course {i} concept.",
+                "good_example": f"Course {i} good example.",
+                "anti_pattern": f"Course {i} anti-pattern.",
+                "takeaway": f"Course {i} takeaway.",
+            }
+            for i in n
+        },
+    })
+
+
+def _parse_assessment(system: str, prompt: str, rng: random.Random) -> str:
+    domains = _brief_domains(prompt)
+
+    def _item(item_type: str, topic: str) -> dict:
+        mcq = _mcq(rng, topic) if item_type == "MCQ" else {"options": None, "correct_option": None}
+        return {"item_type": item_type, "question_text": f"{item_type} on {topic}", "scenario_text": None, **mcq}
+
+    return _fenced({
+        "diagnostic_seeds": {
+            d: [{**_item(t, d), "rubric_criteria": None} for t in ("MCQ", "prompt_sandbox", "micro_task")]
+            for d in domains
+        },
+        "evaluation_seeds": {
+            str(i): [{**_item(t, f"course {i}"), "explanation": None, "rubric_keys": None}
+                     for t in ("MCQ", "MCQ", "MCQ", "performance_task")]
+            for i in range(1, 6)
+        },
+    })
+
+
+def _structural(system: str, prompt: str, rng: random.Random) -> str:
+    role_prefix = _match(r"role_prefix:\s*(\w+)", prompt, "fk")
+    role_name = _match(r"role_display_name:\s*(.+)", prompt, role_prefix.upper())
+    domains = _split_ids(_match(r"domain_ids for this role \(from brief\):\s*(.+)", system)) or DEFAULT_DOMAINS
+    course_seeds = _json_after(prompt, "Course seeds (use for title, tagline, description):", {})
+    use_cases = _json_after(prompt, "real_use_cases (verbatim — use for real_use_case field in courses.json):", {})
+
+    courses = {}
+    for pos in range(1, 6):
+        domain = domains[(pos - 1) % len(domains)]
+        course_id = f"{role_prefix}_c{pos}_capstone" if pos == 5 else f"{role_prefix}_c{pos}_{domain}"
+        seed = (course_seeds or {}).get(str(pos)) or {}
+        courses[course_id] = {
+            "course_id": course_id,
+            "role_id": role_prefix,
+            "primary_domain": domains[0] if pos == 5 else domain,
+            "title": seed.get("title") or f"Course {pos}",
+            "tagline": seed.get("tagline") or f"Course {pos} tagline",
+            "description": seed.get("description") or f"Course {pos} description.",
+            "real_use_case": (use_cases or {}).get(str(pos)) or "",
+            "sequence_order": pos,
+        }
+    return _fenced({
+        "role_entry": {role_prefix: {
+            "role_id": role_prefix,
+            "title": role_name,
+            "description": f"{role_name} professionals using AI in their daily workflows.",
+            "department": "Operations",
+        }},
+        "domain_entries": {
+            d: {"domain_id": d, "role_id": role_prefix, "title": d.replace("_", " ").title(), **_level_fields(d)}
+            for d in domains
+        },
+        "course_entries": courses,
+    })
+
+
+def _quality_check(system: str, prompt: str, rng: random.Random) -> str:
+    return _fenced({"flags": []})
+
+
+def _course_content(system: str, prompt: str, rng: random.Random) -> str:
+    course_id = _match(r"(?m)^course_id:\s*(\S+)", prompt, "fk_c1")
+    company = _match(r'Fictional company assigned to this course:\s*"([^"]+)"', system, "Fakeworks Ltd.")
+    framework = _match(r"framework/technique to teach:\s*(.*)", prompt) or "the framework"
+    concept = " ".join(
+        f"{framework} step {i} turns a vague request into a checked, client-ready draft."
+        for i in range(1, 13)
+    )
+    return _fenced({
+        "reading_content": {
+            "content_id": f"rc_{course_id}",
+            "course_id": course_id,
+            "concept_text": concept,
+            "good_example": f"Before: 'summarise this'. After: a {framework} prompt naming role, context, task and format.",
+            "anti_pattern": "Pasting the full client record into Copilot Chat, which exposes non-public data.",
+            "takeaway": f"Use {framework} every time you hand work to an AI tool.",
+        },
+        "practice_scenario": {
+            "scenario_id": f"ps_{course_id}",
+            "course_id": course_id,
+            "scenario_text": f"{company} has sent a renewal package and you have one hour to prepare.",
+            **{f"task_{t}_text": f"Task {t}: apply {framework} to the {company} file." for t in range(1, 5)},
+            "coach_system_prompt": (
+                f"You are a practice coach for {company}. If the learner appears to input what looks like "
+                "real client data — real company names, real financial figures, or verbatim confidential "
+                "records — flag it immediately and instruct them to use only the fictional scenario data provided."
+            ),
+        },
+    })
+
+
+def _diagnostic_items(system: str, prompt: str, rng: random.Random) -> str:
+    role_prefix = _match(r"role_prefix:\s*(\w+)", prompt, "fk")
+    domains = _split_ids(_match(r"Domains for this role:\s*(.+)", system)) or DEFAULT_DOMAINS
+    criteria = {"criteria": [{"name": f"Criterion {c}", "description": "Demonstrated.", "max": 1} for c in range(1, 5)]}
+    items = []
+    for i, domain in enumerate(domains):
+        abbrev = "".join(part[0] for part in domain.split("_") if part)
+        for n, (item_type, suffix) in enumerate((("mcq", "mcq"), ("prompt_sandbox", "sandbox"), ("micro_task", "task")), 1):
+            item = {
+                "item_id": f"{role_prefix}_diag_{abbrev}{n}_{suffix}",
+                "domain_id": domain,
+                "item_type": item_type,
+                "display_order": i * 3 + n,
+                "question_text": f"{domain.replace('_', ' ').title()} item {n}",
+                "scenario_text": None if item_type == "mcq" else f"A {domain.replace('_', ' ')} situation.",
+                "options": None,
+                "correct_option": None,
+                "scoring_rubric": criteria,
+            }
+            if item_type == "mcq":
+                item.update(_mcq(rng, domain.replace("_", " ")), scoring_rubric={"correct": 4, "incorrect": 0})
+            items.append(item)
+    return _fenced({"items": items})
+
+
+def _evaluation_items(system: str, prompt: str, rng: random.Random) -> str:
+    course_map = _json_after(prompt, "Course ID map (sequence_order → course_id):", {})
+    course_ids = [course_map[k] for k in sorted(course_map, key=int)] if course_map else [f"fk_c{i}" for i in range(1, 6)]
+    items = []
+    for course_id in course_ids:
+        for seq in range(1, 5):
+            item = {
+                "item_id": f"ev_{course_id}_q{seq}",
+                "course_id": course_id,
+                "item_type": "mcq" if seq < 4 else "performance_task",
+                "sequence": seq,
+                "question_text": f"{course_id} question {seq}",
+                "scenario_text": None,
+                "options": None,
+                "correct_option": None,
+                "explanation": None,
+                "scoring_rubric": {f"key{k}": "Demonstrates the course concept." for k in range(1, 5)},
+            }
+            if seq < 4:
+                item.update(_mcq(rng, course_id), explanation="It applies the reading concept.",
+                            scoring_rubric={"correct": 4, "incorrect": 0})
+            else:
+                item["scenario_text"] = f"A new client situation for {course_id}."
+            items.append(item)
+    return _fenced({"items": items})
+
+
+def _final_qa(system: str, prompt: str, rng: random.Random) -> str:
+    return _fenced({"issues": []})
+
+
+def _repair_json(system: str, prompt: str, rng: random.Random) -> str:
+    return prompt.strip()
+
+
+# (kind, marker in system prompt + request, reply builder) — first match wins
+_ROUTES: list[tuple[str, str, Callable[[str, str, random.Random], str]]] = [
+    ("pipeline_parser_structural", "Extract ONLY the fields shown in the output schema", _parse_structural),
+    ("pipeline_parser_scenarios", "Extract ONLY scenario_seeds and reading_seeds", _parse_scenarios),
+    ("pipeline_parser_assessment", "Extract ONLY diagnostic_seeds and evaluation_seeds", _parse_assessment),
+    ("pipeline_structural", "You are a structural JSON generator", _structural),
+    ("pipeline_qa", "You are a quality assurance agent", _quality_check),
+    ("pipeline_course_content", "You are a course content author", _course_content),
+    ("pipeline_assessment", "You are an assessment designer", _diagnostic_items),
+    ("pipeline_evaluation", "You are an evaluation designer", _evaluation_items),
+    ("pipeline_final_qa", "You are a final QA agent", _final_qa),
+    ("pipeline_json_repair", "You are a JSON repair tool", _repair_json),
+    ("scoring", "You are a scoring engine", _item_scores),
+    ("gap_map", '"gap_bullets"', _gap_map),
+    ("coach_note", "Write a 1–2 sentence coach note", _coach_note),
+]
+
+
+def _classify(system: str, prompt: str) -> tuple[str, Callable[[str, str, random.Random], str]]:
+    for kind, marker, builder in _ROUTES:
+        if marker in system or marker in prompt:
+            return kind, builder
+    return "coach_response", _coach_reply
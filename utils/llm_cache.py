@@ -0,0 +1,225 @@
+"""
+Content-addressed on-disk cache for LLM replies (scripts/generate_course_content.py).
+
+A reply is stored under the SHA-256 of (provider, endpoint_name, system_prompt,
+user_prompt, temperature, max_tokens), so re-running the pipeline on an unchanged
+brief replays every stage from disk and only the calls whose prompts changed go
+to the endpoint. Entries live in LLM_CACHE_DIR/<key[:2]>/<key>.json.
+
+    LLM_CACHE_MODE       readwrite (default) — serve hits, store misses
+                         readonly — serve hits, never write
+                         refresh  — always call the endpoint, overwrite the entry
+                         off      — bypass the cache entirely
+    LLM_CACHE_DIR        cache directory (default .llm_cache/ in the project root)
+    LLM_CACHE_MAX_MB     size cap; least recently used entries are evicted past it (default 200)
+
+A caller that rejects a reply (unparseable, too few items) discard()s its entry
+and retries with cache_refresh=True, so the retry reaches the endpoint and a bad
+reply is never replayed by later runs.
+"""
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import logging
+import tempfile
+import functools
+import threading
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from utils import fake_llm
+
+logger = logging.getLogger(__name__)
+
+MODES = ("readwrite", "readonly", "refresh", "off")
+_DEFAULT_DIR = Path(__file__).resolve().parent.parent / ".llm_cache"
+
+
+class _Settings(NamedTuple):
+    mode: str
+    directory: Path
+    max_bytes: int
+
+
+def _settings() -> _Settings:
+    # Read per call so the pipeline's --llm-cache flag can set them after import
+    mode = os.environ.get("LLM_CACHE_MODE", "readwrite").strip().lower() or "readwrite"
+    if mode not in MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(MODES)}; got {mode!r}")
+    return _Settings(
+        mode=mode,
+        directory=Path(os.environ.get("LLM_CACHE_DIR") or _DEFAULT_DIR),
+        max_bytes=int(float(os.environ.get("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024),
+    )
+
+
+def cache_key(
+    endpoint_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """SHA-256 hex digest identifying one LLM request."""
+    provider = "fake" if fake_llm.enabled() else "live"
+    payload = json.dumps(
+        [provider, endpoint_name, system_prompt, user_prompt, float(temperature), int(max_tokens)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(directory: Path, key: str) -> Path:
+    return directory / key[:2] / f"{key}.json"
+
+
+# ── Stats and size accounting ─────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "discards": 0}
+_sizes: dict[Path, int] = {}     # directory -> bytes on disk, scanned on first write
+
+
+def get_llm_cache_stats() -> dict:
+    """Return {"mode", "hits", "misses", "writes", "evictions", "discards"} for this process."""
+    with _lock:
+        return {"mode": _settings().mode, **_stats}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def _entries(directory: Path) -> list[tuple[float, int, Path]]:
+    """(mtime, size, path) of every cache entry under directory."""
+    out = []
+    for path in directory.glob("??/*.json"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        out.append((st.st_mtime, st.st_size, path))
+    return out
+
+
+def _evict(directory: Path, max_bytes: int) -> None:
+    """Delete least recently used entries until the directory fits in max_bytes. Holds _lock."""
+    entries = sorted(_entries(directory))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        _stats["evictions"] += 1
+    _sizes[directory] = total
+
+
+# ── Read / write ──────────────────────────────────────────────────────────────
+
+def lookup(key: str, directory: Optional[Path] = None) -> Optional[str]:
+    """Return the cached reply for key, or None. A hit refreshes the entry's LRU position."""
+    path = _entry_path(directory or _settings().directory, key)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return entry.get("response")
+
+
+def store(key: str, endpoint_name: str, response: str, settings: Optional[_Settings] = None) -> None:
+    """Write the reply for key atomically, then evict down to LLM_CACHE_MAX_MB."""
+    settings = settings or _settings()
+    path = _entry_path(settings.directory, key)
+    data = json.dumps(
+        {"endpoint": endpoint_name, "created_at": time.time(), "response": response},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=path.parent, suffix=".tmp", delete=False) as f:
+            f.write(data)
+            tmp_path = f.name
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("LLM cache write failed for %s: %s", path, e)
+        return
+    with _lock:
+        _stats["writes"] += 1
+        if settings.directory not in _sizes:
+            _evict(settings.directory, settings.max_bytes)   # first write: scan what is on disk
+        else:
+            _sizes[settings.directory] += len(data)
+            if _sizes[settings.directory] > settings.max_bytes:
+                _evict(settings.directory, settings.max_bytes)
+
+
+def discard(
+    endpoint_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+) -> None:
+    """Delete the cached reply for a request, e.g. one that failed parsing or validation."""
+    settings = _settings()
+    if settings.mode in ("off", "readonly"):
+        return
+    key = cache_key(endpoint_name, system_prompt, user_prompt, temperature, max_tokens)
+    try:
+        _entry_path(settings.directory, key).unlink()
+    except FileNotFoundError:
+        return
+    except OSError as e:
+        logger.warning("LLM cache discard failed for %s: %s", key, e)
+        return
+    _count("discards")
+
+
+def cached(fn: Callable[..., str]) -> Callable[..., str]:
+    """
+    Wrap an LLM call taking (endpoint_name, system_prompt, user_prompt,
+    temperature, max_tokens) with the cache. Sits outside any retry decorator,
+    so a hit never touches the endpoint and only a final successful reply is stored.
+
+    The wrapper also takes a keyword-only cache_refresh=True, which skips the
+    lookup for that one call (as LLM_CACHE_MODE=refresh does) — for a retry
+    after the previous reply was rejected.
+    """
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, cache_refresh: bool = False, **kwargs) -> str:
+        settings = _settings()
+        if settings.mode == "off":
+            return fn(*args, **kwargs)
+
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        a = bound.arguments
+        key = cache_key(
+            a["endpoint_name"], a["system_prompt"], a["user_prompt"],
+            a["temperature"], a["max_tokens"],
+        )
+        if settings.mode != "refresh" and not cache_refresh:
+            response = lookup(key, settings.directory)
+            if response is not None:
+                _count("hits")
+                return response
+
+        _count("misses")
+        response = fn(*args, **kwargs)
+        if settings.mode != "readonly" and response:
+            store(key, a["endpoint_name"], response, settings)
+        return response
+
+    return wrapper
@@ -0,0 +1,235 @@
+"""
+Shared per-endpoint rate limiting for LLM calls (utils/ai.py and the content pipeline).
+
+One EndpointLimiter per endpoint / model name per process, combining:
+    - a token bucket on request starts (rps, burst)
+    - a tokens-per-minute budget over a sliding 60 s window; each call reserves
+      its prompt estimate + max_tokens up front and is trued up on release
+    - an AIMD concurrency limit: +1 slot per window of successful calls,
+      halved on a 429 / quota / timeout response (at most once per cooldown),
+      which also pauses new requests on that endpoint for the cooldown
+
+Limits are per process: every thread in one process that calls an endpoint
+(concurrent Streamlit sessions in an app process, or the agents of every brief
+in one pipeline run) shares its limiter, and waiters are served first come,
+first served instead of racing. Separate processes — each app replica, each
+pipeline run — hold independent limiters, so set per-process limits that
+leave headroom when several run against the same quota.
+
+Limits come from the caller's defaults, then LLM_RATE_LIMITS — a JSON object of
+per-endpoint overrides, e.g. {"databricks-claude-sonnet-4-6": {"rps": 1, "tpm": 80000}}
+(keys: rps, burst, tpm, initial_concurrency, min_concurrency, max_concurrency).
+rps or tpm of 0 disables that limit.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+_WINDOW_S = 60.0
+_BACKOFF_S = 2.0        # pause after a throttle; doubles on consecutive throttles
+_MAX_BACKOFF_S = 30.0
+
+_THROTTLE_MARKERS = ("429", "resource_exhausted", "rate limit", "too many requests", "quota", "timed out", "timeout")
+_THROTTLE_TYPES = ("TooManyRequests", "ResourceExhausted", "DeadlineExceeded", "Timeout", "TimeoutError", "ReadTimeout")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def is_throttle(exc: BaseException) -> bool:
+    """True for 429 / quota / timeout failures — the ones that mean "slow down"."""
+    if isinstance(exc, TimeoutError):
+        return True
+    for attr in ("status_code", "code", "status"):
+        if getattr(exc, attr, None) in (429, 504, "RESOURCE_EXHAUSTED"):
+            return True
+    if any(name in type(exc).__name__ for name in _THROTTLE_TYPES):
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in _THROTTLE_MARKERS)
+
+
+class Permit:
+    """One admitted call. Set tokens_used once the reply is known to true up the TPM window."""
+
+    __slots__ = ("reserved", "tokens_used", "_entry")
+
+    def __init__(self, reserved: int, entry: list):
+        self.reserved = reserved
+        self.tokens_used: Optional[int] = None
+        self._entry = entry
+
+
+class EndpointLimiter:
+    def __init__(
+        self,
+        name: str,
+        rps: float = 0.0,
+        burst: float = 4.0,
+        tpm: int = 0,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+    ):
+        self.name = name
+        self.rps = float(rps)
+        self.burst = max(float(burst), 1.0)
+        self.tpm = int(tpm)
+        self.min_concurrency = max(int(min_concurrency), 1)
+        self.max_concurrency = max(int(max_concurrency), self.min_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+
+        self._cond = threading.Condition()
+        self._queue: deque = deque()        # FIFO of waiting tickets
+        self._in_flight = 0
+        self._tokens = self.burst           # request bucket
+        self._refilled_at = time.monotonic()
+        self._window: deque = deque()       # [timestamp, tokens] reservations in the last minute
+        self._window_tokens = 0
+        self._paused_until = 0.0
+        self._backoff_s = _BACKOFF_S
+        self._last_decrease = 0.0
+        self._stats = {"calls": 0, "ok": 0, "throttled": 0, "errors": 0, "wait_s": 0.0, "peak_in_flight": 0}
+
+    # ── Admission ────────────────────────────────────────────────────────────
+
+    def _refill(self, now: float) -> None:
+        if self.rps > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rps)
+        self._refilled_at = now
+        while self._window and self._window[0][0] <= now - _WINDOW_S:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _wait_needed(self, now: float, reserve: int) -> float:
+        """Seconds until this call may start (0 = now); holds _cond."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self.limit):
+            return 1.0                          # woken by release()
+        if self.rps > 0 and self._tokens < 1:
+            return (1 - self._tokens) / self.rps
+        if self.tpm > 0 and self._window and self._window_tokens + reserve > self.tpm:
+            # An oversized call is admitted alone once the window drains
+            return self._window[0][0] + _WINDOW_S - now
+        return 0.0
+
+    def acquire(self, reserve_tokens: int = 0) -> Permit:
+        """Block until a call reserving reserve_tokens may start on this endpoint."""
+        ticket = object()
+        t0 = time.monotonic()
+        with self._cond:
+            self._queue.append(ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait_s = self._wait_needed(now, reserve_tokens) if self._queue[0] is ticket else 1.0
+                if wait_s <= 0:
+                    break
+                self._cond.wait(timeout=min(wait_s, 1.0))
+            self._queue.popleft()
+            if self.rps > 0:
+                self._tokens -= 1
+            entry = [now, reserve_tokens]
+            self._window.append(entry)
+            self._window_tokens += reserve_tokens
+            self._in_flight += 1
+            self._stats["calls"] += 1
+            self._stats["wait_s"] += now - t0
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+            self._cond.notify_all()             # the next ticket is now at the head
+        return Permit(reserve_tokens, entry)
+
+    def release(self, permit: Permit, outcome: str = "ok") -> None:
+        """Finish a call: outcome is "ok", "throttled" or "error"."""
+        with self._cond:
+            now = time.monotonic()
+            self._in_flight -= 1
+            if permit.tokens_used is not None and permit._entry in self._window:
+                self._window_tokens += permit.tokens_used - permit._entry[1]
+                permit._entry[1] = permit.tokens_used
+            if outcome == "ok":
+                self._stats["ok"] += 1
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self._backoff_s = _BACKOFF_S
+            elif outcome == "throttled":
+                self._stats["throttled"] += 1
+                # Calls already in flight when the limit dropped fail together; count them once
+                if now - self._last_decrease >= self._backoff_s:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                    self._paused_until = now + self._backoff_s
+                    logger.warning(
+                        "LLM endpoint %s throttled: concurrency -> %d, pausing %.1fs",
+                        self.name, int(self.limit), self._backoff_s,
+                    )
+                    self._backoff_s = min(self._backoff_s * 2, _MAX_BACKOFF_S)
+            else:
+                self._stats["errors"] += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, reserve_tokens: int = 0) -> Iterator[Permit]:
+        """acquire() / release() around a call, classifying any exception it raises."""
+        permit = self.acquire(reserve_tokens)
+        outcome = "ok"
+        try:
+            yield permit
+        except Exception as e:
+            outcome = "throttled" if is_throttle(e) else "error"
+            raise
+        finally:
+            self.release(permit, outcome)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                **self._stats,
+                "wait_s": round(self._stats["wait_s"], 2),
+                "concurrency_limit": int(self.limit),
+                "in_flight": self._in_flight,
+                "tokens_last_minute": self._window_tokens,
+            }
+
+
+# ── Registry ──────────────────────────────────────────────────────────────────
+
+_limiters: dict[str, EndpointLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _overrides(name: str) -> dict:
+    raw = os.environ.get("LLM_RATE_LIMITS", "").strip()
+    if not raw:
+        return {}
+    try:
+        return dict(json.loads(raw).get(name) or {})
+    except (ValueError, AttributeError) as e:
+        logger.warning("Ignoring malformed LLM_RATE_LIMITS: %s", e)
+        return {}
+
+
+def get_limiter(name: str, **defaults) -> EndpointLimiter:
+    """Return the process-wide limiter for an endpoint, creating it from defaults + LLM_RATE_LIMITS."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = EndpointLimiter(name, **{**defaults, **_overrides(name)})
+        return limiter
+
+
+def get_rate_limit_stats() -> dict:
+    """Return {endpoint: stats} for every limiter created in this process."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -8,8 +8,18 @@ who take their craft seriously.
 """
 
 import os
+import hashlib
+import logging
+import tempfile
+import functools
+import threading
+from pathlib import Path
+from typing import Optional
+
 import streamlit as st
 
+logger = logging.getLogger(__name__)
+
 # Colour tokens used in inline Python formatting strings
 COLORS = {
     "bg_primary":    "#0D0F14",   # near-black
@@ -26,14 +36,114 @@ COLORS = {
 }
 
 
-def inject_global_css():
-    """Inject the full design system CSS once per page."""
-    st.markdown(f"""
+# ── Stylesheet asset ──────────────────────────────────────────────────────────
+# The design system is built once per process and written to static/css/ under a
+# content-hash name, so each rerun only sends a <link> tag and browsers cache the
+# file until the CSS changes. Fonts are self-hosted from static/fonts/ (fetched by
+# scripts/fetch_fonts.py) and bundled into the same file; without them only the
+# fonts fall back, to a Google Fonts <link>. Inline CSS is used only when
+# server.enableStaticServing is off, static/ is not writable, or the running
+# Streamlit would not serve the file as text/css (see _static_serves_css()).
+_STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+_CSS_DIR = _STATIC_DIR / "css"
+_FONTS_CSS = _STATIC_DIR / "fonts" / "fonts.css"
+_STATIC_URL = "app/static"
+
+GOOGLE_FONTS_URL = (
+    "https://fonts.googleapis.com/css2?family=DM+Serif+Display:ital@0;1"
+    "&family=IBM+Plex+Mono:wght@400;500&family=Inter:wght@400;500;600&display=swap"
+)
+_GOOGLE_FONTS_LINKS = f"""
 <link rel="preconnect" href="https://fonts.googleapis.com">
 <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-<link href="https://fonts.googleapis.com/css2?family=DM+Serif+Display:ital@0;1&family=IBM+Plex+Mono:wght@400;500&family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
+<link href="{GOOGLE_FONTS_URL}" rel="stylesheet">
+"""
+
+_asset_lock = threading.Lock()
+_asset_head: Optional[str] = None
+
+
+def _self_hosted_fonts() -> str:
+    """@font-face rules for the fonts in static/fonts/, or "" when they are not installed."""
+    try:
+        return _FONTS_CSS.read_text(encoding="utf-8")
+    except OSError:
+        return ""
+
+
+def _static_serves_css() -> bool:
+    """
+    Whether app/static/ serves .css as text/css. The Tornado static handler of
+    older Streamlit releases sends extensions outside its whitelist as text/plain
+    with nosniff, and browsers silently drop such a stylesheet; the Starlette
+    server (Streamlit 1.65 here) guesses the type from the extension.
+    """
+    try:
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        return True
+    return ".css" in SAFE_APP_STATIC_FILE_EXTENSIONS
+
+
+def _publish_stylesheet(css: str) -> str:
+    """Write css to static/css/aha-<hash>.css (once) and return its URL."""
+    name = f"aha-{hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]}.css"
+    path = _CSS_DIR / name
+    if not path.exists():
+        _CSS_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=_CSS_DIR, suffix=".tmp", delete=False) as f:
+            f.write(css)
+            tmp_path = f.name
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        for stale in _CSS_DIR.glob("aha-*.css"):
+            if stale.name != name:
+                stale.unlink(missing_ok=True)
+    return f"{_STATIC_URL}/css/{name}"
+
+
+def _stylesheet_head() -> str:
+    """The markup inject_global_css() sends on every rerun, built on first use."""
+    global _asset_head
+    if _asset_head is None:
+        with _asset_lock:
+            if _asset_head is None:
+                css = build_stylesheet()
+                fonts = _self_hosted_fonts()
+                font_links = "" if fonts else _GOOGLE_FONTS_LINKS
+                head = None
+                if st.get_option("server.enableStaticServing") and _static_serves_css():
+                    try:
+                        head = f'{font_links}<link rel="stylesheet" href="{_publish_stylesheet(fonts + css)}">'
+                    except OSError as e:
+                        logger.warning("Could not publish stylesheet asset, inlining it: %s", e)
+                if head is None:
+                    head = f"{font_links}\n<style>\n{fonts}{css}</style>\n"
+                _asset_head = head
+    return _asset_head
+
+
+def inject_global_css():
+    """Inject the design system stylesheet on every page."""
+    st.markdown(_stylesheet_head(), unsafe_allow_html=True)
+
+    if os.environ.get("LOCAL_UAT") == "true":
+        _uat_email = os.environ.get("DEV_USER_EMAIL", "dev@example.com")
+        st.sidebar.markdown(
+            f"""<div style="background:rgba(245,166,35,0.10);border:1px solid #F5A623;"""
+            f"""border-radius:6px;padding:0.5rem 0.75rem;font-family:'IBM Plex Mono',"""
+            f"""monospace;font-size:0.72rem;color:#F5A623;margin-bottom:0.5rem;">"""
+            f"""⚠ UAT MODE<br>"""
+            f"""<span style="color:#8990A8;font-size:0.68rem;">{_uat_email}</span>"""
+            f"""</div>""",
+            unsafe_allow_html=True,
+        )
 
-<style>
+
+@functools.lru_cache(maxsize=1)
+def build_stylesheet() -> str:
+    """The full design system CSS (no <style> wrapper), rendered from COLORS once per process."""
+    return f"""
 /* ─── RESET & ROOT ─────────────────────────────────────────── */
 :root {{
   --bg-primary:   {COLORS['bg_primary']};
@@ -671,20 +781,7 @@ tr:last-child td {{ border-bottom: none; }}
 }}
 
 /* Chat bubbles removed — replaced with st.chat_message() (NX1 resolved) */
-</style>
-""", unsafe_allow_html=True)
-
-    if os.environ.get("LOCAL_UAT") == "true":
-        _uat_email = os.environ.get("DEV_USER_EMAIL", "dev@example.com")
-        st.sidebar.markdown(
-            f"""<div style="background:rgba(245,166,35,0.10);border:1px solid #F5A623;"""
-            f"""border-radius:6px;padding:0.5rem 0.75rem;font-family:'IBM Plex Mono',"""
-            f"""monospace;font-size:0.72rem;color:#F5A623;margin-bottom:0.5rem;">"""
-            f"""⚠ UAT MODE<br>"""
-            f"""<span style="color:#8990A8;font-size:0.68rem;">{_uat_email}</span>"""
-            f"""</div>""",
-            unsafe_allow_html=True,
-        )
+"""
 
 
 def section_header(label: str):